@@ -2,7 +2,10 @@ from langchain_openai import ChatOpenAI
 from langchain.schema import HumanMessage
 from db.connection import get_connection
 from tools.portfolio_calculator import calculate_portfolio_value
+from tools.risk_engine import RiskEngine
 from tools.stock_recommender import StockRecommender
+from tools.llm_client import LLMClient
+from tools.tracing import record_llm_usage, traced
 from config.settings import settings
 
 
@@ -12,16 +15,18 @@ class StockAdvisor:
         Initializes the StockAdvisor agent.
         Reads user portfolio directly from the database.
         """
-        self.llm = ChatOpenAI(model="gpt-4o-mini", openai_api_key=api_key)
+        self.llm = LLMClient(ChatOpenAI(model="gpt-4o-mini", openai_api_key=api_key, max_retries=0))
         self.recommender = StockRecommender()
+        self.risk_engine = RiskEngine()
 
+    @traced("StockAdvisor.fetch_portfolio")
     def get_portfolio_from_db(self, user_id: int):
         """Fetches the user's portfolio from the database."""
-        with get_connection() as conn:
+        with get_connection(read_only=True) as conn:
             with conn.cursor() as cur:
                 cur.execute("""
                     SELECT stock_name, ticker, quantity, recommendation
-                    FROM portfolio
+                    FROM current_portfolio
                     WHERE user_id = %s;
                 """, (user_id,))
                 rows = cur.fetchall()
@@ -71,6 +76,7 @@ class StockAdvisor:
         stock_prices_str = "\n".join([f"{t}: {round(p, 2)}" for t, p in stock_prices.items()])
         stock_values_str = "\n".join([f"{t}: {round(v, 2)}" for t, v in stock_values.items()])
         rec_str = "\n".join([f"{t}: {r}" for t, r in recommendations.items()])
+        risk_str = self.risk_summary(quantities, stock_prices)
 
         context = (
             f"Here is the user's portfolio:\n\n"
@@ -78,9 +84,44 @@ class StockAdvisor:
             f"Stock Values:\n{stock_values_str}\n\n"
             f"Total Portfolio Value: {round(total_value, 2)}\n\n"
             f"Recommendations:\n{rec_str}\n\n"
-            f"Answer the user's question clearly and concisely."
+            + (f"Risk (from daily closes):\n{risk_str}\n\n" if risk_str else "")
+            + "Answer the user's question clearly and concisely."
         )
 
         messages = [HumanMessage(content=f"{context}\n\nUser question: {query}")]
         response = self.llm.invoke(messages)
+        record_llm_usage(response, self.llm.model_name)
         return response.content if hasattr(response, "content") else str(response)
+
+    def risk_summary(self, quantities: dict, prices: dict) -> str | None:
+        """
+        Volatility, VaR, drawdown and concentration lines for the prompt.
+
+        Returns:
+            str | None: None when the price store has too little history.
+        """
+        try:
+            risk = self.risk_engine.analyse(quantities, prices)
+        except Exception as e:
+            print(f"Error computing portfolio risk: {e}")
+            return None
+        if risk is None:
+            return None
+
+        conc = risk["concentration"]
+        drawdown = risk["max_drawdown"]
+        top_risk = ", ".join(
+            f"{h['ticker']} {h['risk_contribution']:.0%}" for h in risk["holdings"][:5]
+        )
+        lines = [
+            f"Annualised volatility: {risk['annual_volatility']:.1%} over {risk['observations']} trading days to {risk['as_of']}",
+            f"1-day {risk['confidence']:.0%} VaR: ${risk['var']:,.0f} ({risk['var_pct']:.2%}); "
+            f"CVaR: ${risk['cvar']:,.0f} ({risk['cvar_pct']:.2%})",
+            f"Max drawdown: {drawdown['pct']:.1%} ({drawdown['peak']} to {drawdown['trough']})",
+            f"Largest weight: {conc['top_holdings'][0][0]} {conc['top_holdings'][0][1]:.1%}; "
+            f"top 5: {conc['top5_weight']:.1%}; effective holdings: {conc['effective_holdings']}",
+            f"Largest risk contributors: {top_risk}",
+        ]
+        if risk["excluded"]:
+            lines.append(f"Not enough history for: {', '.join(risk['excluded'])}")
+        return "\n".join(lines)
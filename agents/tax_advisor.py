@@ -1,7 +1,16 @@
+import numpy as np
 from langchain_openai import ChatOpenAI
 from langchain.schema import HumanMessage
-from tools.tax_analyser import TaxAnalyser
+from tools.tax_analyser import TaxAnalyser, portfolio_hash, stock_data_from_rows
+from tools.tax_loss_scanner import TaxLossScanner, acquired_from_holding_months
+from tools.stock_fetcher import prefetch_stock_prices
+from tools.tax_calculator import LATEST_TAX_YEAR, irmaa, tax_breakdown, tax_table
+from tools.withdrawal_optimizer import Lot, WithdrawalOptimizer, WithdrawalScenario, rmd_divisor
 from db.connection import get_connection
+from db.tax_analyses import get_stored_analysis
+from db.users import get_user
+from tools.llm_client import LLMClient
+from tools.tracing import record_llm_usage, traced
 from config.settings import settings
 
 
@@ -14,8 +23,11 @@ class TaxAdvisor:
             api_key (str): OpenAI API key for tax analysis.
         """
         self.tax_analyser = TaxAnalyser(api_key)
-        self.llm = ChatOpenAI(model="gpt-4", openai_api_key=api_key)
+        self.scanner = TaxLossScanner()
+        self.llm = LLMClient(ChatOpenAI(model="gpt-4", openai_api_key=api_key, max_retries=0))
+        self.optimizer = WithdrawalOptimizer()
 
+    @traced("TaxAdvisor.fetch_portfolio")
     def _fetch_portfolio_data(self, user_id: int) -> dict:
         """
         Fetches the user's portfolio data from the database.
@@ -27,27 +39,17 @@ class TaxAdvisor:
             dict: Portfolio data with tickers, buy prices, quantities, and holding periods.
         """
         try:
-            with get_connection() as conn:
+            with get_connection(read_only=True) as conn:
                 with conn.cursor() as cur:
                     cur.execute("""
                         SELECT ticker, buy_price, quantity, holding_period_months
-                        FROM portfolio
-                        WHERE user_id = %s;
+                        FROM current_portfolio
+                        WHERE user_id = %s
+                        ORDER BY id;
                     """, (user_id,))
                     rows = cur.fetchall()
 
-            if not rows:
-                return {}
-
-            stock_data = {}
-            for ticker, buy_price, quantity, holding_period in rows:
-                stock_data[ticker.upper()] = {
-                    "buy_price": float(buy_price) if buy_price else None,
-                    "quantity": int(quantity) if quantity else None,
-                    "holding_period": int(holding_period) if holding_period else None,
-                }
-
-            return stock_data
+            return stock_data_from_rows(rows)
 
         except Exception as e:
             print(f"Error fetching portfolio for user {user_id}: {e}")
@@ -68,37 +70,212 @@ class TaxAdvisor:
         if not stock_data:
             return "No portfolio data found for this user."
 
-        return self.tax_analyser.analyse_selling_strategy(recommendations, stock_data)
+        # The nightly batch has usually analysed this exact portfolio, at these losses, already
+        opportunities = self.find_harvest_opportunities(user_id=user_id).get(user_id, [])
+        stored = get_stored_analysis(user_id, portfolio_hash(recommendations, stock_data, opportunities))
+        if stored is not None:
+            return stored
+
+        return self.tax_analyser.analyse_selling_strategy(recommendations, stock_data, opportunities)
+
+    def find_harvest_opportunities(self, user_id: int | None = None) -> dict[int, list[dict]]:
+        """
+        Scans lots for tax loss harvesting opportunities.
+
+        Args:
+            user_id (int | None): Restrict the scan to one user. Scans every
+                user in a single batch when omitted.
+
+        Returns:
+            dict[int, list[dict]]: Ranked opportunities keyed by user ID.
+        """
+        try:
+            with get_connection(read_only=True) as conn:
+                with conn.cursor() as cur:
+                    cur.execute("""
+                        SELECT user_id, ticker, quantity, buy_price, holding_period_months
+                        FROM current_portfolio
+                        WHERE buy_price IS NOT NULL
+                          AND (%s IS NULL OR user_id = %s);
+                    """, (user_id, user_id))
+                    rows = cur.fetchall()
+        except Exception as e:
+            print(f"Error loading lots for harvesting scan: {e}")
+            return {}
+
+        if not rows:
+            return {}
+
+        user_ids, tickers, quantities, buy_prices, months = zip(*rows)
+        tickers = [str(t).upper() for t in tickers]
+        prices = prefetch_stock_prices(tickers)
+
+        return self.scanner.scan(
+            user_ids,
+            tickers,
+            [q or 0 for q in quantities],
+            [float(b) for b in buy_prices],
+            acquired_from_holding_months([m or 0 for m in months]),
+            prices,
+        )
+
+    @traced("TaxAdvisor.plan_withdrawals")
+    def plan_withdrawals(
+        self,
+        user_id: int,
+        ira_balance: float,
+        annual_spending: float,
+        time_budget_seconds: float = 2.0,
+        **assumptions,
+    ) -> dict:
+        """
+        Plans yearly IRA, taxable-lot and Roth withdrawals at the lowest lifetime tax.
+
+        The taxable account is the user's current portfolio valued at live
+        prices, with cost basis from buy_price (lots without one are treated
+        as having no gain).
+
+        Args:
+            user_id (int): The user's unique ID.
+            ira_balance (float): Traditional IRA balance.
+            annual_spending (float): After-tax spending need in today's dollars.
+            time_budget_seconds (float): Solver wall-clock budget.
+            **assumptions: Other WithdrawalScenario fields (roth_balance,
+                other_income, filing_status, growth_rate, extra_spending, ...).
+
+        Returns:
+            dict: The optimizer's year-by-year plan, or an error message.
+        """
+        age, rows = self._fetch_tax_profile(user_id)
+        if not age:
+            return {"error": "User age is required to plan withdrawals."}
+
+        prices = prefetch_stock_prices(sorted({t for t, _, _, _ in rows}))
+        lots = []
+        for ticker, buy_price, quantity, _ in rows:
+            price = prices.get(ticker)
+            if not price or not quantity:
+                continue
+            value = float(price) * quantity
+            lots.append(Lot(ticker, value, float(buy_price) * quantity if buy_price else value))
 
-    def ask_tax_question(self, user_id: int, question: str) -> str:
+        scenario = WithdrawalScenario(
+            age=int(age),
+            ira_balance=ira_balance,
+            lots=tuple(lots),
+            annual_spending=annual_spending,
+            **assumptions,
+        )
+        return self.optimizer.solve(scenario, time_budget_seconds)
+
+    def ask_tax_question(
+        self,
+        user_id: int,
+        question: str,
+        income: float | None = None,
+        filing_status: str = "single",
+        ira_balance: float | None = None,
+    ) -> str:
         """
         Allows users to query ChatGPT for tax-related questions with portfolio context.
 
+        Tax figures (bracket position, IRMAA tier, the tax from selling the
+        portfolio or taking this year's RMD) are computed locally and put in
+        the prompt, so the model explains numbers instead of estimating them.
+
         Args:
             user_id (int): User's unique ID
             question (str): User's tax-related query.
+            income (float | None): Other ordinary income this year, if known.
+            filing_status (str): Filing status used for the figures.
+            ira_balance (float | None): Traditional IRA balance, for the RMD figure.
 
         Returns:
             str: ChatGPT's response.
         """
-        stock_data = self._fetch_portfolio_data(user_id)
-        portfolio_context = ""
-        if stock_data:
-            portfolio_context = "User's portfolio data:\n" + "\n".join(
-                f"{ticker}: Bought at {data['buy_price']}, Quantity: {data['quantity']}, Held for {data['holding_period']} months"
-                for ticker, data in stock_data.items()
-            ) + "\n\n"
+        try:
+            context = self._tax_figures(user_id, income, filing_status, ira_balance)
+        except ValueError as e:
+            return str(e)
 
         prompt = f"""
-        You are a tax expert with deep knowledge of stock taxation and capital gains.
-        {portfolio_context}
-        The user has a tax-related question:
-
-        {question}
+        You are a tax expert on stock taxation and capital gains.
+        {context}
+        Question: {question}
 
-        Please respond clearly, accurately, and concisely, following best tax practices.
+        Use the figures above as given; answer clearly and concisely.
         """
         messages = [HumanMessage(content=prompt)]
         response = self.llm.invoke(messages)
+        record_llm_usage(response, self.llm.model_name)
 
         return response.content if hasattr(response, "content") else str(response)
+
+    def _tax_figures(self, user_id: int, income: float | None, filing_status: str, ira_balance: float | None) -> str:
+        """Builds the compact holdings and tax figures block for the question prompt."""
+        age, rows = self._fetch_tax_profile(user_id)
+        prices = prefetch_stock_prices(sorted({t for t, _, _, _ in rows})) if rows else {}
+
+        lines, long_gains, short_gains = [], 0.0, 0.0
+        for ticker, buy_price, quantity, months in rows:
+            price = prices.get(ticker)
+            line = f"{ticker} {quantity or 0} @ {float(buy_price):.2f}" if buy_price else f"{ticker} {quantity or 0}"
+            if months:
+                line += f", {months} mo"
+            if price and buy_price and quantity:
+                gain = (float(price) - float(buy_price)) * quantity
+                long_term = (months or 0) > 12
+                if long_term:
+                    long_gains += gain
+                else:
+                    short_gains += gain
+                line += f", now {float(price):.2f}, gain {gain:+,.0f} {'LT' if long_term else 'ST'}"
+            lines.append(line)
+
+        # One vectorized pass over every scenario the prompt reports
+        base = float(income or 0)
+        seniors = tax_table(filing_status)["filers"] if age and age >= 65 else 0
+        scenarios = [("Current year", base, 0.0), ("Selling all holdings", base + short_gains, long_gains)]
+        divisor = rmd_divisor(age, 73) if age else np.inf
+        if ira_balance and np.isfinite(divisor):
+            rmd = ira_balance / divisor
+            scenarios.append((f"Taking the RMD of ${rmd:,.0f}", base + rmd, 0.0))
+
+        ordinary = np.array([o for _, o, _ in scenarios])
+        gains = np.array([g for _, _, g in scenarios])
+        taxes = tax_breakdown(ordinary, gains, filing_status, seniors=seniors)
+        medicare = irmaa(ordinary + np.maximum(gains, 0.0), filing_status)
+
+        income_note = f"income ${base:,.0f}" if income is not None else "other income unknown, assumed $0"
+        figures = [f"Tax figures ({LATEST_TAX_YEAR} federal, {filing_status}, {income_note}):"]
+        if rows:
+            figures.append(f"- Unrealised gains ($): long-term {long_gains:+,.0f}, short-term {short_gains:+,.0f}")
+        for i, (label, _, _) in enumerate(scenarios):
+            extra = "" if i == 0 else f" (+${taxes['total_tax'][i] - taxes['total_tax'][0]:,.0f})"
+            figures.append(
+                f"- {label}: tax ${taxes['total_tax'][i]:,.0f}{extra}, "
+                f"marginal {taxes['marginal_rate'][i]:.0%}, effective {taxes['effective_rate'][i]:.1%}, "
+                f"${taxes['bracket_headroom'][i]:,.0f} to next bracket, "
+                f"IRMAA tier {medicare['tier'][i]} (${medicare['annual_surcharge'][i]:,.0f}/yr per person, two years out)"
+            )
+
+        holdings = "Holdings: " + "; ".join(lines) + "\n" if lines else ""
+        return holdings + "\n".join(figures) + "\n"
+
+    def _fetch_tax_profile(self, user_id: int) -> tuple[int | None, list[tuple]]:
+        """Reads the user's age and current lots as (ticker, buy_price, quantity, months) rows."""
+        try:
+            user = get_user(user_id)
+            with get_connection(read_only=True) as conn:
+                with conn.cursor() as cur:
+                    cur.execute("""
+                        SELECT UPPER(ticker), buy_price, quantity, holding_period_months
+                        FROM current_portfolio
+                        WHERE user_id = %s AND ticker IS NOT NULL
+                        ORDER BY id;
+                    """, (user_id,))
+                    rows = cur.fetchall()
+        except Exception as e:
+            print(f"Error fetching tax profile for user {user_id}: {e}")
+            return None, []
+        return (user["age"] if user else None), rows
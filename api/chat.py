@@ -1,8 +1,13 @@
 import os
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query
 from pydantic import BaseModel
 from db.connection import get_connection
+from db.chat_history import fetch_history_page, insert_chat_turn
+from db.users import get_user
 from workflows.portfolio_workflow import PortfolioWorkflow
+from tools.portfolio_warmer import portfolio_warmer
+from tools.resilience import deadline_scope
+from tools.single_flight import single_flight
 from config.settings import settings
 from dotenv import load_dotenv
 
@@ -17,6 +22,28 @@ class ChatRequest(BaseModel):
     message: str
 
 
+def _fetch_portfolio(cur, user_id: int) -> list[dict]:
+    cur.execute(
+        """
+        SELECT stock_name, ticker, quantity, recommendation, uploaded_at
+        FROM current_portfolio
+        WHERE user_id = %s
+        ORDER BY uploaded_at DESC;
+        """,
+        (user_id,),
+    )
+    return [
+        {
+            "stock_name": r[0],
+            "ticker": r[1],
+            "quantity": r[2],
+            "recommendation": r[3],
+            "uploaded_at": r[4],
+        }
+        for r in cur.fetchall()
+    ]
+
+
 @router.post("/")
 def chat_with_llm(request: ChatRequest):
     """
@@ -25,42 +52,22 @@ def chat_with_llm(request: ChatRequest):
     """
     try:
         user_id = request.user_id
+        portfolio_warmer.mark_active(user_id)
         api_key = settings.OPENAI_API_KEY
         if not api_key:
             raise HTTPException(status_code=500, detail="Missing OpenAI API key.")
 
-        with get_connection() as conn:
-            with conn.cursor() as cur:
-                # Validate user existence
-                cur.execute("SELECT 1 FROM users WHERE id = %s;", (user_id,))
-                if not cur.fetchone():
-                    raise HTTPException(status_code=404, detail="User not found.")
+        # Validate user existence (served from the user cache after the first chat)
+        if get_user(user_id) is None:
+            raise HTTPException(status_code=404, detail="User not found.")
 
-                # Fetch portfolio
-                cur.execute(
-                    """
-                    SELECT stock_name, ticker, quantity, recommendation, uploaded_at
-                    FROM portfolio
-                    WHERE user_id = %s
-                    ORDER BY uploaded_at DESC;
-                    """,
-                    (user_id,),
-                )
-                portfolio_rows = cur.fetchall()
-                if not portfolio_rows:
+        with get_connection(read_only=True) as conn:
+            with conn.cursor() as cur:
+                # Fetch portfolio (concurrent requests for the same user share one query)
+                portfolio = single_flight.do(f"portfolio:{user_id}", _fetch_portfolio, cur, user_id)
+                if not portfolio:
                     raise HTTPException(status_code=404, detail="No portfolio found for this user.")
 
-                portfolio = [
-                    {
-                        "stock_name": r[0],
-                        "ticker": r[1],
-                        "quantity": r[2],
-                        "recommendation": r[3],
-                        "uploaded_at": r[4],
-                    }
-                    for r in portfolio_rows
-                ]
-
                 # Get chat history (last 10 messages)
                 cur.execute(
                     """
@@ -74,21 +81,15 @@ def chat_with_llm(request: ChatRequest):
                 )
                 chat_history = [{"role": r, "content": m} for r, m in cur.fetchall()][::-1]
 
-        # Run the workflow
+        # Run the workflow; market data calls inside give up at the request deadline
         workflow = PortfolioWorkflow(api_key=api_key)
-        answer = workflow.handle_query(user_id, request.message, portfolio, chat_history)
+        with deadline_scope(settings.CHAT_DEADLINE_SECONDS):
+            answer = workflow.handle_query(user_id, request.message, portfolio, chat_history)
 
         # Save new chat messages
         with get_connection() as conn:
             with conn.cursor() as cur:
-                cur.execute(
-                    "INSERT INTO chat_history (user_id, role, message) VALUES (%s, %s, %s);",
-                    (user_id, "user", request.message),
-                )
-                cur.execute(
-                    "INSERT INTO chat_history (user_id, role, message) VALUES (%s, %s, %s);",
-                    (user_id, "assistant", answer),
-                )
+                insert_chat_turn(cur, user_id, request.message, answer)
                 conn.commit()
 
         return {"response": answer, "context_used": len(chat_history)}
@@ -97,3 +98,19 @@ def chat_with_llm(request: ChatRequest):
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/history/{user_id}")
+def get_chat_history(
+    user_id: int,
+    cursor: str | None = None,
+    limit: int = Query(20, ge=1, le=100),
+):
+    """
+    Page through a user's chat history, newest first.
+    Pass next_cursor from the previous response to get older messages.
+    """
+    try:
+        return fetch_history_page(user_id, cursor, limit)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor.")
@@ -0,0 +1,111 @@
+import os
+import random
+import time
+import uuid
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from tools.profiler import SamplingProfiler, current_profiler
+from tools.tracing import request_id_var, tracer
+from config.settings import settings
+
+
+class RequestIdMiddleware:
+    """
+    Tags each HTTP request with an ID and wraps it in a root trace span.
+
+    An incoming X-Request-ID header is reused, otherwise one is generated.
+    The ID is echoed in the response, stored on every span of the request
+    and visible to the handler through tools.tracing.request_id_var.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = next(
+            (value.decode() for name, value in scope.get("headers", []) if name == b"x-request-id"),
+            None,
+        ) or uuid.uuid4().hex
+        token = request_id_var.set(request_id)
+
+        with tracer.span("http.request", method=scope["method"], path=scope["path"]) as span:
+            async def send_with_id(message: Message):
+                if message["type"] == "http.response.start":
+                    message.setdefault("headers", []).append((b"x-request-id", request_id.encode()))
+                    if span is not None:
+                        span.set("status_code", message["status"])
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_with_id)
+            finally:
+                route = scope.get("route")
+                if span is not None and route is not None:
+                    span.name = f"{scope['method']} {route.path}"
+                request_id_var.reset(token)
+
+
+class ProfilingMiddleware:
+    """
+    Profiles individual requests on demand.
+
+    A request is profiled when it carries the PROFILE_HEADER header (any
+    value except "0") or is picked by PROFILE_SAMPLE_RATE. Its folded-stack
+    profile is written to PROFILE_DIR and the file name is returned in the
+    X-Profile-File response header. The thread running the matched endpoint
+    is sampled, along with pool threads (graph nodes, quote prefetches, LLM
+    calls) while they do this request's work; concurrent requests to the
+    same endpoint may share samples. app.py only installs this middleware
+    when PROFILING_ENABLED is set, so it costs nothing otherwise.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self.header = settings.PROFILE_HEADER.lower().encode()
+        self.sample_rate = settings.PROFILE_SAMPLE_RATE
+        self.interval_ms = settings.PROFILE_INTERVAL_MS
+        self.directory = settings.PROFILE_DIR
+
+    def _wanted(self, scope: Scope) -> bool:
+        for name, value in scope.get("headers", []):
+            if name == self.header:
+                return value not in (b"", b"0")
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or not self._wanted(scope):
+            await self.app(scope, receive, send)
+            return
+
+        # The router records the matched endpoint in scope once routing is done
+        def endpoint_code():
+            endpoint = scope.get("endpoint")
+            return getattr(endpoint, "__code__", None)
+
+        name = "{}_{}_{}_{}.folded".format(
+            time.strftime("%Y%m%dT%H%M%S"),
+            scope["method"],
+            scope["path"].strip("/").replace("/", "-") or "root",
+            uuid.uuid4().hex[:8],
+        )
+        profiler = SamplingProfiler(self.interval_ms, target=endpoint_code)
+
+        async def send_with_header(message: Message):
+            if message["type"] == "http.response.start":
+                message.setdefault("headers", []).append((b"x-profile-file", name.encode()))
+            await send(message)
+
+        profiler.start()
+        token = current_profiler.set(profiler)
+        try:
+            await self.app(scope, receive, send_with_header)
+        finally:
+            current_profiler.reset(token)
+            profiler.stop()
+            try:
+                profiler.write_folded(os.path.join(self.directory, name))
+            except OSError as e:
+                print(f"Could not write profile {name}: {e}")
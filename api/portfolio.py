@@ -1,50 +1,180 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException, Form
-from db.connection import get_connection
-import pandas as pd
-import io
+from datetime import date
+from typing import Literal
+from pydantic import BaseModel, Field
+from fastapi import APIRouter, UploadFile, File, HTTPException, Form, Query
+from fastapi.responses import StreamingResponse
+from db.exports import iter_export_chunks, stream_csv, stream_parquet
+from db.portfolio_versions import get_current_quantities
+from agents.tax_advisor import TaxAdvisor
+from config.settings import settings
+from db.tax_analyses import get_tax_analysis
+from db.upload_jobs import create_upload_job, get_upload_job
+from db.valuations import get_valuation
+from tools.risk_engine import RiskEngine
+from tools.upload_worker import upload_worker
+import os
+import uuid
 
 
 router = APIRouter(prefix="/portfolio", tags=["portfolio"])
 
 
-@router.post("/upload-excel")
-async def upload_portfolio_excel(user_id: int = Form(...), file: UploadFile = File(...)):
+@router.post("/upload-excel", status_code=202)
+async def upload_portfolio_excel(
+    user_id: int = Form(...),
+    file: UploadFile = File(...),
+):
     """
     Upload a portfolio Excel file for a user.
     - Excel must contain columns: stock_name, ticker, quantity
+    - Optional columns: buy_price, holding_period_months
     - Extra columns will be ignored
-    - Recommendation remains NULL until updated later
+    - Each upload replaces the user's current holdings as a new version
+    - The file is processed in the background; poll the returned status URL
+    - Invalid rows are rejected individually and listed in the job status
+    - Recommendations are refreshed once the upload finishes
     """
     if not file.filename.endswith((".xlsx", ".xls")):
         raise HTTPException(status_code=400, detail="Only Excel files are supported")
 
     try:
-        # Read Excel file into pandas DataFrame
-        contents = await file.read()
-        df = pd.read_excel(io.BytesIO(contents))
-
-        required_cols = {"stock_name", "ticker", "quantity"}
-        missing = required_cols - set(df.columns)
-        if missing:
-            raise HTTPException(status_code=400, detail=f"Missing required columns: {missing}")
-
-        # Keep only necessary columns
-        df = df[list(required_cols)]
-
-        # Insert into DB
-        with get_connection() as conn:
-            with conn.cursor() as cur:
-                for _, row in df.iterrows():
-                    cur.execute(
-                        """
-                        INSERT INTO portfolio (user_id, stock_name, ticker, quantity)
-                        VALUES (%s, %s, %s, %s);
-                        """,
-                        (user_id, row["stock_name"], row["ticker"], int(row["quantity"])),
-                    )
-            conn.commit()
-
-        return {"message": "Portfolio uploaded successfully", "rows_inserted": len(df)}
+        # Stage to local disk in chunks so large files never sit in memory
+        os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
+        path = os.path.join(settings.UPLOAD_DIR, f"{uuid.uuid4().hex}{os.path.splitext(file.filename)[1]}")
+        with open(path, "wb") as staged:
+            while chunk := await file.read(1024 * 1024):
+                staged.write(chunk)
+
+        try:
+            job_id = create_upload_job(user_id, file.filename, path, owner=upload_worker.owner)
+        except Exception:
+            # No job row points at the file, so nothing else would remove it
+            os.remove(path)
+            raise
+        upload_worker.submit(job_id, user_id, path)
+
+        return {
+            "message": "Portfolio upload queued",
+            "job_id": job_id,
+            "status_url": f"/portfolio/uploads/{job_id}",
+        }
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/uploads/{job_id}")
+def get_upload_status(job_id: int):
+    """
+    Reports an upload job's progress.
+    - status: queued, parsing, loading, succeeded or failed
+    - rows_processed, rows_rejected (with reasons) and rows_per_second
+    - version is set once the new holdings are live
+    """
+    job = get_upload_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Upload job not found.")
+    return job
+
+
+@router.get("/{user_id}/value")
+def get_portfolio_value(user_id: int):
+    """
+    Returns the stored portfolio total for a user.
+    Totals are kept current from price snapshots, so no quotes are fetched here.
+    """
+    valuation = get_valuation(user_id)
+    if valuation is None:
+        raise HTTPException(status_code=404, detail="No valuation found for this user.")
+    return valuation
+
+
+@router.get("/{user_id}/tax-analysis")
+def get_portfolio_tax_analysis(user_id: int):
+    """
+    Returns the selling-strategy analysis produced by the nightly batch.
+    """
+    analysis = get_tax_analysis(user_id)
+    if analysis is None:
+        raise HTTPException(status_code=404, detail="No tax analysis stored for this user yet.")
+    return analysis
+
+
+@router.get("/{user_id}/risk")
+def get_portfolio_risk(
+    user_id: int,
+    lookback_days: int = Query(252, ge=20, le=2520),
+    confidence: float = Query(0.95, gt=0.5, lt=1),
+):
+    """
+    Volatility, one-day historical VaR/CVaR, maximum drawdown and
+    concentration of the current holdings.
+    - Computed from the daily closes in the price store and weighted at the latest close
+    - Holdings without enough stored history are listed under "excluded"
+    """
+    quantities = get_current_quantities(user_id)
+    if not quantities:
+        raise HTTPException(status_code=404, detail="No portfolio found for this user.")
+    risk = RiskEngine().analyse(quantities, lookback_days=lookback_days, confidence=confidence)
+    if risk is None:
+        raise HTTPException(status_code=404, detail="Not enough price history for these holdings.")
+    return risk
+
+
+@router.get("/export")
+def export_portfolios(
+    format: Literal["csv", "parquet"] = "csv",
+    user_id_min: int | None = None,
+    user_id_max: int | None = None,
+    as_of: date | None = None,
+):
+    """
+    Streams every user's holdings with prices, market values and recommendations.
+    - Filter by user ID range and/or price snapshot date (as_of)
+    - Rows are read and sent in chunks, so memory stays flat for any table size
+    """
+    if user_id_min is not None and user_id_max is not None and user_id_min > user_id_max:
+        raise HTTPException(status_code=400, detail="user_id_min must not exceed user_id_max")
+
+    chunks = iter_export_chunks(user_id_min, user_id_max, as_of)
+    suffix = as_of.isoformat() if as_of else "latest"
+    if format == "parquet":
+        body, media_type = stream_parquet(chunks), "application/vnd.apache.parquet"
+    else:
+        body, media_type = stream_csv(chunks), "text/csv"
+
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="portfolio_export_{suffix}.{format}"'},
+    )
+
+
+class WithdrawalPlanRequest(BaseModel):
+    ira_balance: float = Field(..., ge=0)
+    annual_spending: float = Field(..., ge=0)
+    roth_balance: float = Field(0, ge=0)
+    other_income: float = Field(0, ge=0)
+    filing_status: Literal["single", "married_joint", "married_separate", "head_of_household"] = "single"
+    growth_rate: float = 0.05
+    inflation: float = 0.025
+    heir_tax_rate: float = Field(0.24, ge=0, le=1)
+    horizon_years: int = Field(30, ge=1, le=50)
+    extra_spending: dict[int, float] = Field(default_factory=dict, description="One-off spending by plan year")
+    time_budget_seconds: float = Field(2.0, gt=0, le=30)
+
+
+@router.post("/{user_id}/withdrawal-plan")
+def plan_withdrawals(user_id: int, request: WithdrawalPlanRequest):
+    """
+    Year-by-year plan of which accounts and lots to draw from to meet
+    spending and RMDs at the lowest lifetime tax.
+    - Taxable lots come from the current portfolio at live prices
+    - Re-submitting with edited later-year inputs re-uses the cached solution
+    """
+    params = request.model_dump()
+    params["extra_spending"] = tuple(sorted(params["extra_spending"].items()))
+    plan = TaxAdvisor(settings.OPENAI_API_KEY).plan_withdrawals(user_id, **params)
+    if "error" in plan:
+        raise HTTPException(status_code=400, detail=plan["error"])
+    return plan
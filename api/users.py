@@ -1,6 +1,8 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Header, HTTPException, Response
 from pydantic import BaseModel, EmailStr, Field
-from db.connection import get_connection
+from db.users import create_user, get_user, get_user_by_email, user_etag
+from tools.portfolio_warmer import portfolio_warmer
+from config.settings import settings
 import psycopg2
 
 router = APIRouter(prefix="/users", tags=["users"])
@@ -16,80 +18,58 @@ class UserCreate(BaseModel):
 @router.post("/register")
 def register_user(user: UserCreate):
     """Register a new user."""
-    with get_connection() as conn:
-        with conn.cursor() as cur:
-            # Check if the email already exists
-            cur.execute("SELECT id FROM users WHERE email = %s;", (user.email,))
-            if cur.fetchone():
-                raise HTTPException(status_code=409, detail="Email already registered. Please log in instead.")
-
-            try:
-                cur.execute(
-                    """
-                    INSERT INTO users (email, first_name, last_name, age)
-                    VALUES (%s, %s, %s, %s)
-                    RETURNING id;
-                    """,
-                    (user.email, user.first_name, user.last_name, user.age),
-                )
-                user_id = cur.fetchone()[0]
-                conn.commit()
-                return {"message": "User registered successfully", "user_id": user_id}
-            except psycopg2.Error as e:
-                conn.rollback()
-                raise HTTPException(status_code=400, detail=f"Database error: {e.pgerror}")
-            except Exception as e:
-                conn.rollback()
-                raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
+    try:
+        created = create_user(user.email, user.first_name, user.last_name, user.age)
+    except psycopg2.Error as e:
+        raise HTTPException(status_code=400, detail=f"Database error: {e.pgerror}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
+
+    if created is None:
+        raise HTTPException(status_code=409, detail="Email already registered. Please log in instead.")
+    return {"message": "User registered successfully", "user_id": created["user_id"]}
 
 
 class UserLogin(BaseModel):
     email: EmailStr
+    warm_up: bool = True
 
 
 @router.post("/login")
 def login_user(user: UserLogin):
     """Log in an existing user."""
-    with get_connection() as conn:
-        with conn.cursor() as cur:
-            cur.execute(
-                "SELECT id, first_name, last_name, age FROM users WHERE email = %s;",
-                (user.email,),
-            )
-            result = cur.fetchone()
+    user_data = get_user_by_email(user.email)
+    if not user_data:
+        raise HTTPException(status_code=404, detail="User not found. Please register first.")
+
+    # Warm caches in the background so the first chat starts hot
+    warm_up = user.warm_up and settings.LOGIN_WARMUP_ENABLED
+    if warm_up:
+        portfolio_warmer.schedule(user_data["user_id"])
 
-            if not result:
-                raise HTTPException(status_code=404, detail="User not found. Please register first.")
+    return {"message": "Login successful", "user": user_data, "warm_up": warm_up}
 
-            user_data = {
-                "user_id": result[0],
-                "first_name": result[1],
-                "last_name": result[2],
-                "age": result[3],
-                "email": user.email,
-            }
 
-            return {"message": "Login successful", "user": user_data}
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    # If-None-Match uses weak comparison: W/"x" matches "x"
+    tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return "*" in tags or etag in tags
 
 
 @router.get("/{user_id}")
-def get_user_by_id(user_id: int):
-    """Fetch user details by user_id (optional helper)."""
-    with get_connection() as conn:
-        with conn.cursor() as cur:
-            cur.execute(
-                "SELECT id, first_name, last_name, email, age FROM users WHERE id = %s;",
-                (user_id,),
-            )
-            result = cur.fetchone()
-
-            if not result:
-                raise HTTPException(status_code=404, detail="User not found.")
-
-            return {
-                "user_id": result[0],
-                "first_name": result[1],
-                "last_name": result[2],
-                "email": result[3],
-                "age": result[4],
-            }
+def get_user_by_id(user_id: int, response: Response, if_none_match: str | None = Header(None)):
+    """
+    Fetch user details by user_id (optional helper).
+    - Responses carry an ETag; send it back as If-None-Match to get a 304
+      when the profile has not changed
+    """
+    user = get_user(user_id)
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found.")
+
+    etag = user_etag(user)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if if_none_match and _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return user
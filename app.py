@@ -1,17 +1,40 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from api.users import router as users_router
 from api.portfolio import router as portfolio_router
 from api.chat import router as chat_router
+from api.middleware import ProfilingMiddleware, RequestIdMiddleware
+from config.settings import settings
+from tools.cache import warm_tiered_caches
+from tools.upload_worker import upload_worker
 from dotenv import load_dotenv
 load_dotenv()
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Start with the quotes, fundamentals and LLM answers cached by the previous process
+    loaded = warm_tiered_caches()
+    if loaded:
+        print(f"Warmed caches from disk: {loaded}")
+    # Heartbeats for this process's uploads, and recovery of jobs whose process stopped
+    upload_worker.start()
+    yield
+
+
 app = FastAPI(
     title="IRA-RMD Portfolio Advisor",
     description="Backend API for portfolio management, analysis, and chat with AI agents.",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
+app.add_middleware(RequestIdMiddleware)
+
+# Per-request profiling is opt-in; when disabled the middleware is not installed at all
+if settings.PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware)
+
 # Register routers
 app.include_router(users_router)
 app.include_router(portfolio_router)
@@ -12,4 +12,180 @@ class Settings:
             raise ValueError("OPENAI_API_KEY not found in environment or .env file.")
         return key
 
+    @property
+    def PRICE_CACHE_TTL_SECONDS(self):
+        return float(os.getenv("PRICE_CACHE_TTL_SECONDS", "60"))
+
+    @property
+    def PREFETCH_MAX_WORKERS(self):
+        return int(os.getenv("PREFETCH_MAX_WORKERS", "8"))
+
+    @property
+    def FUNDAMENTALS_CACHE_TTL_SECONDS(self):
+        return float(os.getenv("FUNDAMENTALS_CACHE_TTL_SECONDS", "900"))
+
+    @property
+    def LOGIN_WARMUP_ENABLED(self):
+        return os.getenv("LOGIN_WARMUP_ENABLED", "true").lower() in ("1", "true", "yes")
+
+    @property
+    def WARMUP_IDLE_TIMEOUT_SECONDS(self):
+        return float(os.getenv("WARMUP_IDLE_TIMEOUT_SECONDS", "120"))
+
+    @property
+    def STALE_CACHE_TTL_SECONDS(self):
+        return float(os.getenv("STALE_CACHE_TTL_SECONDS", "86400"))
+
+    @property
+    def DISK_CACHE_PATH(self):
+        return os.getenv("DISK_CACHE_PATH", "cache/cache.sqlite3")
+
+    @property
+    def DISK_CACHE_MAX_MB(self):
+        return float(os.getenv("DISK_CACHE_MAX_MB", "256"))
+
+    @property
+    def DISK_CACHE_COMPACT_EVERY(self):
+        return int(os.getenv("DISK_CACHE_COMPACT_EVERY", "1000"))
+
+    @property
+    def LLM_CACHE_TTL_SECONDS(self):
+        return float(os.getenv("LLM_CACHE_TTL_SECONDS", "3600"))
+
+    @property
+    def USER_CACHE_TTL_SECONDS(self):
+        return float(os.getenv("USER_CACHE_TTL_SECONDS", "300"))
+
+    @property
+    def CHAT_DEADLINE_SECONDS(self):
+        return float(os.getenv("CHAT_DEADLINE_SECONDS", "45"))
+
+    @property
+    def LLM_TIMEOUT_SECONDS(self):
+        return float(os.getenv("LLM_TIMEOUT_SECONDS", "30"))
+
+    @property
+    def LLM_MAX_ATTEMPTS(self):
+        return int(os.getenv("LLM_MAX_ATTEMPTS", "3"))
+
+    @property
+    def LLM_MAX_CONCURRENCY(self):
+        return int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+
+    @property
+    def LLM_HEDGE_PERCENTILE(self):
+        return float(os.getenv("LLM_HEDGE_PERCENTILE", "95"))
+
+    @property
+    def LLM_HEDGE_MIN_SAMPLES(self):
+        return int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+
+    @property
+    def LLM_MAX_HEDGES(self):
+        return int(os.getenv("LLM_MAX_HEDGES", "1"))
+
+    @property
+    def PORTFOLIO_VERSIONS_TO_KEEP(self):
+        return int(os.getenv("PORTFOLIO_VERSIONS_TO_KEEP", "2"))
+
+    @property
+    def CHAT_HISTORY_RETENTION_MONTHS(self):
+        return int(os.getenv("CHAT_HISTORY_RETENTION_MONTHS", "12"))
+
+    @property
+    def CHAT_ARCHIVE_DIR(self):
+        return os.getenv("CHAT_ARCHIVE_DIR", "archive/chat_history")
+
+    @property
+    def EXPORT_CHUNK_ROWS(self):
+        return int(os.getenv("EXPORT_CHUNK_ROWS", "5000"))
+
+    @property
+    def PRICE_STORE_DIR(self):
+        return os.getenv("PRICE_STORE_DIR", "market_data/prices")
+
+    @property
+    def PRICE_STORE_MAX_AGE_DAYS(self):
+        return int(os.getenv("PRICE_STORE_MAX_AGE_DAYS", "5"))
+
+    @property
+    def RISK_LOOKBACK_DAYS(self):
+        return int(os.getenv("RISK_LOOKBACK_DAYS", "252"))
+
+    @property
+    def RISK_CONFIDENCE(self):
+        return float(os.getenv("RISK_CONFIDENCE", "0.95"))
+
+    @property
+    def RISK_MIN_OBSERVATIONS(self):
+        return int(os.getenv("RISK_MIN_OBSERVATIONS", "60"))
+
+    @property
+    def RISK_CACHE_TTL_SECONDS(self):
+        return float(os.getenv("RISK_CACHE_TTL_SECONDS", "3600"))
+
+    @property
+    def UPLOAD_DIR(self):
+        return os.getenv("UPLOAD_DIR", "uploads")
+
+    @property
+    def UPLOAD_WORKERS(self):
+        return int(os.getenv("UPLOAD_WORKERS", "2"))
+
+    @property
+    def UPLOAD_PROGRESS_ROWS(self):
+        return int(os.getenv("UPLOAD_PROGRESS_ROWS", "1000"))
+
+    @property
+    def UPLOAD_HEARTBEAT_SECONDS(self):
+        return float(os.getenv("UPLOAD_HEARTBEAT_SECONDS", "30"))
+
+    @property
+    def UPLOAD_STALE_SECONDS(self):
+        return float(os.getenv("UPLOAD_STALE_SECONDS", "120"))
+
+    @property
+    def PROFILING_ENABLED(self):
+        return os.getenv("PROFILING_ENABLED", "false").lower() in ("1", "true", "yes")
+
+    @property
+    def PROFILE_HEADER(self):
+        return os.getenv("PROFILE_HEADER", "X-Profile")
+
+    @property
+    def PROFILE_SAMPLE_RATE(self):
+        return float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+
+    @property
+    def PROFILE_INTERVAL_MS(self):
+        return float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+
+    @property
+    def PROFILE_DIR(self):
+        return os.getenv("PROFILE_DIR", "profiles")
+
+    @property
+    def TRACING_EXPORTER(self):
+        return os.getenv("TRACING_EXPORTER", "none").lower()
+
+    @property
+    def TRACE_FILE(self):
+        return os.getenv("TRACE_FILE", "traces/spans.jsonl")
+
+    @property
+    def OTLP_ENDPOINT(self):
+        return os.getenv("OTLP_ENDPOINT", "http://127.0.0.1:4318")
+
+    @property
+    def TAX_BATCH_CHUNK_SIZE(self):
+        return int(os.getenv("TAX_BATCH_CHUNK_SIZE", "100"))
+
+    @property
+    def TAX_BATCH_CONCURRENCY(self):
+        return int(os.getenv("TAX_BATCH_CONCURRENCY", "8"))
+
+    @property
+    def TAX_HARVEST_LOSS_BAND(self):
+        return float(os.getenv("TAX_HARVEST_LOSS_BAND", "0.25"))
+
 settings = Settings()
@@ -0,0 +1,231 @@
+import base64
+import os
+from datetime import date, datetime
+import pyarrow as pa
+import pyarrow.parquet as pq
+from psycopg2 import sql
+from db.connection import get_connection
+from config.settings import settings
+
+ARCHIVE_SCHEMA = pa.schema([
+    ("id", pa.int64()),
+    ("user_id", pa.int32()),
+    ("role", pa.string()),
+    ("message", pa.string()),
+    ("created_at", pa.timestamp("us")),
+])
+
+
+def _month_start(day: date, offset: int = 0) -> date:
+    months = day.year * 12 + day.month - 1 + offset
+    return date(months // 12, months % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"chat_history_y{month.year}m{month.month:02d}"
+
+
+def ensure_partitions(cur, months_ahead: int = 2, today: date | None = None):
+    """
+    Creates monthly partitions from the current month to months_ahead ahead.
+    Partitions must exist before rows arrive, otherwise they land in the
+    default partition. If that has already happened (maintenance lapsed),
+    the month's rows are moved out of the default partition into the new
+    one before it is attached, since Postgres refuses to attach a range the
+    default partition still holds rows for.
+    """
+    current = _month_start(today or date.today())
+    for offset in range(months_ahead + 1):
+        start = _month_start(current, offset)
+        end = _month_start(current, offset + 1)
+        name = sql.Identifier(partition_name(start))
+        cur.execute("SELECT to_regclass(%s) IS NOT NULL;", (partition_name(start),))
+        if cur.fetchone()[0]:
+            continue
+        cur.execute(sql.SQL(
+            "CREATE TABLE {} (LIKE chat_history INCLUDING DEFAULTS INCLUDING CONSTRAINTS);"
+        ).format(name))
+        cur.execute(
+            sql.SQL("""
+                WITH moved AS (
+                    DELETE FROM chat_history_default
+                    WHERE created_at >= %s AND created_at < %s
+                    RETURNING *
+                )
+                INSERT INTO {} SELECT * FROM moved;
+            """).format(name),
+            (start, end),
+        )
+        cur.execute(
+            sql.SQL("ALTER TABLE chat_history ATTACH PARTITION {} FOR VALUES FROM (%s) TO (%s);").format(name),
+            (start, end),
+        )
+
+
+def insert_chat_turn(cur, user_id: int, user_message: str, assistant_message: str):
+    """Stores both sides of a chat turn in one round trip."""
+    cur.execute(
+        """
+        INSERT INTO chat_history (user_id, role, message)
+        VALUES (%s, 'user', %s), (%s, 'assistant', %s);
+        """,
+        (user_id, user_message, user_id, assistant_message),
+    )
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    return base64.urlsafe_b64encode(f"{created_at.isoformat()}|{row_id}".encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    created_at, _, row_id = base64.urlsafe_b64decode(cursor.encode()).decode().partition("|")
+    return datetime.fromisoformat(created_at), int(row_id)
+
+
+def fetch_history_page(user_id: int, cursor: str | None = None, limit: int = 20) -> dict:
+    """
+    Reads one page of a user's history, newest first, using keyset pagination.
+
+    Args:
+        user_id (int): The user's unique ID.
+        cursor (str | None): next_cursor from the previous page.
+        limit (int): Maximum messages to return.
+
+    Returns:
+        dict: Messages and the cursor for the next (older) page, or None at the end.
+    """
+    params: list = [user_id]
+    keyset = ""
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        keyset = "AND (created_at, id) < (%s, %s)"
+        params += [created_at, row_id]
+
+    with get_connection(read_only=True) as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                f"""
+                SELECT id, role, message, created_at
+                FROM chat_history
+                WHERE user_id = %s {keyset}
+                ORDER BY created_at DESC, id DESC
+                LIMIT %s;
+                """,
+                (*params, limit + 1),
+            )
+            rows = cur.fetchall()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    return {
+        "messages": [
+            {"id": r[0], "role": r[1], "content": r[2], "created_at": r[3]}
+            for r in rows
+        ],
+        "next_cursor": encode_cursor(rows[-1][3], rows[-1][0]) if has_more else None,
+    }
+
+
+def _export_rows(conn, table: str, archive_path: str, where: str = "", params: tuple = ()) -> int:
+    """Streams rows from a table to a zstd-compressed Parquet file with a server-side cursor."""
+    written = 0
+    tmp_path = f"{archive_path}.tmp"
+    with conn.cursor(name=f"export_{table}") as cur:
+        cur.itersize = 10_000
+        cur.execute(
+            sql.SQL("SELECT id, user_id, role, message, created_at FROM {} {} ORDER BY created_at, id;").format(
+                sql.Identifier(table), sql.SQL(where)
+            ),
+            params,
+        )
+        with pq.ParquetWriter(tmp_path, ARCHIVE_SCHEMA, compression="zstd") as writer:
+            while True:
+                rows = cur.fetchmany(cur.itersize)
+                if not rows:
+                    break
+                columns = list(zip(*rows))
+                writer.write_table(pa.Table.from_arrays(
+                    [pa.array(col, type=field.type) for col, field in zip(columns, ARCHIVE_SCHEMA)],
+                    schema=ARCHIVE_SCHEMA,
+                ))
+                written += len(rows)
+    os.replace(tmp_path, archive_path)
+    return written
+
+
+def archive_old_partitions(
+    retention_months: int | None = None,
+    archive_dir: str | None = None,
+    today: date | None = None,
+) -> list[dict]:
+    """
+    Archives and drops monthly partitions older than the retention window.
+
+    Each expired partition is exported to a Parquet file while writes to it
+    are blocked, and only once the file is in place is it detached and
+    dropped, in the same transaction. If the export fails the partition is
+    left attached for the next run. Month tables left detached by an
+    interrupted run are picked up too. Expired rows that landed in the
+    default partition are exported and deleted the same way.
+
+    Returns:
+        list[dict]: One entry per archive file written.
+    """
+    retention_months = settings.CHAT_HISTORY_RETENTION_MONTHS if retention_months is None else retention_months
+    archive_dir = archive_dir or settings.CHAT_ARCHIVE_DIR
+    os.makedirs(archive_dir, exist_ok=True)
+    cutoff = _month_start(today or date.today(), -retention_months)
+    archived = []
+
+    with get_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("""
+                SELECT c.relname, i.inhrelid IS NOT NULL
+                FROM pg_class c
+                LEFT JOIN pg_inherits i
+                  ON i.inhrelid = c.oid AND i.inhparent = 'chat_history'::regclass
+                WHERE c.relkind = 'r'
+                  AND pg_table_is_visible(c.oid)
+                  AND c.relname ~ '^chat_history_y[0-9]{4}m[0-9]{2}$';
+            """)
+            tables = sorted(cur.fetchall())
+        conn.commit()
+
+        for name, attached in tables:
+            if not _is_expired(name, cutoff):
+                continue
+
+            path = os.path.join(archive_dir, f"{name}.parquet")
+            try:
+                with conn.cursor() as cur:
+                    cur.execute(sql.SQL("LOCK TABLE {} IN SHARE MODE;").format(sql.Identifier(name)))
+                rows = _export_rows(conn, name, path)
+                with conn.cursor() as cur:
+                    if attached:
+                        cur.execute(sql.SQL("ALTER TABLE chat_history DETACH PARTITION {};").format(sql.Identifier(name)))
+                    cur.execute(sql.SQL("DROP TABLE {};").format(sql.Identifier(name)))
+                conn.commit()
+            except Exception as e:
+                conn.rollback()
+                print(f"Error archiving {name}, left in place: {e}")
+                continue
+            archived.append({"partition": name, "rows": rows, "path": path})
+
+        path = os.path.join(archive_dir, f"chat_history_default_before_{cutoff.isoformat()}.parquet")
+        rows = _export_rows(conn, "chat_history_default", path, "WHERE created_at < %s", (cutoff,))
+        if rows:
+            with conn.cursor() as cur:
+                cur.execute("DELETE FROM chat_history_default WHERE created_at < %s;", (cutoff,))
+            conn.commit()
+            archived.append({"partition": "chat_history_default", "rows": rows, "path": path})
+        else:
+            conn.rollback()
+            os.remove(path)
+
+    return archived
+
+
+def _is_expired(name: str, cutoff: date) -> bool:
+    """Whether a chat_history_yYYYYmMM table holds only months before cutoff."""
+    month = date(int(name[14:18]), int(name[19:21]), 1)
+    return _month_start(month, 1) <= cutoff
@@ -1,5 +1,8 @@
 import os
 import json
+import itertools
+import threading
+import time
 import psycopg2
 from contextlib import contextmanager
 from dotenv import load_dotenv
@@ -7,6 +10,20 @@ from dotenv import load_dotenv
 # Load environment variables from .env if present
 load_dotenv()
 
+# Replication lag in seconds; 0 when the replica has replayed everything it received
+REPLICA_LAG_SQL = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM NOW() - pg_last_xact_replay_timestamp()), 0)
+    END;
+"""
+
+_replica_state: dict[str, dict] = {}
+_replica_lock = threading.Lock()
+_round_robin = itertools.count()
+
+
 def load_dbconfig(file_path: str = "config/db.json") -> dict:
     """Load database configuration from JSON (for local development)."""
     try:
@@ -15,26 +32,101 @@ def load_dbconfig(file_path: str = "config/db.json") -> dict:
     except FileNotFoundError:
         return {}
 
+
+def _connect_primary():
+    db_url = os.getenv("DATABASE_URL")
+
+    if db_url:
+        return psycopg2.connect(db_url)
+
+    config = load_dbconfig()
+    return psycopg2.connect(
+        database=config.get("name"),
+        user=config.get("user"),
+        password=config.get("password"),
+        host=config.get("host"),
+        port=config.get("port"),
+    )
+
+
+def replica_dsns() -> list[str]:
+    """Replica DSNs from DATABASE_REPLICA_URLS (comma-separated)."""
+    return [u.strip() for u in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if u.strip()]
+
+
+def _connect_replica():
+    """
+    Connects to the next usable replica, or returns None.
+
+    Replicas are tried round-robin. A replica whose lag exceeds
+    MAX_REPLICA_LAG_SECONDS, or that refuses connections, is skipped for
+    REPLICA_RETRY_SECONDS. Lag is re-measured at most every
+    REPLICA_LAG_CHECK_SECONDS per replica, on the connection being handed out.
+    """
+    dsns = replica_dsns()
+    if not dsns:
+        return None
+
+    max_lag = float(os.getenv("MAX_REPLICA_LAG_SECONDS", "2"))
+    check_every = float(os.getenv("REPLICA_LAG_CHECK_SECONDS", "5"))
+    retry_after = float(os.getenv("REPLICA_RETRY_SECONDS", "30"))
+    start = next(_round_robin)
+
+    for i in range(len(dsns)):
+        dsn = dsns[(start + i) % len(dsns)]
+        now = time.monotonic()
+        with _replica_lock:
+            state = _replica_state.setdefault(dsn, {"checked_at": 0.0, "skip_until": 0.0})
+            if state["skip_until"] > now:
+                continue
+            needs_check = now - state["checked_at"] >= check_every
+
+        try:
+            conn = psycopg2.connect(dsn, connect_timeout=2)
+        except psycopg2.Error as e:
+            print(f"Replica unavailable, skipping for {retry_after}s: {e}")
+            with _replica_lock:
+                state["skip_until"] = now + retry_after
+            continue
+
+        if needs_check:
+            try:
+                with conn.cursor() as cur:
+                    cur.execute(REPLICA_LAG_SQL)
+                    lag = float(cur.fetchone()[0])
+                conn.rollback()
+            except psycopg2.Error:
+                lag = float("inf")
+
+            with _replica_lock:
+                state["checked_at"] = now
+                if lag > max_lag:
+                    state["skip_until"] = now + check_every
+            if lag > max_lag:
+                conn.close()
+                continue
+
+        return conn
+
+    return None
+
+
 @contextmanager
-def get_connection():
+def get_connection(read_only: bool = False):
     """
     Context manager for PostgreSQL connection.
     Prioritises DATABASE_URL (for NeonDB or EC2),
     falls back to local db.json if not found.
-    """
-    db_url = os.getenv("DATABASE_URL")
 
-    if db_url:
-        conn = psycopg2.connect(db_url)
-    else:
-        config = load_dbconfig()
-        conn = psycopg2.connect(
-            database=config.get("name"),
-            user=config.get("user"),
-            password=config.get("password"),
-            host=config.get("host"),
-            port=config.get("port"),
-        )
+    With read_only=True the connection comes from a replica in
+    DATABASE_REPLICA_URLS when one is reachable and not lagging, otherwise
+    from the primary. Either way the session is read-only.
+    """
+    conn = _connect_replica() if read_only else None
+    if conn is None:
+        conn = _connect_primary()
+    if read_only:
+        conn.set_session(readonly=True)
 
     try:
         yield conn
@@ -0,0 +1,129 @@
+import csv
+import io
+from datetime import date, datetime, time, timedelta
+from typing import Iterable, Iterator
+import pyarrow as pa
+import pyarrow.parquet as pq
+from db.connection import get_connection
+from config.settings import settings
+
+EXPORT_SCHEMA = pa.schema([
+    ("user_id", pa.int32()),
+    ("ticker", pa.string()),
+    ("stock_name", pa.string()),
+    ("quantity", pa.int64()),
+    ("price", pa.float64()),
+    ("price_at", pa.timestamp("us")),
+    ("market_value", pa.float64()),
+    ("recommendation", pa.string()),
+])
+
+EXPORT_SQL = """
+    SELECT p.user_id, UPPER(p.ticker), p.stock_name, p.quantity,
+           s.price::float8, s.captured_at, (p.quantity * s.price)::float8, p.recommendation
+    FROM current_portfolio p
+    LEFT JOIN LATERAL (
+        SELECT price, captured_at FROM price_snapshots
+        WHERE ticker = UPPER(p.ticker)
+          AND (%(before)s IS NULL OR captured_at < %(before)s)
+        ORDER BY captured_at DESC
+        LIMIT 1
+    ) s ON TRUE
+    WHERE (%(user_min)s IS NULL OR p.user_id >= %(user_min)s)
+      AND (%(user_max)s IS NULL OR p.user_id <= %(user_max)s)
+    ORDER BY p.user_id, UPPER(p.ticker);
+"""
+
+
+def iter_export_chunks(
+    user_id_min: int | None = None,
+    user_id_max: int | None = None,
+    as_of: date | None = None,
+    chunk_size: int | None = None,
+) -> Iterator[list[tuple]]:
+    """
+    Reads holdings with their prices and recommendations in fixed-size chunks.
+
+    A server-side cursor keeps client memory bounded by chunk_size however
+    many rows match.
+
+    Args:
+        user_id_min (int | None): Lowest user ID to include.
+        user_id_max (int | None): Highest user ID to include.
+        as_of (date | None): Value holdings at the last snapshot taken on or
+            before this date. Latest prices when omitted.
+        chunk_size (int | None): Rows per chunk.
+
+    Yields:
+        list[tuple]: Rows ordered as EXPORT_SCHEMA.
+    """
+    chunk_size = chunk_size or settings.EXPORT_CHUNK_ROWS
+    params = {
+        "user_min": user_id_min,
+        "user_max": user_id_max,
+        "before": datetime.combine(as_of + timedelta(days=1), time.min) if as_of else None,
+    }
+    with get_connection(read_only=True) as conn:
+        with conn.cursor(name="portfolio_export") as cur:
+            cur.itersize = chunk_size
+            cur.execute(EXPORT_SQL, params)
+            while True:
+                rows = cur.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield rows
+
+
+def stream_csv(chunks: Iterable[list[tuple]]) -> Iterator[str]:
+    """Encodes chunks as CSV text, one piece per chunk, header first."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_SCHEMA.names)
+    for rows in chunks:
+        writer.writerows(rows)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file that hands back what was written since the last drain."""
+
+    def __init__(self):
+        self._parts: list[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._parts.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        # Parquet records row group offsets from tell(), so count every byte ever written
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._parts)
+        self._parts.clear()
+        return data
+
+
+def stream_parquet(chunks: Iterable[list[tuple]]) -> Iterator[bytes]:
+    """Encodes chunks as a Parquet file, one row group per chunk."""
+    sink = _ChunkSink()
+    with pq.ParquetWriter(sink, EXPORT_SCHEMA, compression="zstd") as writer:
+        for rows in chunks:
+            columns = list(zip(*rows))
+            writer.write_table(pa.Table.from_arrays(
+                [pa.array(col, type=field.type) for col, field in zip(columns, EXPORT_SCHEMA)],
+                schema=EXPORT_SCHEMA,
+            ))
+            data = sink.drain()
+            if data:
+                yield data
+    yield sink.drain()
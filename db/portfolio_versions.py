@@ -0,0 +1,136 @@
+from psycopg2.extras import execute_values
+from db.connection import get_connection
+from config.settings import settings
+
+PORTFOLIO_COLUMNS = ("stock_name", "ticker", "quantity", "buy_price", "holding_period_months")
+
+ARCHIVE_COLUMNS = (
+    "id, user_id, version_id, stock_name, ticker, quantity, "
+    "buy_price, holding_period_months, recommendation, uploaded_at"
+)
+
+
+def create_portfolio_version(user_id: int, rows: list[tuple]) -> dict:
+    """
+    Stores an upload as a new portfolio version and makes it current.
+
+    The rows are bulk-inserted and the current-version flag is switched in
+    the same transaction, so readers see either the old or the new holdings,
+    never a mix.
+
+    Args:
+        user_id (int): Owner of the portfolio.
+        rows (list[tuple]): Holdings ordered as PORTFOLIO_COLUMNS.
+
+    Returns:
+        dict: The new version number, its ID and the number of rows stored.
+    """
+    with get_connection() as conn:
+        try:
+            with conn.cursor() as cur:
+                # Serialise uploads per user so version numbers never collide
+                cur.execute("SELECT pg_advisory_xact_lock(%s);", (user_id,))
+                cur.execute(
+                    "SELECT COALESCE(MAX(version), 0) + 1 FROM portfolio_versions WHERE user_id = %s;",
+                    (user_id,),
+                )
+                version = cur.fetchone()[0]
+                cur.execute(
+                    """
+                    INSERT INTO portfolio_versions (user_id, version, row_count)
+                    VALUES (%s, %s, %s)
+                    RETURNING id;
+                    """,
+                    (user_id, version, len(rows)),
+                )
+                version_id = cur.fetchone()[0]
+
+                execute_values(
+                    cur,
+                    f"INSERT INTO portfolio (user_id, version_id, {', '.join(PORTFOLIO_COLUMNS)}) VALUES %s;",
+                    [(user_id, version_id, *row) for row in rows],
+                    page_size=1000,
+                )
+
+                # Two statements: the partial unique index on is_current is checked
+                # per row, so flipping both rows in one UPDATE can briefly see two
+                cur.execute(
+                    "UPDATE portfolio_versions SET is_current = FALSE WHERE user_id = %s AND is_current;",
+                    (user_id,),
+                )
+                cur.execute(
+                    "UPDATE portfolio_versions SET is_current = TRUE WHERE id = %s;",
+                    (version_id,),
+                )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+    return {"version": version, "version_id": version_id, "rows": len(rows)}
+
+
+def prune_portfolio_versions(user_id: int, keep: int | None = None) -> int:
+    """
+    Moves superseded versions out of the live portfolio table.
+
+    The current version and the most recent `keep - 1` earlier versions stay
+    in place; older rows are copied to portfolio_archive and deleted.
+
+    Returns:
+        int: Number of rows archived.
+    """
+    keep = settings.PORTFOLIO_VERSIONS_TO_KEEP if keep is None else keep
+    with get_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                SELECT id FROM portfolio_versions
+                WHERE user_id = %s AND archived_at IS NULL
+                ORDER BY is_current DESC, version DESC
+                OFFSET %s;
+                """,
+                (user_id, max(keep, 1)),
+            )
+            stale_ids = [r[0] for r in cur.fetchall()]
+            if not stale_ids:
+                return 0
+
+            cur.execute(
+                f"""
+                INSERT INTO portfolio_archive ({ARCHIVE_COLUMNS})
+                SELECT {ARCHIVE_COLUMNS} FROM portfolio WHERE version_id = ANY(%s);
+                """,
+                (stale_ids,),
+            )
+            cur.execute("DELETE FROM portfolio WHERE version_id = ANY(%s);", (stale_ids,))
+            archived = cur.rowcount
+            cur.execute(
+                "UPDATE portfolio_versions SET archived_at = NOW() WHERE id = ANY(%s);",
+                (stale_ids,),
+            )
+        conn.commit()
+    return archived
+
+
+def prune_portfolio_versions_quietly(user_id: int):
+    """Background-task wrapper: pruning failures must not surface to the uploader."""
+    try:
+        prune_portfolio_versions(user_id)
+    except Exception as e:
+        print(f"Error pruning portfolio versions for user {user_id}: {e}")
+
+
+def get_current_quantities(user_id: int) -> dict[str, float]:
+    """Shares held per ticker in the user's current version, summed across lots."""
+    with get_connection(read_only=True) as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                SELECT UPPER(ticker), SUM(quantity) FROM current_portfolio
+                WHERE user_id = %s AND ticker IS NOT NULL
+                GROUP BY UPPER(ticker);
+                """,
+                (user_id,),
+            )
+            return {ticker: float(quantity or 0) for ticker, quantity in cur.fetchall()}
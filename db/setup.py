@@ -1,5 +1,12 @@
+import os
+import sys
 import psycopg2
-from connection import get_connection
+
+# Allow running as `python db/setup.py` or from inside db/
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from db.connection import get_connection
+from db.chat_history import ensure_partitions
 
 def create_tables():
     with get_connection() as conn:
@@ -24,22 +31,207 @@ def create_tables():
                     stock_name VARCHAR(255),
                     ticker VARCHAR(20),
                     quantity INT,
+                    buy_price NUMERIC(14, 4),
+                    holding_period_months INT,
                     recommendation TEXT,
                     uploaded_at TIMESTAMP DEFAULT NOW()
                 );
             """)
 
-            # Chat history table
+            # Cost basis columns used by the tax agents (for tables created before they existed)
             cur.execute("""
-                CREATE TABLE IF NOT EXISTS chat_history (
+                ALTER TABLE portfolio
+                    ADD COLUMN IF NOT EXISTS buy_price NUMERIC(14, 4),
+                    ADD COLUMN IF NOT EXISTS holding_period_months INT;
+            """)
+
+            # Portfolio versions: each upload is one version, readers see only the current one
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS portfolio_versions (
                     id SERIAL PRIMARY KEY,
                     user_id INT REFERENCES users(id) ON DELETE CASCADE,
+                    version INT NOT NULL,
+                    is_current BOOLEAN NOT NULL DEFAULT FALSE,
+                    row_count INT,
+                    created_at TIMESTAMP DEFAULT NOW(),
+                    archived_at TIMESTAMP,
+                    UNIQUE (user_id, version)
+                );
+            """)
+            cur.execute("""
+                CREATE UNIQUE INDEX IF NOT EXISTS idx_portfolio_versions_current
+                ON portfolio_versions (user_id) WHERE is_current;
+            """)
+            cur.execute("""
+                ALTER TABLE portfolio
+                    ADD COLUMN IF NOT EXISTS version_id INT REFERENCES portfolio_versions(id) ON DELETE CASCADE;
+            """)
+            cur.execute("CREATE INDEX IF NOT EXISTS idx_portfolio_version ON portfolio (version_id);")
+
+            # Rows uploaded before versioning become version 1 of each user's portfolio
+            cur.execute("""
+                INSERT INTO portfolio_versions (user_id, version, is_current, row_count)
+                SELECT user_id, 1, TRUE, COUNT(*)
+                FROM portfolio
+                WHERE version_id IS NULL AND user_id IS NOT NULL
+                  AND user_id NOT IN (SELECT user_id FROM portfolio_versions)
+                GROUP BY user_id;
+            """)
+            cur.execute("""
+                UPDATE portfolio p SET version_id = v.id
+                FROM portfolio_versions v
+                WHERE p.version_id IS NULL AND v.user_id = p.user_id AND v.version = 1;
+            """)
+
+            # Superseded versions are moved here by the background pruner
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS portfolio_archive (
+                    LIKE portfolio INCLUDING DEFAULTS,
+                    archived_at TIMESTAMP DEFAULT NOW()
+                );
+            """)
+
+            # What every reader queries: the current version of each user's holdings
+            cur.execute("""
+                CREATE OR REPLACE VIEW current_portfolio AS
+                SELECT p.*
+                FROM portfolio p
+                JOIN portfolio_versions v ON v.id = p.version_id
+                WHERE v.is_current;
+            """)
+
+            # Chat history table, range-partitioned by month (see db/chat_history.py)
+            cur.execute("SELECT relkind FROM pg_class WHERE relname = 'chat_history';")
+            existing = cur.fetchone()
+            if existing and existing[0] == "r":
+                # Unpartitioned table from an earlier release; its rows are copied over below
+                cur.execute("ALTER TABLE chat_history RENAME TO chat_history_legacy;")
+
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS chat_history (
+                    id BIGSERIAL,
+                    user_id INT REFERENCES users(id) ON DELETE CASCADE,
                     message TEXT NOT NULL,
                     role VARCHAR(10) CHECK (role IN ('user', 'assistant')),
+                    created_at TIMESTAMP NOT NULL DEFAULT NOW(),
+                    PRIMARY KEY (id, created_at)
+                ) PARTITION BY RANGE (created_at);
+            """)
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS chat_history_default
+                PARTITION OF chat_history DEFAULT;
+            """)
+            cur.execute("""
+                CREATE INDEX IF NOT EXISTS idx_chat_history_user_time
+                ON chat_history (user_id, created_at DESC, id DESC);
+            """)
+            ensure_partitions(cur)
+
+            if existing and existing[0] == "r":
+                cur.execute("""
+                    INSERT INTO chat_history (user_id, message, role, created_at)
+                    SELECT user_id, message, role, COALESCE(created_at, NOW())
+                    FROM chat_history_legacy
+                    ORDER BY id;
+                """)
+                cur.execute("DROP TABLE chat_history_legacy;")
+
+            # Price snapshots (latest price per ticker is a backward scan of the PK)
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS price_snapshots (
+                    ticker VARCHAR(20) NOT NULL,
+                    price NUMERIC(14, 4) NOT NULL,
+                    captured_at TIMESTAMP NOT NULL DEFAULT NOW(),
+                    PRIMARY KEY (ticker, captured_at)
+                );
+            """)
+
+            # Incrementally maintained portfolio totals, one row per user
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS portfolio_valuations (
+                    user_id INT PRIMARY KEY REFERENCES users(id) ON DELETE CASCADE,
+                    total_value NUMERIC(18, 4) NOT NULL DEFAULT 0,
+                    updated_at TIMESTAMP DEFAULT NOW()
+                );
+            """)
+
+            # Ticker -> users index used to find who a price change affects
+            cur.execute("""
+                CREATE INDEX IF NOT EXISTS idx_portfolio_ticker_user
+                ON portfolio (UPPER(ticker), user_id) INCLUDE (quantity);
+            """)
+
+            # Nightly batch runs; last_user_id is the resume checkpoint
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS tax_batch_runs (
+                    id SERIAL PRIMARY KEY,
+                    started_at TIMESTAMP DEFAULT NOW(),
+                    finished_at TIMESTAMP,
+                    last_user_id INT NOT NULL DEFAULT 0,
+                    analysed INT NOT NULL DEFAULT 0,
+                    skipped INT NOT NULL DEFAULT 0,
+                    failed INT NOT NULL DEFAULT 0
+                );
+            """)
+
+            # Stored selling-strategy analyses, reused while the portfolio hash matches
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS tax_analyses (
+                    user_id INT PRIMARY KEY REFERENCES users(id) ON DELETE CASCADE,
+                    portfolio_hash CHAR(64) NOT NULL,
+                    analysis TEXT NOT NULL,
+                    run_id INT REFERENCES tax_batch_runs(id) ON DELETE SET NULL,
                     created_at TIMESTAMP DEFAULT NOW()
                 );
             """)
 
+            # Latest score per ticker with a hash of the inputs it was computed from
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS ticker_scores (
+                    ticker VARCHAR(20) PRIMARY KEY,
+                    inputs_hash CHAR(64) NOT NULL,
+                    score INT NOT NULL,
+                    recommendation TEXT NOT NULL,
+                    scored_at TIMESTAMP DEFAULT NOW()
+                );
+            """)
+            # Unlabelled holdings (fresh uploads) are found without scanning every row
+            cur.execute("""
+                CREATE INDEX IF NOT EXISTS idx_portfolio_unlabelled
+                ON portfolio (UPPER(ticker)) WHERE recommendation IS NULL;
+            """)
+
+            # Background upload jobs; the staged file is deleted once the job ends
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS upload_jobs (
+                    id SERIAL PRIMARY KEY,
+                    user_id INT REFERENCES users(id) ON DELETE CASCADE,
+                    filename TEXT NOT NULL,
+                    staged_path TEXT NOT NULL,
+                    status VARCHAR(10) NOT NULL DEFAULT 'queued'
+                        CHECK (status IN ('queued', 'parsing', 'loading', 'succeeded', 'failed')),
+                    rows_processed INT NOT NULL DEFAULT 0,
+                    rows_rejected INT NOT NULL DEFAULT 0,
+                    rejections JSONB NOT NULL DEFAULT '[]',
+                    version INT,
+                    error TEXT,
+                    created_at TIMESTAMP DEFAULT NOW(),
+                    started_at TIMESTAMP,
+                    finished_at TIMESTAMP
+                );
+            """)
+            cur.execute("CREATE INDEX IF NOT EXISTS idx_upload_jobs_user ON upload_jobs (user_id, id DESC);")
+            # The process holding a job in its queue, kept alive by a heartbeat; see UploadWorker
+            cur.execute("""
+                ALTER TABLE upload_jobs
+                    ADD COLUMN IF NOT EXISTS owner TEXT,
+                    ADD COLUMN IF NOT EXISTS heartbeat_at TIMESTAMP;
+            """)
+            cur.execute("""
+                CREATE INDEX IF NOT EXISTS idx_upload_jobs_unfinished
+                ON upload_jobs (heartbeat_at) WHERE status IN ('queued', 'parsing', 'loading');
+            """)
+
             conn.commit()
             print("All tables created successfully!")
 
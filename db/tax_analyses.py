@@ -0,0 +1,113 @@
+from psycopg2.extras import execute_values
+from db.connection import get_connection
+
+
+def get_stored_analysis(user_id: int, portfolio_hash: str) -> str | None:
+    """Returns the stored analysis if it was produced for this exact portfolio."""
+    try:
+        with get_connection(read_only=True) as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    "SELECT analysis FROM tax_analyses WHERE user_id = %s AND portfolio_hash = %s;",
+                    (user_id, portfolio_hash),
+                )
+                row = cur.fetchone()
+    except Exception as e:
+        print(f"Error reading stored tax analysis for user {user_id}: {e}")
+        return None
+    return row[0] if row else None
+
+
+def get_tax_analysis(user_id: int) -> dict | None:
+    """Reads a user's latest stored analysis with its timestamp."""
+    with get_connection(read_only=True) as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                "SELECT analysis, created_at FROM tax_analyses WHERE user_id = %s;",
+                (user_id,),
+            )
+            row = cur.fetchone()
+    if not row:
+        return None
+    return {"user_id": user_id, "analysis": row[0], "created_at": row[1]}
+
+
+def start_batch_run(resume: bool = True) -> tuple[int, int]:
+    """
+    Opens a batch run, or picks up the latest unfinished one.
+
+    Returns:
+        tuple[int, int]: The run ID and the last user ID already processed.
+    """
+    with get_connection() as conn:
+        with conn.cursor() as cur:
+            if resume:
+                cur.execute("""
+                    SELECT id, last_user_id FROM tax_batch_runs
+                    WHERE finished_at IS NULL
+                    ORDER BY id DESC
+                    LIMIT 1;
+                """)
+                row = cur.fetchone()
+                if row:
+                    return row[0], row[1]
+            cur.execute("INSERT INTO tax_batch_runs DEFAULT VALUES RETURNING id;")
+            run_id = cur.fetchone()[0]
+        conn.commit()
+    return run_id, 0
+
+
+def get_stored_hashes(cur, user_ids: list[int]) -> dict[int, str]:
+    cur.execute(
+        "SELECT user_id, portfolio_hash FROM tax_analyses WHERE user_id = ANY(%s);",
+        (list(user_ids),),
+    )
+    return dict(cur.fetchall())
+
+
+def save_chunk(cur, run_id: int, results: list[tuple], last_user_id: int, skipped: int, failed: int):
+    """
+    Upserts a chunk's analyses and advances the run checkpoint.
+    Call inside the caller's transaction so both land together.
+
+    Args:
+        results (list[tuple]): (user_id, portfolio_hash, analysis) rows.
+    """
+    if results:
+        execute_values(
+            cur,
+            """
+            INSERT INTO tax_analyses (user_id, portfolio_hash, analysis, run_id)
+            VALUES %s
+            ON CONFLICT (user_id) DO UPDATE
+                SET portfolio_hash = EXCLUDED.portfolio_hash,
+                    analysis = EXCLUDED.analysis,
+                    run_id = EXCLUDED.run_id,
+                    created_at = NOW();
+            """,
+            [(user_id, digest, analysis, run_id) for user_id, digest, analysis in results],
+        )
+    cur.execute(
+        """
+        UPDATE tax_batch_runs
+        SET last_user_id = %s, analysed = analysed + %s, skipped = skipped + %s, failed = failed + %s
+        WHERE id = %s;
+        """,
+        (last_user_id, len(results), skipped, failed, run_id),
+    )
+
+
+def finish_batch_run(run_id: int) -> dict:
+    with get_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                UPDATE tax_batch_runs SET finished_at = NOW()
+                WHERE id = %s
+                RETURNING analysed, skipped, failed;
+                """,
+                (run_id,),
+            )
+            analysed, skipped, failed = cur.fetchone()
+        conn.commit()
+    return {"run_id": run_id, "analysed": analysed, "skipped": skipped, "failed": failed}
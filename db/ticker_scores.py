@@ -0,0 +1,81 @@
+from psycopg2.extras import execute_values
+
+
+def get_ticker_scores(cur, tickers: list[str]) -> dict[str, tuple]:
+    """Stored (inputs_hash, score, recommendation) per ticker."""
+    cur.execute(
+        "SELECT ticker, inputs_hash, score, recommendation FROM ticker_scores WHERE ticker = ANY(%s);",
+        (list(tickers),),
+    )
+    return {ticker: (digest, score, rec) for ticker, digest, score, rec in cur.fetchall()}
+
+
+def save_ticker_scores(cur, rows: list[tuple]):
+    """
+    Upserts re-scored tickers.
+
+    Args:
+        rows (list[tuple]): (ticker, inputs_hash, score, recommendation) rows.
+    """
+    if not rows:
+        return
+    execute_values(
+        cur,
+        """
+        INSERT INTO ticker_scores (ticker, inputs_hash, score, recommendation)
+        VALUES %s
+        ON CONFLICT (ticker) DO UPDATE
+            SET inputs_hash = EXCLUDED.inputs_hash,
+                score = EXCLUDED.score,
+                recommendation = EXCLUDED.recommendation,
+                scored_at = NOW();
+        """,
+        rows,
+    )
+
+
+def apply_ticker_labels(cur, changed: list[str], user_id: int | None = None) -> int:
+    """
+    Copies stored labels onto current holdings whose label differs.
+
+    Labels are per ticker, so every holder of a re-scored ticker is
+    relabelled, whoever triggered the refresh; otherwise other users would
+    keep the old label once the stored hash matches again. Holdings not
+    labelled yet (fresh uploads) are swept too, only for user_id when given.
+    Rows already carrying the right label are not written.
+
+    Args:
+        changed (list[str]): Tickers whose label may have moved.
+        user_id (int | None): Limit the unlabelled sweep to one user's holdings.
+
+    Returns:
+        int: Number of portfolio rows updated.
+    """
+    updated = 0
+    if changed:
+        cur.execute(
+            """
+            UPDATE portfolio p
+            SET recommendation = s.recommendation
+            FROM ticker_scores s, portfolio_versions v
+            WHERE UPPER(p.ticker) = s.ticker
+              AND v.id = p.version_id AND v.is_current
+              AND s.ticker = ANY(%s)
+              AND p.recommendation IS DISTINCT FROM s.recommendation;
+            """,
+            (list(changed),),
+        )
+        updated += cur.rowcount
+    cur.execute(
+        """
+        UPDATE portfolio p
+        SET recommendation = s.recommendation
+        FROM ticker_scores s, portfolio_versions v
+        WHERE UPPER(p.ticker) = s.ticker
+          AND v.id = p.version_id AND v.is_current
+          AND p.recommendation IS NULL
+          AND (%s::int IS NULL OR p.user_id = %s);
+        """,
+        (user_id, user_id),
+    )
+    return updated + cur.rowcount
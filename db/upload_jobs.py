@@ -0,0 +1,179 @@
+import json
+from db.connection import get_connection
+
+# Rejected rows kept on the job for the status endpoint; the count covers all of them
+MAX_STORED_REJECTIONS = 50
+
+
+def create_upload_job(user_id: int, filename: str, staged_path: str, owner: str | None = None) -> int:
+    """Records a staged upload, owned by the process that will run it, and returns its job ID."""
+    with get_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                INSERT INTO upload_jobs (user_id, filename, staged_path, owner, heartbeat_at)
+                VALUES (%s, %s, %s, %s, NOW())
+                RETURNING id;
+                """,
+                (user_id, filename, staged_path, owner),
+            )
+            job_id = cur.fetchone()[0]
+        conn.commit()
+    return job_id
+
+
+def update_upload_job(job_id: int, status: str, rows_processed: int, rejections: list[dict]):
+    """
+    Reports progress on a running job.
+
+    Args:
+        status (str): "parsing" or "loading".
+        rows_processed (int): Rows read so far, accepted or not.
+        rejections (list[dict]): Every row rejected so far, as {"row", "reason"}.
+    """
+    with get_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                UPDATE upload_jobs
+                SET status = %s,
+                    rows_processed = %s,
+                    rows_rejected = %s,
+                    rejections = %s,
+                    started_at = COALESCE(started_at, NOW()),
+                    heartbeat_at = NOW()
+                WHERE id = %s;
+                """,
+                (status, rows_processed, len(rejections), json.dumps(rejections[:MAX_STORED_REJECTIONS]), job_id),
+            )
+        conn.commit()
+
+
+def finish_upload_job(job_id: int, version: int | None = None, error: str | None = None):
+    """Marks a job succeeded with the version it created, or failed with an error."""
+    with get_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                UPDATE upload_jobs
+                SET status = %s, version = %s, error = %s,
+                    started_at = COALESCE(started_at, NOW()),
+                    finished_at = NOW()
+                WHERE id = %s;
+                """,
+                ("failed" if error else "succeeded", version, error, job_id),
+            )
+        conn.commit()
+
+
+def heartbeat_upload_jobs(owner: str) -> int:
+    """Marks every unfinished job owned by owner as still alive; returns how many there are."""
+    with get_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                UPDATE upload_jobs SET heartbeat_at = NOW()
+                WHERE owner = %s AND status IN ('queued', 'parsing', 'loading');
+                """,
+                (owner,),
+            )
+            alive = cur.rowcount
+        conn.commit()
+    return alive
+
+
+def recover_upload_jobs(owner: str, stale_seconds: float, error: str) -> list[tuple]:
+    """
+    Claims the unfinished jobs whose owner has stopped sending heartbeats.
+
+    Claimed jobs move to owner in one statement, so two processes recovering
+    at once never take the same job, and jobs of live processes are never
+    touched. Jobs that had started parsing or loading are marked failed with
+    error, since a retry could repeat whatever stopped the old owner. Jobs
+    still queued are left for the caller to resubmit.
+
+    Args:
+        owner (str): The claiming process.
+        stale_seconds (float): Heartbeat age after which an owner is presumed dead.
+        error (str): Reason recorded on interrupted jobs.
+
+    Returns:
+        list[tuple]: (job_id, user_id, staged_path, status) of every job claimed.
+    """
+    with get_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                UPDATE upload_jobs
+                SET owner = %s, heartbeat_at = NOW()
+                WHERE id IN (
+                    SELECT id FROM upload_jobs
+                    WHERE status IN ('queued', 'parsing', 'loading')
+                      AND (heartbeat_at IS NULL OR heartbeat_at < NOW() - make_interval(secs => %s))
+                    ORDER BY id
+                    FOR UPDATE SKIP LOCKED
+                )
+                RETURNING id, user_id, staged_path, status;
+                """,
+                (owner, stale_seconds),
+            )
+            jobs = sorted(cur.fetchall())
+            interrupted = [job[0] for job in jobs if job[3] != "queued"]
+            if interrupted:
+                cur.execute(
+                    """
+                    UPDATE upload_jobs
+                    SET status = 'failed', error = %s,
+                        started_at = COALESCE(started_at, NOW()),
+                        finished_at = NOW()
+                    WHERE id = ANY(%s);
+                    """,
+                    (error, interrupted),
+                )
+        conn.commit()
+    return jobs
+
+
+def get_upload_job(job_id: int) -> dict | None:
+    """
+    Reads a job's status with its throughput in rows per second.
+
+    Throughput is measured from the start of processing to the finish, or to
+    now while the job is still running.
+    """
+    # Polled while the job runs, so read the primary rather than a lagging replica
+    with get_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                SELECT user_id, filename, status, rows_processed, rows_rejected, rejections,
+                       version, error, created_at, started_at, finished_at,
+                       EXTRACT(EPOCH FROM (COALESCE(finished_at, NOW()) - started_at))
+                FROM upload_jobs
+                WHERE id = %s;
+                """,
+                (job_id,),
+            )
+            row = cur.fetchone()
+    if not row:
+        return None
+
+    (user_id, filename, status, processed, rejected, rejections,
+     version, error, created_at, started_at, finished_at, elapsed) = row
+    elapsed = float(elapsed) if elapsed is not None else None
+    return {
+        "job_id": job_id,
+        "user_id": user_id,
+        "filename": filename,
+        "status": status,
+        "rows_processed": processed,
+        "rows_rejected": rejected,
+        "rejections": rejections,
+        "rows_per_second": round(processed / elapsed, 1) if elapsed else None,
+        "elapsed_seconds": round(elapsed, 3) if elapsed is not None else None,
+        "version": version,
+        "error": error,
+        "created_at": created_at,
+        "started_at": started_at,
+        "finished_at": finished_at,
+    }
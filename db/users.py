@@ -0,0 +1,101 @@
+import hashlib
+import json
+from db.connection import get_connection
+from tools.cache import TTLCache
+from config.settings import settings
+
+# Users are read on every chat and login but almost never change. Misses are
+# not cached, so a user registered through another process is seen at once.
+user_cache = TTLCache(ttl_seconds=settings.USER_CACHE_TTL_SECONDS)
+
+USER_COLUMNS = "id, first_name, last_name, email, age"
+
+
+def _to_user(row) -> dict:
+    return {
+        "user_id": row[0],
+        "first_name": row[1],
+        "last_name": row[2],
+        "email": row[3],
+        "age": row[4],
+    }
+
+
+def _remember(user: dict) -> dict:
+    user_cache.set(("id", user["user_id"]), user)
+    user_cache.set(("email", user["email"]), user)
+    return dict(user)
+
+
+def get_user(user_id: int) -> dict | None:
+    """Returns the user's profile, from the cache when possible."""
+    user = user_cache.get(("id", user_id))
+    if user is not None:
+        return dict(user)
+    with get_connection(read_only=True) as conn:
+        with conn.cursor() as cur:
+            cur.execute(f"SELECT {USER_COLUMNS} FROM users WHERE id = %s;", (user_id,))
+            row = cur.fetchone()
+    return _remember(_to_user(row)) if row else None
+
+
+def get_user_by_email(email: str) -> dict | None:
+    """Returns the profile registered under an email, from the cache when possible."""
+    user = user_cache.get(("email", email))
+    if user is not None:
+        return dict(user)
+    with get_connection(read_only=True) as conn:
+        with conn.cursor() as cur:
+            cur.execute(f"SELECT {USER_COLUMNS} FROM users WHERE email = %s;", (email,))
+            row = cur.fetchone()
+    return _remember(_to_user(row)) if row else None
+
+
+def create_user(email: str, first_name: str, last_name: str, age: int) -> dict | None:
+    """
+    Registers a user in one round trip.
+
+    Returns:
+        dict | None: The new profile, or None if the email is already registered.
+    """
+    with get_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                f"""
+                INSERT INTO users (email, first_name, last_name, age)
+                VALUES (%s, %s, %s, %s)
+                ON CONFLICT (email) DO NOTHING
+                RETURNING {USER_COLUMNS};
+                """,
+                (email, first_name, last_name, age),
+            )
+            row = cur.fetchone()
+        conn.commit()
+    if not row:
+        return None
+    user = _to_user(row)
+    invalidate_user(user["user_id"], email)
+    return _remember(user)
+
+
+def invalidate_user(user_id: int | None = None, email: str | None = None):
+    """
+    Drops a user's cached profile. Call after any write to the users table.
+
+    Args:
+        user_id (int | None): The user's ID.
+        email (str | None): The user's email (old and new, when it changes).
+    """
+    if user_id is not None:
+        cached = user_cache.get(("id", user_id))
+        if cached is not None:
+            user_cache.invalidate(("email", cached["email"]))
+        user_cache.invalidate(("id", user_id))
+    if email is not None:
+        user_cache.invalidate(("email", email))
+
+
+def user_etag(user: dict) -> str:
+    """Strong ETag over the profile's content."""
+    digest = hashlib.sha256(json.dumps(user, sort_keys=True).encode()).hexdigest()
+    return f'"{digest[:32]}"'
@@ -0,0 +1,124 @@
+from db.connection import get_connection
+from tools.single_flight import single_flight
+
+
+def record_prices(prices: dict) -> int:
+    """
+    Stores price snapshots and applies the change to affected users' totals.
+
+    Only users holding a ticker whose price moved are touched: their stored
+    total is adjusted by quantity * (new price - previous price).
+
+    Args:
+        prices (dict): Ticker to latest price. None prices are ignored.
+
+    Returns:
+        int: Number of tickers whose price changed.
+    """
+    # Lock order must match rebuild_valuation: upper-cased, de-duplicated, sorted
+    latest = {str(t).upper(): p for t, p in prices.items() if p is not None}
+    changed = 0
+    with get_connection() as conn:
+        with conn.cursor() as cur:
+            for ticker, price in sorted(latest.items()):
+                # Serialise writers per ticker so concurrent deltas cannot interleave
+                cur.execute("SELECT pg_advisory_xact_lock(hashtext(%s));", (ticker,))
+                cur.execute(
+                    """
+                    SELECT price FROM price_snapshots
+                    WHERE ticker = %s
+                    ORDER BY captured_at DESC
+                    LIMIT 1;
+                    """,
+                    (ticker,),
+                )
+                row = cur.fetchone()
+                previous = float(row[0]) if row else 0.0
+                if row and previous == float(price):
+                    continue
+
+                cur.execute(
+                    "INSERT INTO price_snapshots (ticker, price) VALUES (%s, %s);",
+                    (ticker, price),
+                )
+                cur.execute(
+                    """
+                    UPDATE portfolio_valuations v
+                    SET total_value = v.total_value + h.quantity * %s,
+                        updated_at = NOW()
+                    FROM (
+                        SELECT user_id, SUM(quantity) AS quantity
+                        FROM current_portfolio
+                        WHERE UPPER(ticker) = %s
+                        GROUP BY user_id
+                    ) h
+                    WHERE v.user_id = h.user_id;
+                    """,
+                    (float(price) - previous, ticker),
+                )
+                changed += 1
+        conn.commit()
+    return changed
+
+
+def rebuild_valuation(user_id: int) -> float:
+    """
+    Recomputes a user's total from their holdings and the latest snapshots.
+    Call after the holdings themselves change (e.g. a new upload).
+
+    Takes the same per-ticker locks as record_prices, in the same sorted
+    order, so a delta committed while the total is being rebuilt is either
+    already in the snapshots it reads or applied on top of it afterwards.
+
+    Returns:
+        float: The stored total value.
+    """
+    with get_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                "SELECT DISTINCT UPPER(ticker) FROM current_portfolio WHERE user_id = %s;",
+                (user_id,),
+            )
+            for ticker in sorted(row[0] for row in cur.fetchall()):
+                cur.execute("SELECT pg_advisory_xact_lock(hashtext(%s));", (ticker,))
+
+            cur.execute(
+                """
+                INSERT INTO portfolio_valuations (user_id, total_value, updated_at)
+                SELECT %s, COALESCE(SUM(p.quantity * s.price), 0), NOW()
+                FROM current_portfolio p
+                LEFT JOIN LATERAL (
+                    SELECT price FROM price_snapshots
+                    WHERE ticker = UPPER(p.ticker)
+                    ORDER BY captured_at DESC
+                    LIMIT 1
+                ) s ON TRUE
+                WHERE p.user_id = %s
+                ON CONFLICT (user_id) DO UPDATE
+                    SET total_value = EXCLUDED.total_value, updated_at = EXCLUDED.updated_at
+                RETURNING total_value;
+                """,
+                (user_id, user_id),
+            )
+            total = cur.fetchone()[0]
+        conn.commit()
+    return float(total)
+
+
+def get_valuation(user_id: int) -> dict | None:
+    """Reads a user's stored portfolio total with a single primary-key lookup."""
+    return single_flight.do(f"valuation:{user_id}", _read_valuation, user_id)
+
+
+def _read_valuation(user_id: int) -> dict | None:
+    with get_connection(read_only=True) as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                "SELECT total_value, updated_at FROM portfolio_valuations WHERE user_id = %s;",
+                (user_id,),
+            )
+            row = cur.fetchone()
+
+    if not row:
+        return None
+    return {"user_id": user_id, "total_value": round(float(row[0]), 2), "updated_at": row[1]}
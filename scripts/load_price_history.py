@@ -0,0 +1,51 @@
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+from db.connection import get_connection
+from tools.market_data import get_provider
+from tools.price_store import get_price_store
+from config.settings import settings
+
+
+def load_price_history(period: str = "5d", backfill_period: str = "5y", tickers: list[str] | None = None):
+    """
+    Writes daily closes into the price store (run daily after the close).
+
+    Tickers already in the store fetch `period` of history, which appends the
+    latest trading days. Tickers new to the store fetch `backfill_period`.
+    """
+    if not tickers:
+        with get_connection(read_only=True) as conn:
+            with conn.cursor() as cur:
+                cur.execute("SELECT DISTINCT UPPER(ticker) FROM current_portfolio WHERE ticker IS NOT NULL;")
+                tickers = [r[0] for r in cur.fetchall()]
+
+    store = get_price_store()
+    provider = get_provider()
+
+    def fetch(ticker):
+        try:
+            history = provider.get_history(ticker, period if store.column(ticker) is not None else backfill_period)
+            return ticker, history["Close"] if not history.empty else None
+        except Exception as e:
+            print(f"Error fetching history for {ticker}: {e}")
+            return ticker, None
+
+    with ThreadPoolExecutor(max_workers=settings.PREFETCH_MAX_WORKERS) as pool:
+        closes = {t: series for t, series in pool.map(fetch, sorted({t.upper() for t in tickers})) if series is not None}
+
+    if not closes:
+        print("No history fetched.")
+        return
+    added = store.upsert(pd.DataFrame(closes))
+    print(f"Stored closes for {len(closes)} tickers, {added} new trading days; "
+          f"{len(store.tickers)} tickers x {len(store.dates)} days in {store.directory}.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Append daily closes to the local price store")
+    parser.add_argument("--period", default="5d", help="History fetched for tickers already stored")
+    parser.add_argument("--backfill-period", default="5y", help="History fetched for tickers new to the store")
+    parser.add_argument("--tickers", nargs="*", help="Tickers to load (default: every held ticker)")
+    args = parser.parse_args()
+    load_price_history(args.period, args.backfill_period, args.tickers)
@@ -0,0 +1,164 @@
+import argparse
+import io
+import random
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+import requests
+
+BASE_URL = "http://127.0.0.1:8000"
+
+CHAT_MESSAGES = [
+    "What is the current value of my portfolio?",
+    "Should I sell TSLA?",
+    "How can I sell stocks with minimum tax impact?",
+    "Which losers should I sell to cover my RMD?",
+]
+
+
+def _portfolio_excel(tickers: list[str]) -> bytes:
+    """Builds an in-memory upload file in the format /portfolio/upload-excel expects."""
+    df = pd.DataFrame({
+        "stock_name": tickers,
+        "ticker": tickers,
+        "quantity": [random.randint(1, 100) for _ in tickers],
+    })
+    buffer = io.BytesIO()
+    df.to_excel(buffer, index=False)
+    return buffer.getvalue()
+
+
+class LoadTest:
+    """
+    Open-loop load generator: requests are started on a fixed schedule so a
+    slow server shows up as latency rather than as a lower request rate.
+    Latency is measured from each request's scheduled start, so time spent
+    queued behind busy workers counts too (no coordinated omission).
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        user_ids: list[int],
+        emails: list[str],
+        tickers: list[str],
+        timeout: float,
+        max_workers: int = 64,
+    ):
+        self.base_url = base_url
+        self.user_ids = user_ids
+        self.emails = emails
+        self.excel = _portfolio_excel(tickers)
+        self.timeout = timeout
+        self.session = requests.Session()
+        # One pooled connection per worker, otherwise requests beyond the
+        # default ten open and discard a connection each time
+        adapter = requests.adapters.HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.errors: dict[str, int] = defaultdict(int)
+        self.lock = threading.Lock()
+
+    def chat(self):
+        return self.session.post(
+            f"{self.base_url}/chat/",
+            json={"user_id": random.choice(self.user_ids), "message": random.choice(CHAT_MESSAGES)},
+            timeout=self.timeout,
+        )
+
+    def login(self):
+        email = random.choice(self.emails) if self.emails else f"user{random.choice(self.user_ids)}@example.com"
+        return self.session.post(f"{self.base_url}/users/login", json={"email": email}, timeout=self.timeout)
+
+    def upload(self):
+        return self.session.post(
+            f"{self.base_url}/portfolio/upload-excel",
+            data={"user_id": random.choice(self.user_ids)},
+            files={"file": ("portfolio.xlsx", self.excel)},
+            timeout=self.timeout,
+        )
+
+    def _timed(self, name: str, call, scheduled: float):
+        try:
+            ok = call().status_code < 400
+        except requests.exceptions.RequestException:
+            ok = False
+        elapsed = time.perf_counter() - scheduled
+        with self.lock:
+            self.latencies[name].append(elapsed)
+            if not ok:
+                self.errors[name] += 1
+
+    def run(self, rps: float, duration: float, mix: dict[str, float], max_workers: int) -> float:
+        """Drives the endpoints at the target rate and returns the elapsed wall time."""
+        calls = {"chat": self.chat, "login": self.login, "upload": self.upload}
+        names = [n for n in mix if mix[n] > 0]
+        weights = [mix[n] for n in names]
+        interval = 1 / rps
+        total = int(rps * duration)
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            for i in range(total):
+                # Sleep until this request's scheduled start time
+                scheduled = start + i * interval
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                name = random.choices(names, weights)[0]
+                pool.submit(self._timed, name, calls[name], scheduled)
+        return time.perf_counter() - start
+
+    def report(self, elapsed: float):
+        total = sum(len(v) for v in self.latencies.values())
+        print(f"\nCompleted {total} requests in {elapsed:.1f}s ({total / elapsed:.1f} req/s)\n")
+        print(f"{'endpoint':<10}{'count':>8}{'errors':>8}{'p50 ms':>10}{'p90 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+        for name, values in sorted(self.latencies.items()):
+            values = sorted(values)
+            row = [percentile(values, p) * 1000 for p in (50, 90, 95, 99, 100)]
+            print(f"{name:<10}{len(values):>8}{self.errors[name]:>8}" + "".join(f"{v:>10.1f}" for v in row))
+
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values))) - 1))
+    return sorted_values[rank]
+
+
+def parse_mix(value: str) -> dict[str, float]:
+    """Parses 'chat=8,login=1,upload=1' into endpoint weights."""
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test /chat, /users/login and /portfolio/upload-excel")
+    parser.add_argument("--base-url", default=BASE_URL)
+    parser.add_argument("--rps", type=float, default=5.0, help="Target requests per second")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds to generate load for")
+    parser.add_argument("--mix", default="chat=8,login=1,upload=1", help="Endpoint weights")
+    parser.add_argument("--user-ids", default="1", help="Comma-separated user IDs to spread load across")
+    parser.add_argument("--emails", default="", help="Comma-separated registered emails for login")
+    parser.add_argument("--tickers", default="AAPL,MSFT,TSLA,AMZN", help="Tickers in uploaded portfolios")
+    parser.add_argument("--workers", type=int, default=64, help="Maximum concurrent requests")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    args = parser.parse_args()
+
+    test = LoadTest(
+        args.base_url,
+        [int(u) for u in args.user_ids.split(",")],
+        [e for e in args.emails.split(",") if e],
+        args.tickers.split(","),
+        args.timeout,
+        args.workers,
+    )
+    elapsed = test.run(args.rps, args.duration, parse_mix(args.mix), args.workers)
+    test.report(elapsed)
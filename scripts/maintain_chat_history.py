@@ -0,0 +1,23 @@
+from db.chat_history import archive_old_partitions, ensure_partitions
+from db.connection import get_connection
+
+
+def maintain_chat_history():
+    """
+    Creates upcoming monthly partitions and archives expired ones (run daily).
+    The two steps are independent, so a failure in one does not stop the other.
+    """
+    try:
+        with get_connection() as conn:
+            with conn.cursor() as cur:
+                ensure_partitions(cur)
+            conn.commit()
+    except Exception as e:
+        print(f"Error creating chat history partitions: {e}")
+
+    for entry in archive_old_partitions():
+        print(f"Archived {entry['rows']} rows from {entry['partition']} to {entry['path']}")
+
+
+if __name__ == "__main__":
+    maintain_chat_history()
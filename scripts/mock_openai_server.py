@@ -0,0 +1,168 @@
+"""
+Local OpenAI-compatible stand-in for load testing.
+
+Run it and point the app at it through the OpenAI SDK's own environment
+variable, e.g.:
+
+    python scripts/mock_openai_server.py --port 9000 --tokens-per-second 80 --latency-ms 400
+    OPENAI_BASE_URL=http://127.0.0.1:9000/v1 OPENAI_API_KEY=mock uvicorn app:app
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+WORDS = (
+    "your portfolio remains diversified across large cap holdings and long term gains "
+    "may be taxed at preferential rates consider the timing of required minimum distributions"
+).split()
+
+
+class MockConfig:
+    def __init__(
+        self,
+        tokens_per_second: float = 50.0,
+        latency_ms: float = 300.0,
+        latency_distribution: str = "lognormal",
+        latency_sigma: float = 0.5,
+        completion_tokens: int = 120,
+        error_rate: float = 0.0,
+        seed: int | None = None,
+    ):
+        self.tokens_per_second = tokens_per_second
+        self.latency_ms = latency_ms
+        self.latency_distribution = latency_distribution
+        self.latency_sigma = latency_sigma
+        self.completion_tokens = completion_tokens
+        self.error_rate = error_rate
+        self.rng = random.Random(seed)
+
+    def first_token_delay(self) -> float:
+        """Samples time-to-first-token in seconds."""
+        mean = self.latency_ms / 1000
+        if self.latency_distribution == "fixed":
+            return mean
+        if self.latency_distribution == "uniform":
+            return self.rng.uniform(0, 2 * mean)
+        if self.latency_distribution == "normal":
+            return max(0.0, self.rng.gauss(mean, mean * self.latency_sigma))
+        # lognormal keeps the median at the configured latency with a long right tail
+        return mean * self.rng.lognormvariate(0, self.latency_sigma)
+
+
+def _completion_text(body: dict, config: MockConfig) -> list[str]:
+    """Builds the token list for a response."""
+    messages = body.get("messages") or [{}]
+    last = str(messages[-1].get("content", "")).lower()
+
+    # Classifier calls ask for a single token
+    if body.get("max_tokens") == 1:
+        if "tax" in last and ("sell" in last or "stock" in last):
+            return ["both"]
+        return ["tax"] if "tax" in last or "rmd" in last else ["stock"]
+
+    limit = min(body.get("max_tokens") or config.completion_tokens, config.completion_tokens)
+    return [config.rng.choice(WORDS) for _ in range(limit)]
+
+
+def create_app(config: MockConfig) -> FastAPI:
+    app = FastAPI(title="Mock OpenAI")
+
+    @app.get("/v1/models")
+    def list_models():
+        return {"object": "list", "data": [{"id": m, "object": "model"} for m in ("gpt-4", "gpt-4o-mini")]}
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        model = body.get("model", "gpt-4o-mini")
+
+        if config.rng.random() < config.error_rate:
+            return JSONResponse(
+                status_code=429,
+                content={"error": {"message": "Mock rate limit", "type": "rate_limit_error"}},
+            )
+
+        tokens = _completion_text(body, config)
+        prompt_tokens = sum(len(str(m.get("content", "")).split()) for m in body.get("messages", []))
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        created = int(time.time())
+        per_token = 1 / config.tokens_per_second if config.tokens_per_second > 0 else 0
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": len(tokens),
+            "total_tokens": prompt_tokens + len(tokens),
+        }
+
+        await asyncio.sleep(config.first_token_delay())
+
+        if not body.get("stream"):
+            await asyncio.sleep(per_token * len(tokens))
+            return {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": " ".join(tokens)},
+                    "finish_reason": "stop",
+                }],
+                "usage": usage,
+            }
+
+        async def event_stream():
+            def chunk(delta: dict, finish_reason=None, **extra):
+                payload = {
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "created": created,
+                    "model": model,
+                    "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+                    **extra,
+                }
+                return f"data: {json.dumps(payload)}\n\n"
+
+            yield chunk({"role": "assistant", "content": ""})
+            for i, token in enumerate(tokens):
+                yield chunk({"content": token if i == 0 else f" {token}"})
+                await asyncio.sleep(per_token)
+            yield chunk({}, finish_reason="stop")
+            if (body.get("stream_options") or {}).get("include_usage"):
+                yield f"data: {json.dumps({'id': completion_id, 'object': 'chat.completion.chunk', 'created': created, 'model': model, 'choices': [], 'usage': usage})}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+    return app
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Local OpenAI-compatible mock server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--tokens-per-second", type=float, default=50.0)
+    parser.add_argument("--latency-ms", type=float, default=300.0, help="Median time to first token")
+    parser.add_argument("--latency-distribution", choices=["fixed", "uniform", "normal", "lognormal"], default="lognormal")
+    parser.add_argument("--latency-sigma", type=float, default=0.5)
+    parser.add_argument("--completion-tokens", type=int, default=120)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    config = MockConfig(
+        tokens_per_second=args.tokens_per_second,
+        latency_ms=args.latency_ms,
+        latency_distribution=args.latency_distribution,
+        latency_sigma=args.latency_sigma,
+        completion_tokens=args.completion_tokens,
+        error_rate=args.error_rate,
+        seed=args.seed,
+    )
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
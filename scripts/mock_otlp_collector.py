@@ -0,0 +1,72 @@
+"""
+Local stand-in for an OTLP/HTTP trace collector.
+
+Accepts JSON-encoded OTLP trace exports, appends each span to a JSON-lines
+file and prints a one-line summary per trace, e.g.:
+
+    python scripts/mock_otlp_collector.py --port 4318 --out traces/collector.jsonl
+    TRACING_EXPORTER=otlp OTLP_ENDPOINT=http://127.0.0.1:4318 uvicorn app:app
+"""
+import argparse
+import json
+import os
+from fastapi import FastAPI, Request
+
+
+def _attribute_value(value: dict):
+    for key in ("stringValue", "boolValue", "doubleValue"):
+        if key in value:
+            return value[key]
+    if "intValue" in value:
+        return int(value["intValue"])
+    return None
+
+
+def flatten(payload: dict) -> list[dict]:
+    """Turns an OTLP export request into flat span records."""
+    spans = []
+    for resource_spans in payload.get("resourceSpans", []):
+        for scope_spans in resource_spans.get("scopeSpans", []):
+            for span in scope_spans.get("spans", []):
+                start, end = int(span["startTimeUnixNano"]), int(span["endTimeUnixNano"])
+                spans.append({
+                    "trace_id": span["traceId"],
+                    "span_id": span["spanId"],
+                    "parent_id": span.get("parentSpanId"),
+                    "name": span["name"],
+                    "duration_ms": round((end - start) / 1e6, 3),
+                    "attributes": {a["key"]: _attribute_value(a["value"]) for a in span.get("attributes", [])},
+                })
+    return spans
+
+
+def create_app(out_path: str) -> FastAPI:
+    app = FastAPI(title="Mock OTLP collector")
+    os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+
+    @app.post("/v1/traces")
+    async def receive_traces(request: Request):
+        spans = flatten(await request.json())
+        with open(out_path, "a") as f:
+            for span in spans:
+                f.write(json.dumps(span) + "\n")
+
+        roots = [s for s in spans if not s["parent_id"]]
+        for root in roots:
+            request_id = root["attributes"].get("request_id", "-")
+            print(f"{root['name']} request_id={request_id} {root['duration_ms']}ms spans={len(spans)}")
+        return {"partialSuccess": {}}
+
+    return app
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Local OTLP/HTTP trace collector stand-in")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=4318)
+    parser.add_argument("--out", default="traces/collector.jsonl")
+    args = parser.parse_args()
+
+    uvicorn.run(create_app(args.out), host=args.host, port=args.port, log_level="warning")
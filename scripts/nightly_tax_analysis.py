@@ -0,0 +1,19 @@
+import argparse
+from tools.tax_batch import TaxBatchJob
+from config.settings import settings
+
+
+def nightly_tax_analysis(resume: bool = True):
+    """Pre-computes every user's selling-strategy analysis (run nightly)."""
+    summary = TaxBatchJob(settings.OPENAI_API_KEY).run(resume=resume)
+    print(
+        f"Run {summary['run_id']} finished: {summary['analysed']} analysed, "
+        f"{summary['skipped']} unchanged, {summary['failed']} failed."
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Nightly batch tax analysis")
+    parser.add_argument("--fresh", action="store_true", help="Start a new run instead of resuming an unfinished one")
+    args = parser.parse_args()
+    nightly_tax_analysis(resume=not args.fresh)
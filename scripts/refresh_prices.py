@@ -0,0 +1,19 @@
+from db.connection import get_connection
+from db.valuations import record_prices
+from tools.stock_fetcher import prefetch_stock_prices
+
+
+def refresh_prices():
+    """Fetches the latest quote for every held ticker and records snapshots."""
+    with get_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT DISTINCT UPPER(ticker) FROM current_portfolio WHERE ticker IS NOT NULL;")
+            tickers = [r[0] for r in cur.fetchall()]
+
+    prices = prefetch_stock_prices(tickers)
+    changed = record_prices(prices)
+    print(f"Fetched {len(prices)} tickers, {changed} price changes applied to valuations.")
+
+
+if __name__ == "__main__":
+    refresh_prices()
@@ -0,0 +1,15 @@
+from tools.stock_recommender import StockRecommender
+
+
+def refresh_recommendations():
+    """Re-scores held tickers whose fundamentals moved and relabels affected holdings (run nightly)."""
+    summary = StockRecommender().refresh_recommendations()
+    print(
+        f"Checked {summary['tickers']} tickers: {summary['rescored']} re-scored, "
+        f"{summary['unchanged']} unchanged, {summary['failed']} failed; "
+        f"{summary['labels_changed']} labels changed, {summary['rows_updated']} holdings updated."
+    )
+
+
+if __name__ == "__main__":
+    refresh_recommendations()
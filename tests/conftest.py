@@ -0,0 +1,4 @@
+import os
+
+# Tests must not read or write the persistent cache tier of a local run
+os.environ["DISK_CACHE_PATH"] = ""
@@ -0,0 +1,123 @@
+import sys
+import os
+import time
+import pytest
+
+# Ensure tools/ is importable
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tools.cache import DiskCache, TieredCache, TTLCache
+
+
+@pytest.fixture
+def disk(tmp_path):
+    return DiskCache(str(tmp_path / "cache" / "cache.sqlite3"), max_bytes=1_000_000)
+
+
+# --- In-memory cache ---
+def test_ttl_cache_expires_entries():
+    cache = TTLCache(ttl_seconds=60)
+    cache.set("a", 1)
+    cache.set("b", 2, ttl_seconds=-1)
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+
+
+# --- Disk cache ---
+def test_disk_cache_round_trip(disk):
+    disk.set("quotes", "AAPL", 189.5, ttl_seconds=60)
+    disk.set("fundamentals", "AAPL", {"Ticker": "AAPL", "Price Trend": 0.01}, ttl_seconds=60)
+    assert disk.get("quotes", "AAPL") == 189.5
+    assert disk.get("fundamentals", "AAPL") == {"Ticker": "AAPL", "Price Trend": 0.01}
+    assert disk.get("quotes", "MSFT") is None
+
+
+def test_disk_cache_survives_reopen(disk):
+    disk.set("quotes", "AAPL", 189.5, ttl_seconds=60)
+    assert DiskCache(disk.path, max_bytes=1_000_000).get("quotes", "AAPL") == 189.5
+
+
+def test_disk_cache_never_returns_expired(disk):
+    disk.set("quotes", "AAPL", 189.5, ttl_seconds=-1)
+    assert disk.get("quotes", "AAPL") is None
+    assert disk.load("quotes", 10) == []
+
+
+def test_disk_cache_clear_namespace(disk):
+    disk.set("quotes", "AAPL", 1.0, ttl_seconds=60)
+    disk.set("fundamentals", "AAPL", {}, ttl_seconds=60)
+    disk.clear("quotes")
+    assert disk.get("quotes", "AAPL") is None
+    assert disk.get("fundamentals", "AAPL") == {}
+
+
+def test_compact_drops_expired_then_shortest_lived(disk):
+    disk.set("quotes", "OLD", 1.0, ttl_seconds=-1)
+    for i in range(10):
+        disk.set("llm", f"k{i}", "x" * 100, ttl_seconds=100 + i)
+    disk.max_bytes = 5 * 102  # JSON strings carry their quotes
+
+    assert disk.compact() == 1 + 5
+    assert disk.size() == 5 * 102
+    kept = sorted(key for key, _, _ in disk.load("llm", 100))
+    assert kept == [f"k{i}" for i in range(5, 10)]
+
+
+def test_compaction_runs_every_n_writes(disk):
+    disk.max_bytes = 50
+    disk.compact_every = 5
+    for i in range(5):
+        disk.set("llm", f"k{i}", "x" * 20, ttl_seconds=60)
+    assert disk.size() <= 50
+
+
+def test_unserialisable_value_is_skipped(disk, capsys):
+    disk.set("quotes", "AAPL", object(), ttl_seconds=60)
+    assert disk.get("quotes", "AAPL") is None
+    assert "Error writing disk cache" in capsys.readouterr().out
+
+
+# --- Tiered cache ---
+def test_tiered_cache_falls_through_to_disk(disk):
+    TieredCache("quotes", ttl_seconds=60, disk=disk).set("AAPL", 189.5)
+
+    # A new process: memory is empty, disk still has the entry
+    fresh = TieredCache("quotes", ttl_seconds=60, disk=disk)
+    assert fresh.get("AAPL") == 189.5
+    disk.clear()
+    assert fresh.get("AAPL") == 189.5  # promoted to memory
+
+
+def test_tiered_cache_promotes_remaining_ttl(disk):
+    disk.set("quotes", "AAPL", 189.5, ttl_seconds=0.2)
+    cache = TieredCache("quotes", ttl_seconds=60, disk=disk)
+    assert cache.get("AAPL") == 189.5
+    time.sleep(0.25)
+    assert cache.get("AAPL") is None
+
+
+def test_tiered_cache_invalidate_and_clear_both_tiers(disk):
+    cache = TieredCache("quotes", ttl_seconds=60, disk=disk)
+    cache.set("AAPL", 1.0)
+    cache.set("MSFT", 2.0)
+    cache.invalidate("AAPL")
+    assert disk.get("quotes", "AAPL") is None
+    cache.clear()
+    assert "MSFT" not in cache
+
+
+def test_warm_loads_entries_and_tuple_keys(disk):
+    TieredCache("users", ttl_seconds=60, disk=disk).set(("id", 7), {"user_id": 7})
+    cache = TieredCache("users", ttl_seconds=60, disk=disk)
+    assert cache.warm() == 1
+    disk.clear()
+    assert cache.get(("id", 7)) == {"user_id": 7}
+
+
+def test_tiered_cache_without_disk_is_memory_only(monkeypatch):
+    monkeypatch.setenv("DISK_CACHE_PATH", "")
+    cache = TieredCache("quotes", ttl_seconds=60)
+    cache.set("AAPL", 1.0)
+    assert cache.disk is None
+    assert cache.get("AAPL") == 1.0
+    assert cache.warm() == 0
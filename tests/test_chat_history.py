@@ -0,0 +1,113 @@
+import sys
+import os
+from datetime import date, datetime
+from unittest.mock import MagicMock, patch
+
+# Ensure db/ is importable
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import db.chat_history as chat_history
+
+
+def _mock_connection(tables):
+    cur = MagicMock()
+    cur.fetchall.return_value = tables
+    conn = MagicMock()
+    conn.cursor.return_value.__enter__.return_value = cur
+    ctx = MagicMock()
+    ctx.__enter__.return_value = conn
+    return ctx, conn, cur
+
+
+def _executed(cur):
+    return [str(c[0][0]) for c in cur.execute.call_args_list]
+
+
+# --- Cursors ---
+def test_cursor_round_trip():
+    created_at = datetime(2024, 3, 5, 14, 30, 15, 123456)
+    cursor = chat_history.encode_cursor(created_at, 42)
+    assert "|" not in cursor
+    assert chat_history.decode_cursor(cursor) == (created_at, 42)
+
+
+# --- Months ---
+def test_month_start_crosses_years():
+    assert chat_history._month_start(date(2024, 1, 31)) == date(2024, 1, 1)
+    assert chat_history._month_start(date(2024, 1, 15), -1) == date(2023, 12, 1)
+    assert chat_history._month_start(date(2024, 11, 15), 3) == date(2025, 2, 1)
+    assert chat_history._month_start(date(2024, 6, 1), -18) == date(2022, 12, 1)
+
+
+def test_partition_name_and_expiry():
+    assert chat_history.partition_name(date(2024, 3, 1)) == "chat_history_y2024m03"
+    cutoff = date(2024, 3, 1)
+    assert chat_history._is_expired("chat_history_y2024m02", cutoff)
+    assert not chat_history._is_expired("chat_history_y2024m03", cutoff)
+
+
+# --- Partitions ---
+def test_missing_partitions_take_their_rows_from_default():
+    cur = MagicMock()
+    cur.fetchone.side_effect = [(True,), (False,), (False,)]
+    chat_history.ensure_partitions(cur, months_ahead=2, today=date(2024, 12, 15))
+
+    statements = [(str(c[0][0]), c[0][1] if len(c[0]) > 1 else None) for c in cur.execute.call_args_list]
+    assert statements[0][1] == ("chat_history_y2024m12",)
+    # The existing December partition is left alone; January and February are built then attached
+    january = statements[1:5]
+    assert "CREATE TABLE" in january[1][0] and "chat_history_y2025m01" in january[1][0]
+    assert "DELETE FROM chat_history_default" in january[2][0]
+    assert january[2][1] == (date(2025, 1, 1), date(2025, 2, 1))
+    assert "ATTACH PARTITION" in january[3][0]
+    assert statements[-1][1] == (date(2025, 2, 1), date(2025, 3, 1))
+    assert len(statements) == 9
+
+
+# --- Archiving ---
+def test_archive_exports_before_dropping(tmp_path):
+    tables = [("chat_history_y2023m12", True), ("chat_history_y2024m01", False), ("chat_history_y2024m06", True)]
+    ctx, conn, cur = _mock_connection(tables)
+    order = []
+    cur.execute.side_effect = lambda query, *args: order.append(str(query))
+
+    def export(conn, table, path, *args):
+        order.append(f"export {table}")
+        return 0 if table == "chat_history_default" else 5
+
+    with patch("db.chat_history.get_connection", return_value=ctx), \
+            patch("db.chat_history._export_rows", side_effect=export), \
+            patch("db.chat_history.os.remove"):
+        archived = chat_history.archive_old_partitions(
+            retention_months=2, archive_dir=str(tmp_path), today=date(2024, 4, 15)
+        )
+
+    assert [a["partition"] for a in archived] == ["chat_history_y2023m12", "chat_history_y2024m01"]
+    assert all(a["rows"] == 5 for a in archived)
+    assert not any("2024m06" in step for step in order)
+    assert not any("CREATE TABLE" in step for step in order)  # archiving does not depend on partition creation
+    december = [step for step in order if "2023m12" in step]
+    assert december[1] == "export chat_history_y2023m12"
+    assert "DETACH" in december[2] and "DROP" in december[3]
+    # The detached leftover is only dropped
+    assert not any("DETACH" in step and "2024m01" in step for step in order)
+
+
+def test_failed_export_leaves_partition_attached(tmp_path, capsys):
+    ctx, conn, cur = _mock_connection([("chat_history_y2023m12", True)])
+
+    def export(conn, table, path, *args):
+        if table != "chat_history_default":
+            raise OSError("disk full")
+        return 0
+
+    with patch("db.chat_history.get_connection", return_value=ctx), \
+            patch("db.chat_history._export_rows", side_effect=export), \
+            patch("db.chat_history.os.remove"):
+        archived = chat_history.archive_old_partitions(
+            retention_months=3, archive_dir=str(tmp_path), today=date(2024, 4, 15)
+        )
+
+    assert archived == []
+    assert not any("DETACH" in q or "DROP" in q for q in _executed(cur))
+    assert "left in place" in capsys.readouterr().out
@@ -0,0 +1,66 @@
+import sys
+import os
+import pytest
+import psycopg2
+from unittest.mock import MagicMock, patch
+
+# Ensure db/ is importable
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from db import connection
+
+
+def fake_conn(lag=0.0):
+    conn = MagicMock(name=f"conn(lag={lag})")
+    conn.cursor.return_value.__enter__.return_value.fetchone.return_value = (lag,)
+    return conn
+
+
+@pytest.fixture(autouse=True)
+def env(monkeypatch):
+    monkeypatch.setenv("DATABASE_URL", "primary")
+    monkeypatch.setenv("DATABASE_REPLICA_URLS", "replica-a, replica-b")
+    monkeypatch.setenv("MAX_REPLICA_LAG_SECONDS", "2")
+    connection._replica_state.clear()
+
+
+# --- Routing ---
+def test_writes_go_to_primary():
+    with patch("db.connection.psycopg2.connect", return_value=fake_conn()) as connect:
+        with connection.get_connection():
+            pass
+    connect.assert_called_once_with("primary")
+
+
+def test_reads_go_to_replica_and_are_read_only():
+    conn = fake_conn()
+    with patch("db.connection.psycopg2.connect", return_value=conn) as connect:
+        with connection.get_connection(read_only=True) as c:
+            assert c is conn
+    assert connect.call_args[0][0].startswith("replica-")
+    conn.set_session.assert_called_once_with(readonly=True)
+
+
+# --- Fallback ---
+def test_lagging_replicas_fall_back_to_primary():
+    conns = {"replica-a": fake_conn(lag=30), "replica-b": fake_conn(lag=30), "primary": fake_conn()}
+    with patch("db.connection.psycopg2.connect", side_effect=lambda dsn, **_: conns[dsn]):
+        with connection.get_connection(read_only=True) as c:
+            assert c is conns["primary"]
+    conns["replica-a"].close.assert_called_once()
+
+
+def test_unreachable_replica_is_skipped():
+    healthy = fake_conn()
+
+    def connect(dsn, **_):
+        if dsn == "replica-a":
+            raise psycopg2.OperationalError("refused")
+        return healthy
+
+    with patch("db.connection.psycopg2.connect", side_effect=connect) as mock_connect:
+        for _ in range(3):
+            with connection.get_connection(read_only=True) as c:
+                assert c is healthy
+    dsns = [call.args[0] for call in mock_connect.call_args_list]
+    assert dsns.count("replica-a") == 1
@@ -0,0 +1,41 @@
+import sys
+import os
+import io
+import csv
+from datetime import datetime
+import pyarrow.parquet as pq
+
+# Ensure db/ is importable
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from db.exports import EXPORT_SCHEMA, stream_csv, stream_parquet
+
+chunks = [
+    [(1, "AAPL", "Apple", 10, 190.5, datetime(2025, 1, 2), 1905.0, "Buy"),
+     (1, "TSLA", "Tesla", 5, None, None, None, None)],
+    [(2, "MSFT", "Microsoft", 3, 410.0, datetime(2025, 1, 2), 1230.0, "Hold")],
+]
+
+
+# --- CSV ---
+def test_csv_streams_header_then_one_piece_per_chunk():
+    pieces = list(stream_csv(iter(chunks)))
+    rows = list(csv.reader(io.StringIO("".join(pieces))))
+    assert rows[0] == EXPORT_SCHEMA.names
+    assert [r[1] for r in rows[1:]] == ["AAPL", "TSLA", "MSFT"]
+    assert len(pieces) == 3
+
+
+# --- Parquet ---
+def test_parquet_stream_is_a_valid_file_with_row_group_per_chunk():
+    data = b"".join(stream_parquet(iter(chunks)))
+    parquet = pq.ParquetFile(io.BytesIO(data))
+    assert parquet.metadata.num_row_groups == 2
+    table = parquet.read()
+    assert table.column("ticker").to_pylist() == ["AAPL", "TSLA", "MSFT"]
+    assert table.column("price").to_pylist()[1] is None
+
+
+def test_empty_export_still_yields_schema():
+    data = b"".join(stream_parquet(iter([])))
+    assert pq.read_table(io.BytesIO(data)).schema.names == EXPORT_SCHEMA.names
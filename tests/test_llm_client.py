@@ -0,0 +1,200 @@
+import sys
+import os
+import threading
+import time
+import pytest
+from unittest.mock import MagicMock
+
+# Ensure tools/ is importable
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tools.llm_client import LatencyTracker, LLMClient
+from tools.resilience import DeadlineExceeded, RateLimitExceeded, deadline_scope
+
+
+def make_client(llm, latencies=None, slots=4, **kwargs):
+    kwargs.setdefault("timeout", 2.0)
+    kwargs.setdefault("attempts", 3)
+    kwargs.setdefault("hedge_percentile", 95)
+    kwargs.setdefault("max_hedges", 1)
+    return LLMClient(
+        llm,
+        model_name="test-model",
+        limiter=threading.BoundedSemaphore(slots),
+        latencies=latencies or LatencyTracker(),
+        **kwargs,
+    )
+
+
+def fast_history(latency=0.01, samples=50):
+    latencies = LatencyTracker()
+    for _ in range(samples):
+        latencies.record("test-model", latency)
+    return latencies
+
+
+# --- Latency tracker ---
+def test_percentile_needs_minimum_samples():
+    latencies = LatencyTracker()
+    for i in range(5):
+        latencies.record("m", i)
+    assert latencies.percentile("m", 50, min_samples=10) is None
+    assert latencies.percentile("m", 50, min_samples=5) == 2.0
+    assert latencies.percentile("other", 50, min_samples=1) is None
+
+
+# --- Invoke ---
+def test_invoke_passes_timeout_and_delegates_attributes():
+    llm = MagicMock(model_name="gpt-4")
+    llm.invoke.return_value = "answer"
+    client = LLMClient(llm, timeout=5.0, limiter=threading.BoundedSemaphore(1), latencies=LatencyTracker())
+
+    assert client.invoke(["hi"]) == "answer"
+    assert client.model_name == "gpt-4"
+    assert llm.invoke.call_args[1]["timeout"] == pytest.approx(5.0, abs=0.1)
+    assert client.temperature is llm.temperature
+
+
+def test_timeout_is_cut_to_request_deadline():
+    llm = MagicMock()
+    llm.invoke.return_value = "answer"
+    client = make_client(llm, timeout=30.0)
+    with deadline_scope(1.0):
+        client.invoke(["hi"])
+    assert llm.invoke.call_args[1]["timeout"] <= 1.0
+
+
+def test_deadline_exceeded_before_call():
+    llm = MagicMock()
+    client = make_client(llm)
+    with deadline_scope(0):
+        with pytest.raises(DeadlineExceeded):
+            client.invoke(["hi"])
+    llm.invoke.assert_not_called()
+
+
+# --- Hedging ---
+def test_hedge_wins_when_first_request_is_slow():
+    calls = []
+
+    def invoke(messages, timeout):
+        calls.append(time.monotonic())
+        if len(calls) == 1:
+            time.sleep(1.0)
+            return "slow"
+        return "fast"
+
+    client = make_client(MagicMock(invoke=invoke), latencies=fast_history())
+    started = time.monotonic()
+    assert client.invoke(["hi"]) == "fast"
+    assert len(calls) == 2
+    assert time.monotonic() - started < 0.5
+
+
+def test_no_hedge_without_latency_history():
+    llm = MagicMock()
+    llm.invoke.side_effect = lambda messages, timeout: time.sleep(0.2) or "answer"
+    client = make_client(llm)
+    assert client.invoke(["hi"]) == "answer"
+    assert llm.invoke.call_count == 1
+
+
+def test_hedge_skipped_when_no_slot_is_free():
+    llm = MagicMock()
+    llm.invoke.side_effect = lambda messages, timeout: time.sleep(0.2) or "answer"
+    client = make_client(llm, latencies=fast_history(), slots=1)
+    assert client.invoke(["hi"]) == "answer"
+    assert llm.invoke.call_count == 1
+
+
+# --- Retries ---
+def test_transient_errors_retried_up_to_attempts():
+    llm = MagicMock()
+    llm.invoke.side_effect = ConnectionError("reset")
+    client = make_client(llm, attempts=3)
+    with pytest.raises(ConnectionError):
+        client.invoke(["hi"])
+    assert llm.invoke.call_count == 3
+
+
+def test_retry_recovers_from_transient_error():
+    llm = MagicMock()
+    llm.invoke.side_effect = [TimeoutError("slow"), "answer"]
+    client = make_client(llm)
+    assert client.invoke(["hi"]) == "answer"
+
+
+def test_permanent_errors_not_retried():
+    llm = MagicMock()
+    llm.invoke.side_effect = ValueError("bad request")
+    client = make_client(llm)
+    with pytest.raises(ValueError):
+        client.invoke(["hi"])
+    assert llm.invoke.call_count == 1
+
+
+def test_slow_attempt_times_out():
+    llm = MagicMock()
+    llm.invoke.side_effect = lambda messages, timeout: time.sleep(0.5) or "late"
+    client = make_client(llm, timeout=0.1, attempts=1)
+    with pytest.raises(TimeoutError):
+        client.invoke(["hi"])
+
+
+# --- Concurrency limit ---
+def test_concurrency_limit_caps_parallel_calls():
+    in_flight, peak = [0], [0]
+    lock = threading.Lock()
+
+    def invoke(messages, timeout):
+        with lock:
+            in_flight[0] += 1
+            peak[0] = max(peak[0], in_flight[0])
+        time.sleep(0.05)
+        with lock:
+            in_flight[0] -= 1
+        return messages
+
+    client = make_client(MagicMock(invoke=invoke), slots=2, hedge_percentile=0)
+    results = client.batch([[i] for i in range(8)], config={"max_concurrency": 8})
+    assert results == [[i] for i in range(8)]
+    assert peak[0] <= 2
+
+
+def test_no_slot_before_deadline():
+    limiter = threading.BoundedSemaphore(1)
+    limiter.acquire()
+    client = make_client(MagicMock(), timeout=0.1)
+    client.limiter = limiter
+    with pytest.raises(RateLimitExceeded):
+        client.invoke(["hi"])
+
+
+def test_batch_returns_exceptions_in_place():
+    def invoke(messages, timeout):
+        if messages == ["b"]:
+            raise ValueError("bad")
+        return messages
+
+    client = make_client(MagicMock(invoke=invoke))
+    results = client.batch([["a"], ["b"]], return_exceptions=True)
+    assert results[0] == ["a"]
+    assert isinstance(results[1], ValueError)
+
+
+# --- Response cache ---
+def test_identical_prompts_answered_from_cache(monkeypatch):
+    from langchain.schema import AIMessage, HumanMessage
+    from tools import llm_client
+
+    monkeypatch.setattr(llm_client, "llm_response_cache", llm_client.TieredCache("llm", ttl_seconds=60, disk=None))
+    llm = MagicMock()
+    llm.invoke.return_value = AIMessage(content="hold")
+    client = make_client(llm)
+
+    first = client.invoke([HumanMessage(content="AAPL?")])
+    second = client.invoke([HumanMessage(content="AAPL?")])
+    client.invoke([HumanMessage(content="MSFT?")])
+
+    assert first.content == second.content == "hold"
+    assert llm.invoke.call_count == 2
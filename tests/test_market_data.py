@@ -0,0 +1,89 @@
+import sys
+import os
+import time
+import pytest
+import pandas as pd
+from unittest.mock import MagicMock
+
+# Ensure tools/ is importable
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tools.market_data import (
+    MarketDataError,
+    MarketDataProvider,
+    RecordingProvider,
+    ReplayProvider,
+    get_provider,
+    set_provider,
+)
+
+
+def _fake_live_provider():
+    inner = MagicMock(spec=MarketDataProvider)
+    inner.get_last_price.return_value = 123.45
+    inner.get_info.return_value = {"currentPrice": 100, "targetMeanPrice": 120}
+    inner.get_history.return_value = pd.DataFrame(
+        {"Close": [100.0, 105.0]},
+        index=pd.to_datetime(["2025-01-02", "2025-01-03"]),
+    )
+    return inner
+
+
+# --- Test: providers must implement the whole interface ---
+def test_incomplete_provider_cannot_be_instantiated():
+    class PriceOnlyProvider(MarketDataProvider):
+        def get_last_price(self, ticker):
+            return 1.0
+
+    with pytest.raises(TypeError):
+        PriceOnlyProvider()
+
+
+# --- Test: recordings replay identically ---
+def test_record_then_replay_round_trip(tmp_path):
+    recorder = RecordingProvider(_fake_live_provider(), str(tmp_path))
+    recorder.get_last_price("AAPL")
+    recorder.get_info("AAPL")
+    recorder.get_history("AAPL", "6mo")
+
+    replay = ReplayProvider(str(tmp_path))
+    assert replay.get_last_price("AAPL") == 123.45
+    assert replay.get_info("AAPL")["targetMeanPrice"] == 120
+    history = replay.get_history("AAPL", "6mo")
+    assert list(history["Close"]) == [100.0, 105.0]
+    assert history.index[0] == pd.Timestamp("2025-01-02")
+
+
+def test_replay_missing_recording_raises(tmp_path):
+    with pytest.raises(MarketDataError):
+        ReplayProvider(str(tmp_path)).get_info("NOPE")
+
+
+# --- Test: latency and error injection ---
+def test_replay_injects_errors(tmp_path):
+    RecordingProvider(_fake_live_provider(), str(tmp_path)).get_last_price("AAPL")
+    replay = ReplayProvider(str(tmp_path), error_rate=1.0)
+    with pytest.raises(MarketDataError, match="Injected"):
+        replay.get_last_price("AAPL")
+
+
+def test_replay_adds_latency(tmp_path):
+    RecordingProvider(_fake_live_provider(), str(tmp_path)).get_last_price("AAPL")
+    replay = ReplayProvider(str(tmp_path), latency_ms=50)
+    start = time.perf_counter()
+    replay.get_last_price("AAPL")
+    assert time.perf_counter() - start >= 0.05
+
+
+# --- Test: stock tools use the configured provider ---
+def test_stock_fetcher_uses_configured_provider(tmp_path):
+    from tools.stock_fetcher import get_stock_price, price_cache
+
+    RecordingProvider(_fake_live_provider(), str(tmp_path)).get_last_price("REPLAY")
+    set_provider(ReplayProvider(str(tmp_path)))
+    try:
+        price_cache.invalidate("REPLAY")
+        assert get_stock_price("REPLAY") == 123.45
+    finally:
+        set_provider(None)
+    assert get_provider() is not None
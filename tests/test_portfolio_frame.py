@@ -0,0 +1,45 @@
+import sys
+import os
+import copy
+import pytest
+from datetime import datetime
+from typing import Optional
+from pydantic import BaseModel
+
+# Ensure workflows/ is importable
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from workflows.portfolio_frame import PortfolioFrame
+
+rows = [
+    {"stock_name": "Apple", "ticker": "aapl", "quantity": "10", "recommendation": "Buy", "uploaded_at": datetime(2025, 1, 1)},
+    {"stock_name": "Tesla", "ticker": "TSLA", "quantity": 5, "recommendation": None, "uploaded_at": datetime(2025, 1, 2)},
+]
+
+
+class State(BaseModel):
+    portfolio: Optional[PortfolioFrame] = None
+
+
+def test_from_records_builds_columns():
+    frame = PortfolioFrame.from_records(rows)
+    assert frame.tickers == ("AAPL", "TSLA")
+    assert frame.quantities == (10, 5)
+    assert len(frame) == 2
+    assert frame[1].ticker == "TSLA"
+    assert [r.stock_name for r in frame] == ["Apple", "Tesla"]
+
+
+def test_frame_is_immutable_and_copied_by_reference():
+    frame = PortfolioFrame.from_records(rows)
+    with pytest.raises(AttributeError):
+        frame.tickers = ()
+    assert copy.copy(frame) is frame
+    assert copy.deepcopy(frame) is frame
+
+
+def test_pydantic_passes_frame_through_without_rebuilding():
+    frame = PortfolioFrame.from_records(rows)
+    assert State(portfolio=frame).portfolio is frame
+    assert State(portfolio=rows).portfolio.tickers == ("AAPL", "TSLA")
+    assert State(portfolio=frame).model_dump()["portfolio"][0]["ticker"] == "AAPL"
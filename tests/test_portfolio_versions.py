@@ -0,0 +1,98 @@
+import sys
+import os
+from unittest.mock import MagicMock, patch
+import pytest
+
+# Ensure db/ is importable
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import db.portfolio_versions as versions
+
+
+def _mock_connection(fetchone=None, fetchall=None):
+    cur = MagicMock()
+    cur.fetchone.side_effect = fetchone or []
+    cur.fetchall.return_value = fetchall or []
+    conn = MagicMock()
+    conn.cursor.return_value.__enter__.return_value = cur
+    ctx = MagicMock()
+    ctx.__enter__.return_value = conn
+    return ctx, conn, cur
+
+
+def _statements(cur):
+    return [(" ".join(c[0][0].split()), c[0][1]) for c in cur.execute.call_args_list]
+
+
+ROWS = [("Apple", "AAPL", 10, 150.0, 12), ("Microsoft", "MSFT", 5, 300.0, 30)]
+
+
+# --- Versions ---
+def test_create_version_inserts_rows_and_switches_current():
+    ctx, conn, cur = _mock_connection(fetchone=[(3,), (42,)])
+    with patch("db.portfolio_versions.get_connection", return_value=ctx), \
+            patch("db.portfolio_versions.execute_values") as insert_rows:
+        result = versions.create_portfolio_version(7, ROWS)
+
+    assert result == {"version": 3, "version_id": 42, "rows": 2}
+    assert insert_rows.call_args[0][2] == [(7, 42, *row) for row in ROWS]
+
+    statements = _statements(cur)
+    assert statements[0] == ("SELECT pg_advisory_xact_lock(%s);", (7,))
+    # The old current row is cleared before the new one is set
+    clear, mark = statements[-2:]
+    assert "SET is_current = FALSE" in clear[0] and clear[1] == (7,)
+    assert "SET is_current = TRUE" in mark[0] and mark[1] == (42,)
+    conn.commit.assert_called_once()
+
+
+def test_create_version_rolls_back_on_error():
+    ctx, conn, cur = _mock_connection(fetchone=[(1,), (5,)])
+    with patch("db.portfolio_versions.get_connection", return_value=ctx), \
+            patch("db.portfolio_versions.execute_values", side_effect=ValueError("bad row")):
+        with pytest.raises(ValueError):
+            versions.create_portfolio_version(7, ROWS)
+
+    conn.rollback.assert_called_once()
+    conn.commit.assert_not_called()
+    assert not any("is_current" in sql for sql, _ in _statements(cur))
+
+
+# --- Pruning ---
+def test_prune_archives_versions_beyond_keep():
+    ctx, conn, cur = _mock_connection(fetchall=[(11,), (10,)])
+    cur.rowcount = 8
+    with patch("db.portfolio_versions.get_connection", return_value=ctx):
+        assert versions.prune_portfolio_versions(7, keep=2) == 8
+
+    statements = _statements(cur)
+    assert "ORDER BY is_current DESC, version DESC OFFSET %s" in statements[0][0]
+    assert statements[0][1] == (7, 2)
+    assert statements[1][0].startswith("INSERT INTO portfolio_archive")
+    assert all(params == ([11, 10],) for _, params in statements[1:])
+    conn.commit.assert_called_once()
+
+
+def test_prune_keeps_at_least_the_current_version():
+    ctx, conn, cur = _mock_connection(fetchall=[])
+    with patch("db.portfolio_versions.get_connection", return_value=ctx):
+        assert versions.prune_portfolio_versions(7, keep=0) == 0
+
+    assert _statements(cur)[0][1] == (7, 1)
+    assert cur.execute.call_count == 1
+
+
+def test_prune_quietly_reports_errors(capsys):
+    with patch("db.portfolio_versions.prune_portfolio_versions", side_effect=RuntimeError("db down")):
+        versions.prune_portfolio_versions_quietly(7)
+    assert "Error pruning portfolio versions for user 7" in capsys.readouterr().out
+
+
+# --- Current portfolio ---
+def test_current_quantities_read_from_current_view():
+    ctx, _, cur = _mock_connection(fetchall=[("AAPL", 15), ("MSFT", None)])
+    with patch("db.portfolio_versions.get_connection", return_value=ctx):
+        assert versions.get_current_quantities(7) == {"AAPL": 15.0, "MSFT": 0.0}
+
+    sql, params = _statements(cur)[0]
+    assert "FROM current_portfolio" in sql and params == (7,)
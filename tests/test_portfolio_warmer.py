@@ -0,0 +1,111 @@
+import sys
+import os
+import threading
+from unittest.mock import patch, MagicMock
+
+# Ensure tools/ is importable
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tools.portfolio_warmer import PortfolioWarmer
+
+
+def _mock_connection(rows):
+    cur = MagicMock()
+    cur.fetchall.return_value = rows
+    conn = MagicMock()
+    conn.cursor.return_value.__enter__.return_value = cur
+    ctx = MagicMock()
+    ctx.__enter__.return_value = conn
+    return ctx, cur
+
+
+# --- Test: one warm-up per user ---
+def test_schedule_deduplicates_per_user():
+    warmer = PortfolioWarmer(idle_timeout_seconds=5)
+    release = threading.Event()
+    monkey_warm = MagicMock(side_effect=lambda user_id, cancel_event: release.wait(2))
+
+    with patch.object(warmer, "_warm", monkey_warm):
+        assert warmer.schedule(1) is True
+        assert warmer.schedule(1) is False
+        assert warmer.schedule(2) is True
+        release.set()
+        warmer.pool.shutdown(wait=True)
+
+    assert monkey_warm.call_count == 2
+    assert not warmer.is_running(1)
+
+
+# --- Test: an upload refresh re-runs after a warm-up already in progress ---
+def test_upload_refresh_reruns_after_running_warmup():
+    warmer = PortfolioWarmer(idle_timeout_seconds=5)
+    release = threading.Event()
+    done = threading.Event()
+    calls = []
+
+    def warm(user_id, cancel_event):
+        calls.append(user_id)
+        if len(calls) == 1:
+            release.wait(2)
+        else:
+            done.set()
+
+    with patch.object(warmer, "_warm", side_effect=warm):
+        assert warmer.schedule(1) is True
+        assert warmer.schedule(1, cancel_when_idle=False) is False
+        release.set()
+        assert done.wait(2)
+
+    assert calls == [1, 1]
+
+
+# --- Test: warm-up fills caches and scores NULL recommendations ---
+@patch("tools.portfolio_warmer.record_prices")
+@patch("tools.portfolio_warmer.prefetch_stock_prices")
+@patch("tools.portfolio_warmer.get_connection")
+def test_warm_prefetches_and_fills_missing_recommendations(mock_get_connection, mock_prefetch, mock_record):
+    ctx, cur = _mock_connection([("aapl", True), ("MSFT", False)])
+    mock_get_connection.return_value = ctx
+    mock_prefetch.return_value = {"AAPL": 180.0, "MSFT": 400.0}
+    warmer = PortfolioWarmer()
+    warmer.recommender = MagicMock()
+    warmer.recommender.recommend_stock.return_value = {"Recommendation": "Buy"}
+
+    warmer._warm(1, threading.Event())
+
+    mock_prefetch.assert_called_once_with(["AAPL", "MSFT"])
+    mock_record.assert_called_once_with({"AAPL": 180.0, "MSFT": 400.0})
+    assert warmer.recommender.fetch_stock_data.call_count == 2
+    warmer.recommender.recommend_stock.assert_called_once_with("AAPL")
+    assert cur.execute.call_args[0][1] == ("Buy", 1, "AAPL")
+
+
+# --- Test: idle timeout cancels a warm-up nobody chats after ---
+def test_idle_timeout_cancels_warm_up():
+    warmer = PortfolioWarmer(idle_timeout_seconds=0.05)
+    seen = {}
+
+    def fake_warm(user_id, cancel_event):
+        seen["cancelled"] = cancel_event.wait(1)
+
+    with patch.object(warmer, "_warm", fake_warm):
+        warmer.schedule(1)
+        warmer.pool.shutdown(wait=True)
+
+    assert seen["cancelled"] is True
+
+
+# --- Test: chatting keeps the warm-up alive ---
+def test_mark_active_stops_idle_cancel():
+    warmer = PortfolioWarmer(idle_timeout_seconds=0.05)
+    seen = {}
+
+    def fake_warm(user_id, cancel_event):
+        seen["cancelled"] = cancel_event.wait(0.2)
+
+    with patch.object(warmer, "_warm", fake_warm):
+        warmer.schedule(1)
+        warmer.mark_active(1)
+        warmer.pool.shutdown(wait=True)
+
+    assert seen["cancelled"] is False
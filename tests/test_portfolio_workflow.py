@@ -0,0 +1,92 @@
+import sys
+import os
+from datetime import datetime
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+import pytest
+
+# Ensure workflows/ is importable
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from workflows.portfolio_workflow import PortfolioWorkflow
+
+portfolio = [
+    {"stock_name": "Apple", "ticker": "AAPL", "quantity": 10, "recommendation": "Buy", "uploaded_at": datetime(2025, 1, 1)},
+    {"stock_name": "Tesla", "ticker": "TSLA", "quantity": 5, "recommendation": "Sell", "uploaded_at": datetime(2025, 1, 2)},
+]
+
+
+def completion(content):
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))], usage=None)
+
+
+@pytest.fixture
+def workflow():
+    with patch("workflows.portfolio_workflow.OpenAI"), \
+            patch("workflows.portfolio_workflow.StockAdvisor") as stock_advisor, \
+            patch("workflows.portfolio_workflow.TaxAdvisor") as tax_advisor:
+        workflow = PortfolioWorkflow("test_api_key")
+    # The classifier runs the request once, with no retries or hedging
+    workflow.classifier = MagicMock()
+    workflow.classifier.call.side_effect = lambda request: request(5.0)
+    stock_advisor.return_value.ask_stock_question.return_value = "Hold AAPL."
+    tax_advisor.return_value.ask_tax_question.return_value = "Harvest the TSLA loss."
+    with patch("workflows.portfolio_workflow.prefetch_stock_prices") as prefetch:
+        workflow.prefetch = prefetch
+        yield workflow
+
+
+def classify_as(workflow, label):
+    workflow.openai_client.chat.completions.create.return_value = completion(label)
+
+
+# --- Classification ---
+@pytest.mark.parametrize("content, expected", [
+    ("stock", "stock"),
+    (" Tax\n", "tax"),
+    ("both", "both"),
+    ("unsure", "stock"),
+])
+def test_classifier_output_is_normalised(workflow, content, expected):
+    classify_as(workflow, content)
+    assert workflow.classify_query("Should I sell?") == expected
+    assert workflow.openai_client.chat.completions.create.call_args.kwargs["timeout"] == 5.0
+
+
+# --- Routing ---
+def test_stock_query_runs_only_stock_agent(workflow):
+    classify_as(workflow, "stock")
+    assert workflow.handle_query(1, "Should I sell TSLA?", portfolio) == "Hold AAPL."
+    workflow.stock_agent.ask_stock_question.assert_called_once_with("Should I sell TSLA?", 1)
+    workflow.tax_agent.ask_tax_question.assert_not_called()
+    workflow.prefetch.assert_called_once_with(("AAPL", "TSLA"))
+
+
+def test_tax_query_runs_only_tax_agent(workflow):
+    classify_as(workflow, "tax")
+    assert workflow.handle_query(1, "Minimise my tax?", portfolio) == "Harvest the TSLA loss."
+    workflow.tax_agent.ask_tax_question.assert_called_once_with(1, "Minimise my tax?")
+    workflow.stock_agent.ask_stock_question.assert_not_called()
+
+
+def test_both_runs_agents_and_merges_answers(workflow):
+    classify_as(workflow, "both")
+    response = workflow.handle_query(1, "Which losers cover my RMD?", portfolio)
+    assert response == "Portfolio view:\nHold AAPL.\n\nTax view:\nHarvest the TSLA loss."
+    workflow.stock_agent.ask_stock_question.assert_called_once()
+    workflow.tax_agent.ask_tax_question.assert_called_once()
+
+
+def test_merge_falls_back_to_the_answer_that_exists(workflow):
+    classify_as(workflow, "both")
+    workflow.tax_agent.ask_tax_question.return_value = ""
+    assert workflow.handle_query(1, "Anything?", portfolio) == "Hold AAPL."
+
+
+def test_empty_portfolio_skips_classifier_and_agents(workflow):
+    response = workflow.handle_query(1, "Should I sell?", [])
+    assert response == "No portfolio data found. Please upload your portfolio first."
+    workflow.classifier.call.assert_not_called()
+    workflow.stock_agent.ask_stock_question.assert_not_called()
+    workflow.tax_agent.ask_tax_question.assert_not_called()
+    workflow.prefetch.assert_not_called()
@@ -0,0 +1,110 @@
+import sys
+import os
+from unittest.mock import patch
+import numpy as np
+import pandas as pd
+import pytest
+
+# Ensure tools/ is importable
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tools.price_store import PriceStore
+from tools.stock_recommender import StockRecommender
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = PriceStore(str(tmp_path / "prices"))
+    days = pd.bdate_range("2024-01-01", periods=100)
+    store.upsert(pd.DataFrame({"aapl": np.arange(100.0) + 1, "MSFT": np.arange(100.0) + 101}, index=days))
+    return store
+
+
+# --- Reading ---
+def test_history_is_a_view_into_the_mapped_file(store):
+    dates, closes = store.history("AAPL", "2024-01-03", "2024-01-05")
+    assert list(closes) == [3.0, 4.0, 5.0]
+    assert str(dates[0]) == "2024-01-03"
+    assert np.shares_memory(closes, store._closes)
+
+
+def test_history_of_unknown_ticker_is_empty(store):
+    dates, closes = store.history("NOPE")
+    assert len(dates) == 0 and len(closes) == 0
+
+
+def test_history_of_unknown_ticker_in_empty_store_is_empty(tmp_path):
+    dates, closes = PriceStore(str(tmp_path / "prices")).history("NOPE")
+    assert len(dates) == 0 and len(closes) == 0
+
+
+def test_window_contiguous_columns_are_zero_copy(store):
+    _, block, names = store.window(["AAPL", "MSFT"], end="2024-01-02")
+    assert names == ["AAPL", "MSFT"]
+    assert block.tolist() == [[1.0, 101.0], [2.0, 102.0]]
+    assert np.shares_memory(block, store._closes)
+
+    _, block, names = store.window(["MSFT", "AAPL", "NOPE"], end="2024-01-01")
+    assert names == ["MSFT", "AAPL"]
+    assert block.tolist() == [[101.0, 1.0]]
+
+
+# --- Writing ---
+def test_append_day_and_ticker_in_place(store):
+    generation = store._meta["generation"]
+    added = store.upsert(pd.DataFrame({"AAPL": [500.0], "TSLA": [7.0]}, index=pd.to_datetime(["2024-05-20"])))
+
+    assert added == 1
+    assert store._meta["generation"] == generation
+    assert store.tickers == ["AAPL", "MSFT", "TSLA"]
+    _, closes = store.history("TSLA")
+    assert np.isnan(closes[:-1]).all() and closes[-1] == 7.0
+    assert np.isnan(store.history("MSFT")[1][-1])
+
+
+def test_earlier_dates_rewrite_and_other_readers_see_them(store):
+    store.upsert(pd.DataFrame({"AAPL": [0.5]}, index=pd.to_datetime(["2023-12-29"])))
+
+    reader = PriceStore(store.directory)
+    dates, closes = reader.history("AAPL", end="2024-01-02")
+    assert [str(d) for d in dates] == ["2023-12-29", "2024-01-01", "2024-01-02"]
+    assert list(closes) == [0.5, 1.0, 2.0]
+    assert len(os.listdir(store.directory)) == 3  # meta plus the current dates and closes files
+
+
+# --- Recommender ---
+def test_recommender_trend_reads_fresh_store(tmp_path):
+    store = PriceStore(str(tmp_path / "recent"))
+    days = pd.bdate_range(end=pd.Timestamp.today().normalize(), periods=200)
+    store.upsert(pd.DataFrame({"AAPL": np.linspace(100, 150, 200)}, index=days))
+
+    with patch("tools.stock_recommender.get_price_store", return_value=store), \
+         patch("tools.stock_recommender.get_provider") as provider:
+        trend = StockRecommender().price_trend("AAPL")
+    provider.assert_not_called()
+    closes = store.history("AAPL", start=store.dates[-1] - 182)[1]
+    assert len(closes) < 200
+    assert trend == pytest.approx(np.mean(closes[1:] / closes[:-1] - 1))
+
+
+def test_recommender_falls_back_when_ticker_missing(store):
+    history = pd.DataFrame({"Close": [1.0, 2.0]})
+    with patch("tools.stock_recommender.get_price_store", return_value=store), \
+         patch("tools.stock_recommender.get_provider") as provider:
+        provider.return_value.get_history.return_value = history
+        assert StockRecommender().price_trend("GOOG") == pytest.approx(1.0)
+
+
+def test_recommender_ignores_delisted_ticker_in_fresh_store(tmp_path):
+    store = PriceStore(str(tmp_path / "recent"))
+    days = pd.bdate_range(end=pd.Timestamp.today().normalize(), periods=200)
+    frame = pd.DataFrame({"AAPL": np.linspace(100, 150, 200), "OLD": np.linspace(10, 20, 200)}, index=days)
+    frame.iloc[-60:, 1] = np.nan  # OLD stopped trading about three months ago
+    store.upsert(frame)
+
+    history = pd.DataFrame({"Close": [1.0, 2.0]})
+    with patch("tools.stock_recommender.get_price_store", return_value=store), \
+         patch("tools.stock_recommender.get_provider") as provider:
+        provider.return_value.get_history.return_value = history
+        assert StockRecommender().price_trend("OLD") == pytest.approx(1.0)
+        provider.return_value.get_history.assert_called_once_with("OLD", "6mo")
@@ -0,0 +1,104 @@
+import sys
+import os
+import threading
+import time
+
+# Ensure tools/ is importable
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from tools.profiler import SamplingProfiler, run_tagged
+
+
+def sleepy_work(done: threading.Event):
+    while not done.is_set():
+        time.sleep(0.005)
+
+
+# --- Sampling ---
+def test_only_threads_running_target_are_sampled(tmp_path):
+    done = threading.Event()
+    worker = threading.Thread(target=sleepy_work, args=(done,), name="worker")
+    idle = threading.Thread(target=done.wait, name="idle")
+    worker.start()
+    idle.start()
+
+    with SamplingProfiler(interval_ms=2, target=lambda: sleepy_work.__code__) as profiler:
+        time.sleep(0.1)
+    done.set()
+    worker.join()
+    idle.join()
+
+    assert profiler.samples
+    assert all(stack.startswith("worker;") for stack in profiler.samples)
+    assert all("sleepy_work" in stack for stack in profiler.samples)
+
+
+def test_unresolved_target_skips_samples():
+    with SamplingProfiler(interval_ms=2, target=lambda: None) as profiler:
+        time.sleep(0.05)
+    assert not profiler.samples
+
+
+def pool_work(seconds: float):
+    end = time.monotonic() + seconds
+    while time.monotonic() < end:
+        time.sleep(0.002)
+
+
+def test_pool_threads_doing_request_work_are_sampled(tmp_path, monkeypatch):
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from api.middleware import ProfilingMiddleware
+
+    monkeypatch.setenv("PROFILE_DIR", str(tmp_path))
+    pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="fanout")
+    app = FastAPI()
+
+    @app.get("/fan-out")
+    def fan_out():
+        ctx = copy_context()
+        pool.submit(ctx.run, run_tagged, pool_work, 0.15).result()
+        return {"ok": True}
+
+    app.add_middleware(ProfilingMiddleware)
+    with TestClient(app) as client:
+        response = client.get("/fan-out", headers={"X-Profile": "1"})
+    pool.shutdown()
+
+    folded = open(tmp_path / response.headers["x-profile-file"]).read()
+    pool_stacks = [line for line in folded.splitlines() if line.startswith("fanout")]
+    assert pool_stacks
+    assert all("pool_work" in line for line in pool_stacks)
+
+
+def test_untagged_threads_ignored_after_request_work():
+    profiler = SamplingProfiler(interval_ms=2, target=lambda: None)
+    done = threading.Event()
+    idle = threading.Thread(target=done.wait, name="idle")
+    idle.start()
+    with profiler:
+        from tools.profiler import current_profiler
+        token = current_profiler.set(profiler)
+        try:
+            worker = threading.Thread(target=copy_context().run, args=(run_tagged, pool_work, 0.05), name="tagged")
+            worker.start()
+            worker.join()
+        finally:
+            current_profiler.reset(token)
+        time.sleep(0.02)
+    done.set()
+    idle.join()
+
+    assert profiler.samples
+    assert all(stack.startswith("tagged;") for stack in profiler.samples)
+
+
+# --- Output ---
+def test_write_folded_lines_end_with_counts(tmp_path):
+    profiler = SamplingProfiler()
+    profiler.samples.update({"main;a (x.py:1);b (x.py:2)": 3, "main;a (x.py:1)": 1})
+    path = profiler.write_folded(str(tmp_path / "out" / "p.folded"))
+    lines = open(path).read().splitlines()
+    assert lines == ["main;a (x.py:1);b (x.py:2) 3", "main;a (x.py:1) 1"]
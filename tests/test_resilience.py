@@ -0,0 +1,130 @@
+import sys
+import os
+import time
+import pytest
+from unittest.mock import MagicMock
+
+# Ensure tools/ is importable
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tools.resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    DeadlineExceeded,
+    RateLimitExceeded,
+    TokenBucket,
+    call_with_retries,
+    deadline_scope,
+    remaining_time,
+)
+from tools.market_data import MarketDataProvider, ResilientProvider
+
+
+# --- Token bucket ---
+def test_token_bucket_limits_burst():
+    bucket = TokenBucket(rate=10, capacity=2)
+    assert bucket.acquire(timeout=0)
+    assert bucket.acquire(timeout=0)
+    assert not bucket.acquire(timeout=0)
+    assert bucket.acquire(timeout=0.5)  # refills at 10/s
+
+
+def test_token_bucket_adapts_to_throttling():
+    bucket = TokenBucket(rate=8)
+    bucket.on_throttled()
+    assert bucket.rate == 4
+    for _ in range(100):
+        bucket.on_success()
+    assert bucket.rate == 8
+
+
+# --- Circuit breaker ---
+def test_circuit_opens_then_half_opens():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.05)
+    breaker.record_failure()
+    breaker.before_call()
+    breaker.record_failure()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    time.sleep(0.06)
+    breaker.before_call()  # single trial call
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+
+# --- Retries and deadlines ---
+def test_retries_until_success():
+    func = MagicMock(side_effect=[Exception("boom"), Exception("boom"), 42])
+    assert call_with_retries(func, attempts=3, base_delay=0.001) == 42
+    assert func.call_count == 3
+
+
+def test_retries_respect_deadline():
+    func = MagicMock(side_effect=Exception("boom"))
+    with deadline_scope(0.01):
+        with pytest.raises(Exception):
+            call_with_retries(func, attempts=10, base_delay=1.0, max_delay=1.0)
+    assert func.call_count == 1
+
+    with deadline_scope(0):
+        with pytest.raises(DeadlineExceeded):
+            call_with_retries(func)
+
+
+def test_nested_deadline_only_shortens():
+    with deadline_scope(10):
+        with deadline_scope(60):
+            assert remaining_time() <= 10
+    assert remaining_time() is None
+
+
+# --- Resilient provider ---
+def test_resilient_provider_fails_fast_when_open():
+    inner = MagicMock(spec=MarketDataProvider)
+    inner.get_last_price.side_effect = Exception("429 Too Many Requests")
+    provider = ResilientProvider(inner, breaker=CircuitBreaker(failure_threshold=2, reset_timeout=60), attempts=1)
+
+    for _ in range(2):
+        with pytest.raises(Exception, match="Too Many Requests"):
+            provider.get_last_price("AAPL")
+    with pytest.raises(CircuitOpenError):
+        provider.get_last_price("AAPL")
+    assert inner.get_last_price.call_count == 2
+    assert provider.buckets["last_price"].rate < 5.0
+
+
+def test_rate_limited_half_open_trial_does_not_wedge_circuit():
+    inner = MagicMock(spec=MarketDataProvider)
+    inner.get_last_price.return_value = 101.0
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+    provider = ResilientProvider(inner, breaker=breaker, attempts=1)
+    breaker.record_failure()
+    time.sleep(0.06)
+
+    # The trial call finds no token before its deadline
+    provider.buckets["last_price"].acquire = MagicMock(return_value=False)
+    with pytest.raises(RateLimitExceeded):
+        provider.get_last_price("AAPL")
+    assert not breaker.half_open_trial
+
+    del provider.buckets["last_price"].acquire
+    assert provider.get_last_price("AAPL") == 101.0
+    assert breaker.state == "closed"
+
+
+def test_stale_price_served_while_circuit_open():
+    from tools.market_data import set_provider
+    from tools.stock_fetcher import get_stock_price, price_cache, stale_price_cache
+
+    failing = MagicMock(spec=MarketDataProvider)
+    failing.get_last_price.side_effect = CircuitOpenError("open")
+    stale_price_cache.set("STALE", 99.5)
+    price_cache.invalidate("STALE")
+    set_provider(failing)
+    try:
+        assert get_stock_price("STALE") == 99.5
+    finally:
+        set_provider(None)
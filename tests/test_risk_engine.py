@@ -0,0 +1,142 @@
+import sys
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from unittest.mock import MagicMock
+
+# Ensure tools/ is importable
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tools.cache import TTLCache
+from tools.price_store import PriceStore
+from tools.risk_engine import RiskEngine, build_model, _forward_fill
+
+
+def random_closes(days=300, tickers=("AAA", "BBB", "CCC"), seed=1):
+    rng = np.random.default_rng(seed)
+    returns = rng.normal(0.0005, 0.01, (days, len(tickers))) + rng.normal(0, 0.01, (days, 1))
+    index = pd.bdate_range("2024-01-01", periods=days)
+    return pd.DataFrame(100 * np.cumprod(1 + returns, axis=0), index=index, columns=list(tickers))
+
+
+@pytest.fixture
+def engine(tmp_path):
+    store = PriceStore(str(tmp_path / "prices"))
+    store.upsert(random_closes())
+    return RiskEngine(store, TTLCache(ttl_seconds=60))
+
+
+# --- Model ---
+def test_forward_fill_keeps_leading_gaps():
+    values = np.array([[np.nan, 1.0], [2.0, np.nan], [np.nan, 3.0]])
+    filled = _forward_fill(values)
+    assert np.isnan(filled[0, 0])
+    assert filled[2, 0] == 2.0
+    assert filled[1, 1] == 1.0
+
+
+def test_covariance_matches_numpy(engine):
+    model = engine.model(["AAA", "BBB", "CCC"], lookback_days=100)
+    assert model.returns.shape == (100, 3)
+    assert np.allclose(model.covariance, np.cov(model.returns, rowvar=False))
+    assert len(model.dates) == 101
+
+
+def test_short_history_is_excluded(tmp_path):
+    frame = random_closes(days=120)
+    frame.iloc[:100, 2] = np.nan  # CCC listed 20 days ago
+    dates = frame.index.values.astype("datetime64[D]")
+    model = build_model(dates, frame.to_numpy(), list(frame.columns), missing=["ZZZ"], min_observations=60)
+    assert model.tickers == ["AAA", "BBB"]
+    assert model.excluded == ["ZZZ", "CCC"]
+    assert len(model.returns) == 119
+
+
+def test_model_cached_by_ticker_set_and_window(engine):
+    first = engine.model(["BBB", "AAA"], lookback_days=50)
+    assert engine.model(["aaa", "bbb"], lookback_days=50) is first
+    assert engine.model(["AAA", "BBB"], lookback_days=60) is not first
+    assert engine.model(["AAA", "BBB"], lookback_days=50, end="2024-06-28") is not first
+
+
+# --- Portfolio figures ---
+def test_analyse_volatility_and_var(engine):
+    risk = engine.analyse({"AAA": 10, "BBB": 20, "CCC": 0}, lookback_days=250, confidence=0.95)
+    model = engine.model(["AAA", "BBB"], lookback_days=250)
+    values = np.array([10, 20]) * model.last_closes
+    weights = values / values.sum()
+    daily = model.returns @ weights
+
+    assert risk["total_value"] == pytest.approx(values.sum(), abs=0.01)
+    assert risk["daily_volatility"] == pytest.approx(np.sqrt(weights @ model.covariance @ weights), abs=1e-6)
+    assert risk["annual_volatility"] == pytest.approx(risk["daily_volatility"] * np.sqrt(252), abs=1e-5)
+    assert risk["var_pct"] == pytest.approx(-np.quantile(daily, 0.05), abs=1e-6)
+    assert risk["cvar_pct"] >= risk["var_pct"]
+    assert risk["var"] == pytest.approx(risk["var_pct"] * risk["total_value"], abs=1)
+    assert sum(h["risk_contribution"] for h in risk["holdings"]) == pytest.approx(1, abs=1e-4)
+
+
+def test_prices_override_weights(engine):
+    risk = engine.analyse({"AAA": 1, "BBB": 1}, prices={"AAA": 300, "BBB": 100})
+    assert risk["total_value"] == 400
+    assert risk["concentration"]["top_holdings"][0] == ["AAA", 0.75]
+    assert risk["concentration"]["hhi"] == pytest.approx(0.75 ** 2 + 0.25 ** 2)
+    assert risk["concentration"]["effective_holdings"] == 1.6
+
+
+def test_max_drawdown_dates(tmp_path):
+    closes = [100, 110, 121, 99, 88, 95, 130]
+    index = pd.bdate_range("2024-01-01", periods=len(closes))
+    store = PriceStore(str(tmp_path / "prices"))
+    store.upsert(pd.DataFrame({"AAA": closes}, index=index))
+    engine = RiskEngine(store, TTLCache(ttl_seconds=60))
+
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setenv("RISK_MIN_OBSERVATIONS", "2")
+        risk = engine.analyse({"AAA": 1})
+    drawdown = risk["max_drawdown"]
+    assert drawdown["pct"] == pytest.approx(1 - 88 / 121, abs=1e-6)
+    assert drawdown["peak"] == "2024-01-03"
+    assert drawdown["trough"] == "2024-01-05"
+
+
+def test_no_history_returns_none(engine):
+    assert engine.analyse({"ZZZ": 10}) is None
+    assert RiskEngine(PriceStore("/nonexistent/prices"), TTLCache(60)).analyse({"AAA": 1}) is None
+
+
+def test_large_portfolio_fast(tmp_path):
+    import time
+    tickers = [f"T{i:03d}" for i in range(500)]
+    store = PriceStore(str(tmp_path / "prices"))
+    store.upsert(random_closes(days=260, tickers=tickers))
+    engine = RiskEngine(store, TTLCache(ttl_seconds=60))
+
+    started = time.perf_counter()
+    risk = engine.analyse({t: 10 for t in tickers})
+    assert time.perf_counter() - started < 1.0
+    assert len(risk["holdings"]) == 500
+
+
+# --- Advisor prompt ---
+def test_risk_summary_lines():
+    from agents.stock_advisor import StockAdvisor
+
+    advisor = StockAdvisor.__new__(StockAdvisor)
+    advisor.risk_engine = MagicMock()
+    advisor.risk_engine.analyse.return_value = {
+        "as_of": "2024-12-31", "observations": 252, "confidence": 0.95,
+        "annual_volatility": 0.18, "var": 1234.0, "var_pct": 0.0123, "cvar": 1500.0, "cvar_pct": 0.015,
+        "max_drawdown": {"pct": 0.2, "peak": "2024-03-01", "trough": "2024-04-01"},
+        "concentration": {"top_holdings": [["AAA", 0.6]], "top5_weight": 1.0, "effective_holdings": 1.9},
+        "holdings": [{"ticker": "AAA", "risk_contribution": 0.7}], "excluded": ["ZZZ"],
+    }
+    summary = advisor.risk_summary({"AAA": 1}, {"AAA": 10})
+    assert "Annualised volatility: 18.0%" in summary
+    assert "VaR: $1,234" in summary
+    assert "Largest risk contributors: AAA 70%" in summary
+    assert "Not enough history for: ZZZ" in summary
+
+    advisor.risk_engine.analyse.side_effect = RuntimeError("store missing")
+    assert advisor.risk_summary({"AAA": 1}, {}) is None
@@ -0,0 +1,120 @@
+import sys
+import os
+import asyncio
+import threading
+import time
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+
+# Ensure tools/ is importable
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tools.single_flight import SingleFlight
+
+
+# --- Threaded path ---
+def test_concurrent_threads_share_one_call():
+    flights = SingleFlight()
+    calls = []
+
+    def slow(x):
+        calls.append(x)
+        time.sleep(0.1)
+        return x * 2
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(lambda _: flights.do("k", slow, 21), range(8)))
+
+    assert results == [42] * 8
+    assert len(calls) == 1
+
+
+def test_errors_are_shared_and_not_remembered():
+    flights = SingleFlight()
+    started = threading.Event()
+
+    def failing():
+        started.set()
+        time.sleep(0.05)
+        raise ValueError("boom")
+
+    errors = []
+
+    def follower():
+        started.wait()
+        try:
+            flights.do("k", failing)
+        except ValueError as e:
+            errors.append(e)
+
+    t = threading.Thread(target=follower)
+    t.start()
+    with pytest.raises(ValueError):
+        flights.do("k", failing)
+    t.join()
+
+    assert len(errors) == 1
+    # The finished flight is forgotten, so the next call runs again
+    assert flights.do("k", lambda: "fresh") == "fresh"
+
+
+def test_different_keys_run_independently():
+    flights = SingleFlight()
+    assert flights.do("a", lambda: 1) == 1
+    assert flights.do("b", lambda: 2) == 2
+
+
+# --- Async path ---
+def test_concurrent_tasks_share_one_call():
+    flights = SingleFlight()
+    calls = []
+
+    async def slow():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "done"
+
+    async def main():
+        return await asyncio.gather(*(flights.do_async("k", slow) for _ in range(5)))
+
+    assert asyncio.run(main()) == ["done"] * 5
+    assert len(calls) == 1
+
+
+def test_async_errors_propagate_to_all_waiters():
+    flights = SingleFlight()
+
+    async def failing():
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+
+    async def main():
+        return await asyncio.gather(*(flights.do_async("k", failing) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(main())
+    assert all(isinstance(r, ValueError) for r in results)
+
+
+def test_cancelling_first_caller_leaves_followers_waiting():
+    flights = SingleFlight()
+    calls = []
+
+    async def slow():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "done"
+
+    async def main():
+        leader = asyncio.create_task(flights.do_async("k", slow))
+        await asyncio.sleep(0)
+        followers = [asyncio.create_task(flights.do_async("k", slow)) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        results = await asyncio.gather(leader, *followers, return_exceptions=True)
+        return results, flights._async_calls
+
+    results, remaining = asyncio.run(main())
+    assert isinstance(results[0], asyncio.CancelledError)
+    assert results[1:] == ["done", "done"]
+    assert len(calls) == 1
+    assert remaining == {}
@@ -61,7 +61,7 @@ def test_recommend_stock_with_error(monkeypatch):
     assert "Error" in result["Recommendation"]
 
 # --- Fetch Tests ---
-@patch("tools.stock_recommender.yf.Ticker")
+@patch("tools.market_data.yf.Ticker")
 def test_fetch_stock_data_valid(mock_ticker_class):
     sr = StockRecommender()
     mock_ticker = MagicMock()
@@ -84,7 +84,7 @@ def test_fetch_stock_data_valid(mock_ticker_class):
     assert "Current Price" in result
     assert isinstance(result["Price Trend"], float)
 
-@patch("tools.stock_recommender.yf.Ticker")
+@patch("tools.market_data.yf.Ticker")
 def test_fetch_stock_data_error(mock_ticker_class):
     sr = StockRecommender()
     mock_ticker = MagicMock()
@@ -108,3 +108,63 @@ def test_update_excel_with_recommendations(mock_to_excel, mock_read_excel, monke
 
     sr.update_excel_with_recommendations("mock_file.xlsx")
     assert mock_to_excel.called
+
+
+# --- Incremental Re-scoring ---
+@patch("tools.stock_recommender.apply_ticker_labels", return_value=4)
+@patch("tools.stock_recommender.save_ticker_scores")
+@patch("tools.stock_recommender.get_ticker_scores")
+@patch("tools.stock_recommender.get_connection")
+def test_refresh_rescoring_only_changed_inputs(mock_conn, mock_stored, mock_save, mock_apply, monkeypatch):
+    from tools.stock_recommender import scoring_inputs_hash
+
+    sr = StockRecommender()
+    moved = dict(mock_data_poor, Ticker="MOVED")
+    mock_stored.return_value = {
+        "AAPL": (scoring_inputs_hash(mock_data_good), 20, "Strong Buy"),
+        "MOVED": ("stale-hash", 20, "Strong Buy"),
+    }
+    data = {"AAPL": mock_data_good, "MOVED": moved, "ERR": {"Ticker": "ERR", "error": "down"}}
+    monkeypatch.setattr(sr, "fetch_stock_data", lambda ticker: data[ticker])
+
+    result = sr.refresh_recommendations(tickers=["aapl", "moved", "err"])
+
+    rescored = mock_save.call_args[0][1]
+    assert [(t, rec) for t, _, _, rec in rescored] == [("MOVED", "Sell")]
+    assert mock_apply.call_args[0][1] == ["MOVED"]
+    assert result == {
+        "tickers": 3, "rescored": 1, "unchanged": 1, "failed": 1, "labels_changed": 1, "rows_updated": 4,
+    }
+
+
+class LabelTable:
+    """Current holdings as [user_id, ticker, label] rows; runs apply_ticker_labels' two updates."""
+
+    def __init__(self, scores, holdings):
+        self.scores = scores
+        self.holdings = [list(h) for h in holdings]
+        self.rowcount = 0
+
+    def execute(self, sql, params):
+        if "ANY(%s)" in sql:
+            rows = [h for h in self.holdings if h[1] in params[0] and h[2] != self.scores[h[1]]]
+        else:
+            rows = [h for h in self.holdings if h[2] is None and params[0] in (None, h[0])]
+        for row in rows:
+            row[2] = self.scores[row[1]]
+        self.rowcount = len(rows)
+
+
+def test_user_refresh_relabels_every_holder_of_changed_ticker():
+    from db.ticker_scores import apply_ticker_labels
+
+    table = LabelTable({"MOVED": "Sell", "NEW": "Buy"}, [
+        (7, "MOVED", "Buy"), (8, "MOVED", "Buy"), (7, "NEW", None), (8, "NEW", None),
+    ])
+    # User 7's refresh re-scored MOVED; the nightly run will find its hash unchanged
+    assert apply_ticker_labels(table, ["MOVED"], user_id=7) == 3
+    assert table.holdings == [[7, "MOVED", "Sell"], [8, "MOVED", "Sell"], [7, "NEW", "Buy"], [8, "NEW", None]]
+
+    # Nothing re-scored: only the unlabelled sweep runs
+    assert apply_ticker_labels(table, []) == 1
+    assert table.holdings[3] == [8, "NEW", "Buy"]
@@ -0,0 +1,86 @@
+import sys
+import os
+from decimal import Decimal
+from unittest.mock import MagicMock, patch
+import pytest
+
+# Ensure agents/ is importable
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from agents.tax_advisor import TaxAdvisor
+
+
+@pytest.fixture
+def advisor():
+    advisor = TaxAdvisor("test_api_key")
+    advisor.llm = MagicMock(model_name="gpt-4")
+    advisor.llm.invoke.return_value = MagicMock(content="answer")
+    return advisor
+
+
+def prompt_for(advisor, profile, prices, **kwargs):
+    with patch.object(advisor, "_fetch_tax_profile", return_value=profile), \
+         patch("agents.tax_advisor.prefetch_stock_prices", return_value=prices):
+        answer = advisor.ask_tax_question(1, "How much tax will my RMD trigger?", **kwargs)
+    assert answer == "answer"
+    return advisor.llm.invoke.call_args[0][0][0].content
+
+
+# --- Precomputed figures ---
+def test_prompt_includes_gains_and_rmd_tax(advisor):
+    profile = (73, [("AAPL", Decimal("100"), 10, 24), ("TSLA", Decimal("300"), 5, 6)])
+    prompt = prompt_for(advisor, profile, {"AAPL": 150.0, "TSLA": 200.0}, income=40_000, ira_balance=530_000)
+
+    assert "long-term +500, short-term -500" in prompt
+    assert "Taking the RMD of $20,000" in prompt
+    assert "IRMAA tier" in prompt
+    assert "income $40,000" in prompt
+
+
+def test_rmd_line_omitted_before_rmd_age(advisor):
+    prompt = prompt_for(advisor, (60, []), {}, ira_balance=500_000)
+    assert "RMD" not in prompt.split("Question:")[0]
+    assert "assumed $0" in prompt
+
+
+def test_unknown_filing_status_is_reported(advisor):
+    with patch.object(advisor, "_fetch_tax_profile", return_value=(60, [])):
+        answer = advisor.ask_tax_question(1, "?", filing_status="widowed")
+    assert "Unknown filing status" in answer
+    advisor.llm.invoke.assert_not_called()
+
+
+# --- Stored analyses ---
+def test_small_price_move_still_serves_stored_analysis(advisor):
+    from tools.tax_analyser import portfolio_hash, stock_data_from_rows
+
+    stock_data = stock_data_from_rows([("TSLA", 300, 10, 6)])
+    nightly = {"ticker": "TSLA", "harvestable_loss": 1100.0, "holding_period": "short", "wash_sale_conflict": False}
+    stored = {portfolio_hash({"TSLA": "Sell"}, stock_data, [nightly]): "stored analysis"}
+    advisor.tax_analyser = MagicMock()
+
+    # Daytime quotes moved the loss by 2%
+    daytime = dict(nightly, harvestable_loss=1122.0)
+    with patch.object(advisor, "_fetch_portfolio_data", return_value=stock_data), \
+         patch.object(advisor, "find_harvest_opportunities", return_value={1: [daytime]}), \
+         patch("agents.tax_advisor.get_stored_analysis", side_effect=lambda user_id, digest: stored.get(digest)):
+        assert advisor.analyse_tax_strategy(1, {"TSLA": "Sell"}) == "stored analysis"
+        advisor.tax_analyser.analyse_selling_strategy.assert_not_called()
+
+
+def test_harvest_scan_prefetches_quotes_in_one_batch(advisor):
+    cur = MagicMock()
+    cur.fetchall.return_value = [(1, "aapl", 10, Decimal("150"), 24), (1, "TSLA", 5, Decimal("300"), 3), (2, "AAPL", 1, Decimal("90"), 1)]
+    conn = MagicMock()
+    conn.cursor.return_value.__enter__.return_value = cur
+    ctx = MagicMock()
+    ctx.__enter__.return_value = conn
+    advisor.scanner = MagicMock()
+
+    with patch("agents.tax_advisor.get_connection", return_value=ctx), \
+         patch("agents.tax_advisor.prefetch_stock_prices", return_value={"AAPL": 100.0, "TSLA": 200.0}) as prefetch:
+        advisor.find_harvest_opportunities()
+
+    prefetch.assert_called_once()
+    assert sorted(set(prefetch.call_args[0][0])) == ["AAPL", "TSLA"]
+    assert advisor.scanner.scan.call_args[0][5] == {"AAPL": 100.0, "TSLA": 200.0}
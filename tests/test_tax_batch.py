@@ -0,0 +1,101 @@
+import sys
+import os
+from decimal import Decimal
+from unittest.mock import MagicMock, patch
+import pytest
+
+# Ensure tools/ is importable
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tools.tax_analyser import portfolio_hash, stock_data_from_rows
+from tools.tax_batch import TaxBatchJob
+
+# (user_id, ticker, buy_price, quantity, holding_period_months, recommendation)
+rows = [
+    (1, "AAPL", Decimal("100"), 10, 24, "Sell"),
+    (1, "TSLA", None, 5, 12, None),
+    (2, "MSFT", Decimal("300"), 3, 6, "Hold"),
+]
+
+
+@pytest.fixture
+def job():
+    job = TaxBatchJob("test_api_key", chunk_size=10, max_concurrency=2)
+    job.analyser.llm = MagicMock(model_name="gpt-4")
+    job.recommender = MagicMock()
+    job.recommender.recommend_stock.return_value = {"Recommendation": "Hold"}
+    job.scanner = MagicMock()
+    job.scanner.scan.return_value = {}
+    return job
+
+
+def user_hash(user_id, recommendations):
+    lots = [(t, b, q, m) for u, t, b, q, m, _ in rows if u == user_id]
+    return portfolio_hash(recommendations, stock_data_from_rows(lots))
+
+
+# --- Hashing ---
+def test_hash_ignores_recommendations_for_tickers_not_held():
+    data = stock_data_from_rows([("aapl", 100, 10, 24)])
+    assert portfolio_hash({"AAPL": "Sell"}, data) == portfolio_hash({"AAPL": "Sell", "X": "Buy"}, data)
+    assert portfolio_hash({"AAPL": "Sell"}, data) != portfolio_hash({"AAPL": "Hold"}, data)
+
+
+# --- Chunks ---
+def test_unchanged_users_are_skipped(job):
+    stored = {2: user_hash(2, {"MSFT": "Hold"})}
+    job.analyser.llm.batch.return_value = [MagicMock(content="sell AAPL first")]
+
+    with patch("tools.tax_batch.prefetch_stock_prices", return_value={}):
+        results, skipped, failed = job.analyse_chunk(rows, stored)
+
+    assert skipped == 1 and failed == 0
+    assert results == [(1, user_hash(1, {"AAPL": "Sell", "TSLA": "Hold"}), "sell AAPL first")]
+    prompts, = job.analyser.llm.batch.call_args[0]
+    assert len(prompts) == 1
+    assert job.analyser.llm.batch.call_args[1]["config"] == {"max_concurrency": 2}
+    job.recommender.recommend_stock.assert_called_once_with("TSLA")
+
+
+def test_failed_users_are_not_stored(job):
+    job.analyser.llm.batch.return_value = [RuntimeError("rate limited"), MagicMock(content="ok")]
+
+    with patch("tools.tax_batch.prefetch_stock_prices", return_value={}):
+        results, skipped, failed = job.analyse_chunk(rows, {})
+
+    assert failed == 1 and skipped == 0
+    assert [r[0] for r in results] == [2]
+
+
+def test_harvest_losses_hashed_by_band():
+    data = stock_data_from_rows([("MSFT", 300, 3, 6)])
+    loss = {"ticker": "MSFT", "harvestable_loss": 120.0, "holding_period": "short", "wash_sale_conflict": False}
+
+    def digest(*opportunities):
+        return portfolio_hash({"MSFT": "Hold"}, data, list(opportunities))
+
+    assert digest(loss) == digest(dict(loss, harvestable_loss=123.4))  # a small price move
+    assert digest(loss) != digest(dict(loss, harvestable_loss=180.0))
+    assert digest(loss) != digest()
+    assert digest(loss) != digest(dict(loss, wash_sale_conflict=True))
+    other = dict(loss, ticker="AAPL")
+    assert digest(loss, other) == digest(other, loss)  # ranking order does not matter
+
+
+def test_grown_harvest_loss_invalidates_stored_analysis(job):
+    loss = {"ticker": "MSFT", "harvestable_loss": 120.0, "holding_period": "short", "wash_sale_conflict": False}
+    lots = [(t, b, q, m) for u, t, b, q, m, _ in rows if u == 2]
+    stored = {2: portfolio_hash({"MSFT": "Hold"}, stock_data_from_rows(lots), [loss])}
+    job.analyser.llm.batch.return_value = [MagicMock(content="a"), MagicMock(content="b")]
+
+    # Same holdings, but the loss quoted in the stored prompt has grown by half
+    job.scanner.scan.return_value = {2: [dict(loss, harvestable_loss=180.0)]}
+    with patch("tools.tax_batch.prefetch_stock_prices", return_value={}):
+        results, skipped, failed = job.analyse_chunk(rows, stored)
+    assert skipped == 0 and [r[0] for r in results] == [1, 2]
+    prompts, = job.analyser.llm.batch.call_args[0]
+    assert "loss 180.0" in prompts[1][0].content
+
+    job.scanner.scan.return_value = {2: [dict(loss, harvestable_loss=121.5)]}
+    with patch("tools.tax_batch.prefetch_stock_prices", return_value={}):
+        assert job.analyse_chunk(rows, stored)[1] == 1
@@ -0,0 +1,56 @@
+import sys
+import os
+import numpy as np
+import pytest
+
+# Ensure tools/ is importable
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tools.tax_calculator import federal_tax, irmaa, tax_breakdown, tax_table
+
+
+# --- Federal tax ---
+def test_federal_tax_matches_2025_single_brackets():
+    taxes = federal_tax(np.array([50_000, 100_000, 200_000]), np.array([0, 20_000, 0]))
+    assert taxes == pytest.approx([3_871.5, 16_449, 37_067], abs=1)
+
+
+def test_federal_tax_uses_requested_year_and_status():
+    assert federal_tax(50_000, year=2024) == pytest.approx(4_016, abs=1)
+    assert federal_tax(100_000, 0, "married_joint") == pytest.approx(7_743, abs=1)
+
+
+def test_federal_tax_senior_deduction_scale_and_loss_limit():
+    assert federal_tax(17_750, 0, seniors=1) == pytest.approx(0)
+    assert federal_tax(100_000, 0, scale=2.0) == pytest.approx(2 * federal_tax(50_000, 0))
+    assert federal_tax(50_000, -10_000) == pytest.approx(federal_tax(47_000, 0))
+
+
+def test_unknown_year_or_status_raises():
+    with pytest.raises(ValueError):
+        tax_table("single", 1999)
+    with pytest.raises(ValueError):
+        federal_tax(1, filing_status="widowed")
+
+
+# --- Marginal rates ---
+def test_breakdown_marginal_rate_and_headroom():
+    result = tax_breakdown([10_000, 60_000, 60_000], [0, 0, 10_000])
+    assert result["marginal_rate"] == pytest.approx([0.0, 0.12, 0.27], abs=1e-6)
+    assert result["bracket_headroom"][0] == pytest.approx(15_750 - 10_000 + 11_925)
+    assert result["bracket_headroom"][1] == pytest.approx(48_475 - 44_250)
+    assert result["total_tax"] == pytest.approx(federal_tax([10_000, 60_000, 60_000], [0, 0, 10_000]))
+
+
+# --- IRMAA ---
+def test_irmaa_tiers_apply_above_threshold():
+    result = irmaa([106_000, 106_001, 600_000])
+    assert list(result["tier"]) == [0, 1, 5]
+    assert result["annual_surcharge"][0] == 0
+    assert result["annual_surcharge"][1] == pytest.approx((259.00 - 185.00 + 13.70) * 12)
+    assert result["headroom"][1] == pytest.approx(133_000 - 106_001)
+    assert np.isinf(result["headroom"][2])
+
+
+def test_irmaa_married_separate_jumps_to_high_tier():
+    assert irmaa(120_000, "married_separate", 2025)["part_b_monthly"] == pytest.approx(591.90)
@@ -0,0 +1,84 @@
+import sys
+import os
+import numpy as np
+from datetime import date
+
+# Ensure tools/ is importable
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tools.tax_loss_scanner import TaxLossScanner, acquired_from_holding_months
+
+AS_OF = date(2025, 6, 30)
+
+# --- Mock Data: two users, three lots each ---
+lots = {
+    "user_ids": [1, 1, 1, 2, 2, 2],
+    "tickers": ["AAPL", "TSLA", "MSFT", "TSLA", "INTC", "AAPL"],
+    "quantities": [10, 5, 8, 4, 100, 2],
+    "buy_prices": [200.0, 300.0, 250.0, 150.0, 40.0, 100.0],
+    "acquired_on": np.array(
+        ["2022-01-10", "2025-01-15", "2020-03-01", "2023-05-01", "2024-12-01", "2021-01-01"],
+        dtype="datetime64[D]",
+    ),
+}
+prices = {"AAPL": 180.0, "TSLA": 250.0, "MSFT": 400.0, "INTC": 20.0}
+
+
+def test_scan_ranks_losses_per_user():
+    result = TaxLossScanner().scan(**lots, prices=prices, as_of=AS_OF)
+
+    assert [o["ticker"] for o in result[1]] == ["TSLA", "AAPL"]  # MSFT is a gain
+    assert result[1][0]["harvestable_loss"] == 250.0
+    assert result[1][0]["holding_period"] == "short"
+    assert result[1][1]["holding_period"] == "long"
+    assert [o["ticker"] for o in result[2]] == ["INTC"]
+    assert result[2][0]["unrealized_gain"] == -2000.0
+
+
+def test_scan_flags_wash_sale_conflicts():
+    purchases = ([1, 2], ["AAPL", "INTC"], np.array(["2025-06-20", "2025-01-01"], dtype="datetime64[D]"))
+    result = TaxLossScanner().scan(**lots, prices=prices, as_of=AS_OF, purchases=purchases)
+
+    aapl = next(o for o in result[1] if o["ticker"] == "AAPL")
+    assert aapl["wash_sale_conflict"] is True
+    assert result[2][0]["wash_sale_conflict"] is False
+    # Conflicted lots are ranked behind clean ones
+    assert result[1][-1]["ticker"] == "AAPL"
+
+
+def test_scan_own_recent_purchase_is_not_a_conflict():
+    result = TaxLossScanner().scan(
+        user_ids=[1], tickers=["TSLA"], quantities=[5], buy_prices=[300.0],
+        acquired_on=np.array(["2025-06-25"], dtype="datetime64[D]"),
+        prices=prices, as_of=AS_OF,
+    )
+    assert result[1][0]["wash_sale_conflict"] is False
+
+
+def test_wash_sales_with_large_user_ids_and_many_tickers():
+    # Packing raw IDs with 5,001 tickers into int64 keys wraps, and these two users' keys collide
+    big, other = 430_000, 430_000 + 2 ** 32
+    fillers = [f"T{i:04d}" for i in range(5000)]
+    result = TaxLossScanner().scan(
+        user_ids=[big, other] + [1] * len(fillers),
+        tickers=["AAPL", "AAPL"] + fillers,
+        quantities=[10, 10] + [1] * len(fillers),
+        buy_prices=[200.0, 200.0] + [1.0] * len(fillers),
+        acquired_on=np.array(["2022-01-10"] * (2 + len(fillers)), dtype="datetime64[D]"),
+        prices={"AAPL": 180.0},
+        as_of=AS_OF,
+        purchases=([big], ["AAPL"], np.array(["2025-06-20"], dtype="datetime64[D]")),
+    )
+    assert result[big][0]["wash_sale_conflict"] is True
+    assert result[other][0]["wash_sale_conflict"] is False
+
+
+def test_scan_skips_missing_prices_and_min_loss():
+    result = TaxLossScanner(min_loss=300).scan(**lots, prices={"AAPL": 180.0}, as_of=AS_OF)
+    assert result == {}
+
+
+def test_acquired_from_holding_months():
+    dates = acquired_from_holding_months([0, 12], as_of=AS_OF)
+    assert dates[0] == np.datetime64("2025-06-30")
+    assert (np.datetime64("2025-06-30") - dates[1]).astype(int) == 365
@@ -0,0 +1,153 @@
+import sys
+import os
+import threading
+from contextvars import copy_context
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+# Ensure tools/ is importable
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tools.tracing import OTLPHttpExporter, Tracer, count, record_llm_usage, request_id_var, tracer
+
+
+class ListExporter:
+    def __init__(self):
+        self.batches = []
+
+    def export(self, spans):
+        self.batches.append(spans)
+
+
+@pytest.fixture
+def exporter(monkeypatch):
+    exporter = ListExporter()
+    monkeypatch.setattr(tracer, "exporter", exporter)
+    return exporter
+
+
+# --- Spans ---
+def test_nested_spans_share_trace_and_export_once(exporter):
+    with tracer.span("root") as root:
+        with tracer.span("child") as child:
+            count("price_cache.hits")
+            count("price_cache.hits")
+    tracer.flush()
+
+    assert len(exporter.batches) == 1
+    spans = {s.name: s for s in exporter.batches[0]}
+    assert spans["child"].parent_id == root.span_id
+    assert spans["child"].trace_id == root.trace_id
+    assert child.attributes["price_cache.hits"] == 2
+    assert spans["child"].duration_ms >= 0
+
+
+def test_spans_follow_context_into_worker_threads(exporter):
+    wrapped = tracer.wrap("tool", lambda: count("calls"))
+    with tracer.span("root") as root:
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            for _ in range(4):
+                pool.submit(copy_context().run, wrapped).result()
+    tracer.flush()
+
+    tools = [s for s in exporter.batches[0] if s.name == "tool"]
+    assert len(tools) == 4
+    assert all(s.parent_id == root.span_id for s in tools)
+
+
+def test_spans_outliving_their_root_are_exported_alone(exporter):
+    started, release = threading.Event(), threading.Event()
+
+    def background():
+        with tracer.span("background"):
+            started.set()
+            release.wait()
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        with tracer.span("root") as root:
+            running = pool.submit(copy_context().run, background)
+            started.wait()
+            ctx = copy_context()
+        pool.submit(ctx.run, tracer.wrap("late", lambda: None)).result()
+        release.set()
+        running.result()
+    tracer.flush()
+
+    assert [[s.name for s in batch] for batch in exporter.batches] == [["root"], ["late"], ["background"]]
+    assert all(s.trace_id == root.trace_id and s.end_ns for batch in exporter.batches for s in batch)
+    assert tracer._pending == {}
+
+
+def test_errors_mark_span(exporter):
+    with pytest.raises(ValueError):
+        with tracer.span("root"):
+            raise ValueError("boom")
+    tracer.flush()
+    assert exporter.batches[0][0].status == "error"
+
+
+def test_disabled_tracer_records_nothing():
+    with Tracer(None).span("root") as span:
+        count("anything")
+    assert span is None
+
+
+# --- Attributes ---
+def test_llm_usage_from_langchain_and_openai(exporter):
+    with tracer.span("llm") as span:
+        record_llm_usage(SimpleNamespace(usage_metadata={"input_tokens": 10, "output_tokens": 3}), "gpt-4")
+        record_llm_usage(SimpleNamespace(usage=SimpleNamespace(prompt_tokens=5, completion_tokens=1)))
+    assert span.attributes["llm.prompt_tokens"] == 15
+    assert span.attributes["llm.completion_tokens"] == 4
+    assert span.attributes["llm.calls"] == 2
+    assert span.attributes["llm.model"] == "gpt-4"
+
+
+def test_request_id_is_stored_on_spans(exporter):
+    token = request_id_var.set("req-1")
+    try:
+        with tracer.span("root") as span:
+            pass
+    finally:
+        request_id_var.reset(token)
+    assert span.attributes["request_id"] == "req-1"
+
+
+# --- Export ---
+def test_otlp_payload_shape(exporter):
+    with tracer.span("root", holdings=3):
+        with tracer.span("child"):
+            pass
+    tracer.flush()
+
+    payload = OTLPHttpExporter("http://collector").payload(exporter.batches[0])
+    spans = payload["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    root = next(s for s in spans if s["name"] == "root")
+    assert len(root["traceId"]) == 32 and len(root["spanId"]) == 16
+    assert {"key": "holdings", "value": {"intValue": "3"}} in root["attributes"]
+    assert "parentSpanId" not in root
+
+
+# --- Middleware ---
+def test_middleware_echoes_request_id_and_names_root_span(exporter):
+    from api.middleware import RequestIdMiddleware
+
+    app = FastAPI()
+    app.add_middleware(RequestIdMiddleware)
+
+    @app.get("/items/{item_id}")
+    def read_item(item_id: int):
+        with tracer.span("handler"):
+            return {"request_id": request_id_var.get()}
+
+    response = TestClient(app).get("/items/1", headers={"X-Request-ID": "abc"})
+    tracer.flush()
+
+    assert response.headers["x-request-id"] == "abc"
+    assert response.json() == {"request_id": "abc"}
+    spans = {s.name: s for s in exporter.batches[0]}
+    assert spans["GET /items/{item_id}"].attributes["status_code"] == 200
+    assert spans["handler"].attributes["request_id"] == "abc"
@@ -0,0 +1,160 @@
+import sys
+import os
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+import pandas as pd
+import pytest
+
+# Ensure tools/ is importable
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tools.upload_worker import UploadWorker, parse_row
+
+
+def row(**overrides):
+    values = dict(stock_name="Apple", ticker=" aapl ", quantity=10, buy_price=150.0, holding_period_months=24)
+    values.update(overrides)
+    return SimpleNamespace(**values)
+
+
+def staged_file(tmp_path, df):
+    path = tmp_path / "upload.xlsx"
+    df.to_excel(path, index=False)
+    return str(path)
+
+
+# --- Row validation ---
+def test_parse_row_normalises_values():
+    assert parse_row(row()) == ("Apple", "AAPL", 10, 150.0, 24)
+    assert parse_row(row(buy_price=float("nan"), holding_period_months=None)) == ("Apple", "AAPL", 10, None, None)
+
+
+@pytest.mark.parametrize("overrides, reason", [
+    ({"ticker": None}, "missing ticker"),
+    ({"quantity": float("nan")}, "missing quantity"),
+    ({"quantity": "ten"}, "non-numeric"),
+    ({"quantity": 1.5}, "fractional"),
+])
+def test_parse_row_rejects_invalid_rows(overrides, reason):
+    with pytest.raises(ValueError, match=reason):
+        parse_row(row(**overrides))
+
+
+# --- Job processing ---
+@patch("tools.upload_worker.prune_portfolio_versions_quietly")
+@patch("tools.upload_worker.rebuild_valuation")
+@patch("tools.upload_worker.create_portfolio_version", return_value={"version": 3})
+@patch("tools.upload_worker.update_upload_job")
+@patch("tools.upload_worker.finish_upload_job")
+@patch("tools.upload_worker.portfolio_warmer")
+def test_job_loads_valid_rows_and_queues_refresh(warmer, finish, update, create, rebuild, prune, tmp_path):
+    df = pd.DataFrame({"stock_name": ["A", "B", "C"], "ticker": ["AAPL", None, "MSFT"], "quantity": [1, 2, 3]})
+    path = staged_file(tmp_path, df)
+
+    UploadWorker(max_workers=1)._run(7, 1, path)
+
+    create.assert_called_once_with(1, [("A", "AAPL", 1, None, None), ("C", "MSFT", 3, None, None)])
+    update.assert_called_with(7, "loading", 3, [{"row": 3, "reason": "missing ticker"}])
+    finish.assert_called_once_with(7, version=3)
+    warmer.schedule.assert_called_once_with(1, cancel_when_idle=False)
+    assert not os.path.exists(path)
+
+
+@patch("tools.upload_worker.create_portfolio_version")
+@patch("tools.upload_worker.update_upload_job")
+@patch("tools.upload_worker.finish_upload_job")
+@patch("tools.upload_worker.portfolio_warmer")
+def test_job_fails_on_missing_columns(warmer, finish, update, create, tmp_path):
+    path = staged_file(tmp_path, pd.DataFrame({"ticker": ["AAPL"]}))
+
+    UploadWorker(max_workers=1)._run(8, 1, path)
+
+    assert "Missing required columns" in finish.call_args.kwargs["error"]
+    create.assert_not_called()
+    warmer.schedule.assert_not_called()
+    assert not os.path.exists(path)
+
+
+# --- Recovery ---
+@patch("tools.upload_worker.finish_upload_job")
+@patch("tools.upload_worker.recover_upload_jobs")
+def test_recover_resubmits_queued_and_cleans_up_the_rest(recover, finish, tmp_path):
+    queued, interrupted = tmp_path / "queued.xlsx", tmp_path / "interrupted.xlsx"
+    queued.write_bytes(b"x")
+    interrupted.write_bytes(b"x")
+    recover.return_value = [
+        (1, 10, str(queued), "queued"),
+        (2, 11, str(tmp_path / "gone.xlsx"), "queued"),
+        (3, 12, str(interrupted), "parsing"),
+    ]
+
+    worker = UploadWorker(max_workers=1)
+    with patch.object(worker, "pool") as pool:
+        assert worker.recover() == 1
+
+    assert recover.call_args[0][0] == worker.owner
+    pool.submit.assert_called_once_with(worker._run, 1, 10, str(queued))
+    finish.assert_called_once_with(2, error="Staged file is missing; please upload again.")
+    assert queued.exists() and not interrupted.exists()
+
+
+def test_recover_claims_only_stale_jobs_and_fails_started_ones():
+    import db.upload_jobs as upload_jobs
+
+    cur = MagicMock()
+    cur.fetchall.return_value = [(1, 10, "a.xlsx", "queued"), (3, 12, "b.xlsx", "loading")]
+    conn = MagicMock()
+    conn.cursor.return_value.__enter__.return_value = cur
+    ctx = MagicMock()
+    ctx.__enter__.return_value = conn
+
+    with patch("db.upload_jobs.get_connection", return_value=ctx):
+        jobs = upload_jobs.recover_upload_jobs("host:2:abc", 120, "restarted")
+
+    assert [job[0] for job in jobs] == [1, 3]
+    claim, update = cur.execute.call_args_list
+    assert "heartbeat_at < NOW() - make_interval(secs => %s)" in claim[0][0]
+    assert "FOR UPDATE SKIP LOCKED" in claim[0][0]
+    assert claim[0][1] == ("host:2:abc", 120)
+    assert update[0][1] == ("restarted", [3])
+    conn.commit.assert_called_once()
+
+
+def test_submit_starts_one_heartbeat_thread_per_process():
+    worker = UploadWorker(max_workers=1)
+    with patch.object(worker, "_maintain") as maintain, patch.object(worker, "pool"):
+        worker.submit(1, 10, "a.xlsx")
+        worker.submit(2, 10, "b.xlsx")
+    assert maintain.call_count == 1
+    assert worker.owner.endswith(f":{os.getpid()}:{worker._token}")
+
+
+@patch("tools.upload_worker.time.sleep", side_effect=StopIteration)
+@patch("tools.upload_worker.recover_upload_jobs", return_value=[])
+@patch("tools.upload_worker.heartbeat_upload_jobs")
+def test_maintenance_heartbeats_own_jobs_then_recovers(heartbeat, recover, sleep):
+    worker = UploadWorker(max_workers=1)
+    with pytest.raises(StopIteration):
+        worker._maintain()
+    heartbeat.assert_called_once_with(worker.owner)
+    recover.assert_called_once()
+
+
+# --- Staging ---
+def test_staged_file_removed_when_job_row_fails(tmp_path, monkeypatch):
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from api.portfolio import router
+
+    monkeypatch.setenv("UPLOAD_DIR", str(tmp_path))
+    app = FastAPI()
+    app.include_router(router)
+    with patch("api.portfolio.create_upload_job", side_effect=RuntimeError("db down")), \
+            patch("api.portfolio.upload_worker") as worker:
+        response = TestClient(app).post(
+            "/portfolio/upload-excel", data={"user_id": 1}, files={"file": ("p.xlsx", b"x")}
+        )
+
+    assert response.status_code == 500
+    worker.submit.assert_not_called()
+    assert os.listdir(tmp_path) == []
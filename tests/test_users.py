@@ -0,0 +1,91 @@
+import sys
+import os
+from unittest.mock import MagicMock, patch
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+# Ensure db/ and api/ are importable
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import db.users as users
+from api.users import router
+
+ROW = (7, "Ada", "Lovelace", "ada@example.com", 70)
+
+
+def _mock_connection(row):
+    cur = MagicMock()
+    cur.fetchone.return_value = row
+    conn = MagicMock()
+    conn.cursor.return_value.__enter__.return_value = cur
+    ctx = MagicMock()
+    ctx.__enter__.return_value = conn
+    return ctx, cur
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    users.user_cache.clear()
+    yield
+    users.user_cache.clear()
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.include_router(router)
+    return TestClient(app)
+
+
+# --- Cache ---
+def test_lookups_by_id_and_email_share_one_query():
+    ctx, cur = _mock_connection(ROW)
+    with patch("db.users.get_connection", return_value=ctx) as connect:
+        assert users.get_user(7)["email"] == "ada@example.com"
+        assert users.get_user_by_email("ada@example.com")["user_id"] == 7
+        assert users.get_user(7)["age"] == 70
+    assert connect.call_count == 1
+
+
+def test_misses_are_not_cached():
+    ctx, _ = _mock_connection(None)
+    with patch("db.users.get_connection", return_value=ctx) as connect:
+        assert users.get_user(8) is None
+        assert users.get_user(8) is None
+    assert connect.call_count == 2
+
+
+def test_invalidate_drops_both_keys():
+    users._remember(users._to_user(ROW))
+    users.invalidate_user(7)
+    assert ("id", 7) not in users.user_cache
+    assert ("email", "ada@example.com") not in users.user_cache
+
+
+# --- Registration ---
+def test_register_is_single_upsert_and_conflict_returns_409(client):
+    ctx, cur = _mock_connection(None)
+    with patch("db.users.get_connection", return_value=ctx):
+        response = client.post("/users/register", json={
+            "email": "ada@example.com", "first_name": "Ada", "last_name": "Lovelace", "age": 70,
+        })
+    assert response.status_code == 409
+    assert cur.execute.call_count == 1
+    assert "ON CONFLICT (email) DO NOTHING" in cur.execute.call_args[0][0]
+
+
+# --- Conditional GET ---
+def test_get_user_returns_304_for_matching_etag(client):
+    ctx, _ = _mock_connection(ROW)
+    with patch("db.users.get_connection", return_value=ctx) as connect:
+        first = client.get("/users/7")
+        etag = first.headers["ETag"]
+        second = client.get("/users/7", headers={"If-None-Match": f'W/{etag}, "other"'})
+        stale = client.get("/users/7", headers={"If-None-Match": '"other"'})
+
+    assert first.status_code == 200 and first.json()["first_name"] == "Ada"
+    assert second.status_code == 304 and second.content == b""
+    assert second.headers["ETag"] == etag
+    assert stale.status_code == 200
+    assert connect.call_count == 1
@@ -0,0 +1,76 @@
+import sys
+import os
+from unittest.mock import MagicMock, patch
+
+# Ensure db/ is importable
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import db.valuations as valuations
+
+
+def _mock_connection(fetchone=None, fetchall=None):
+    cur = MagicMock()
+    cur.fetchone.side_effect = fetchone or []
+    cur.fetchall.return_value = fetchall or []
+    conn = MagicMock()
+    conn.cursor.return_value.__enter__.return_value = cur
+    ctx = MagicMock()
+    ctx.__enter__.return_value = conn
+    return ctx, conn, cur
+
+
+def _statements(cur):
+    return [(" ".join(c[0][0].split()), c[0][1]) for c in cur.execute.call_args_list]
+
+
+def _locks(cur):
+    return [params[0] for sql, params in _statements(cur) if "pg_advisory_xact_lock" in sql]
+
+
+# --- Deltas ---
+def test_record_prices_applies_deltas_under_sorted_locks():
+    # MSFT had a snapshot at 300, AAPL had none
+    ctx, conn, cur = _mock_connection(fetchone=[None, (300.0,)])
+    with patch("db.valuations.get_connection", return_value=ctx):
+        changed = valuations.record_prices({"msft": 310.0, "AAPL": 190.0, "TSLA": None})
+
+    assert changed == 2
+    assert _locks(cur) == ["AAPL", "MSFT"]
+    updates = [params for sql, params in _statements(cur) if sql.startswith("UPDATE portfolio_valuations")]
+    assert updates == [(190.0, "AAPL"), (10.0, "MSFT")]
+    conn.commit.assert_called_once()
+
+
+def test_record_prices_skips_unchanged_price():
+    ctx, _, cur = _mock_connection(fetchone=[(189.5,)])
+    with patch("db.valuations.get_connection", return_value=ctx):
+        assert valuations.record_prices({"AAPL": 189.5}) == 0
+    assert not any(sql.startswith(("INSERT", "UPDATE")) for sql, _ in _statements(cur))
+
+
+# --- Rebuild ---
+def test_rebuild_takes_ticker_locks_before_overwriting():
+    ctx, conn, cur = _mock_connection(fetchone=[(1234.5,)], fetchall=[("TSLA",), ("AAPL",)])
+    with patch("db.valuations.get_connection", return_value=ctx):
+        assert valuations.rebuild_valuation(7) == 1234.5
+
+    statements = _statements(cur)
+    assert _locks(cur) == ["AAPL", "TSLA"]
+    assert statements[-1][0].startswith("INSERT INTO portfolio_valuations")
+    assert statements[-1][1] == (7, 7)
+    conn.commit.assert_called_once()
+
+
+# --- Reads ---
+def test_get_valuation_rounds_total():
+    ctx, _, _ = _mock_connection(fetchone=[(1234.567, "2024-01-01")])
+    with patch("db.valuations.get_connection", return_value=ctx):
+        assert valuations.get_valuation(7) == {"user_id": 7, "total_value": 1234.57, "updated_at": "2024-01-01"}
+
+
+def test_record_prices_locks_in_upper_case_order():
+    # Raw keys sort "NVDA" < "msft"; upper-cased, MSFT comes first as in rebuild_valuation
+    ctx, _, cur = _mock_connection(fetchone=[None, None])
+    with patch("db.valuations.get_connection", return_value=ctx):
+        assert valuations.record_prices({"msft": 310.0, "NVDA": 120.0, "nvda": None}) == 2
+    assert _locks(cur) == ["MSFT", "NVDA"]
@@ -0,0 +1,73 @@
+import sys
+import os
+import pytest
+
+# Ensure tools/ is importable
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tools.cache import TTLCache
+from tools.withdrawal_optimizer import (
+    Lot,
+    WithdrawalOptimizer,
+    WithdrawalScenario,
+    _GainCurve,
+    rmd_divisor,
+)
+
+
+@pytest.fixture
+def optimizer():
+    return WithdrawalOptimizer(TTLCache(ttl_seconds=60, max_entries=256))
+
+
+def scenario(**overrides):
+    base = dict(
+        age=70,
+        ira_balance=800_000,
+        roth_balance=50_000,
+        lots=(Lot("AAPL", 200_000, 80_000), Lot("MSFT", 100_000, 95_000)),
+        annual_spending=60_000,
+        other_income=20_000,
+        horizon_years=10,
+    )
+    base.update(overrides)
+    return WithdrawalScenario(**base)
+
+
+# --- RMD table ---
+def test_rmd_divisor_starts_at_rmd_age():
+    assert rmd_divisor(72, 73) == float("inf")
+    assert rmd_divisor(73, 73) == pytest.approx(26.5)
+    assert rmd_divisor(130, 73) == pytest.approx(2.0)
+
+
+# --- Lot selection ---
+def test_lots_sold_highest_basis_first():
+    curve = _GainCurve((Lot("LOW", 100, 10), Lot("HIGH", 100, 95)))
+    sold = curve.lots_sold(200, 50, 1.0)
+    assert [lot["ticker"] for lot in sold] == ["HIGH"]
+    assert float(curve.gains(200, 100, 1.0)) == pytest.approx(5)
+
+
+# --- Solver ---
+def test_plan_funds_spending_when_assets_are_ample(optimizer):
+    plan = optimizer.solve(scenario(), time_budget_seconds=5)
+    assert plan["feasible"]
+    assert len(plan["plan"]) == 10
+    for year in plan["plan"]:
+        assert year["shortfall"] == pytest.approx(0, abs=1)
+        assert year["ira_withdrawal"] >= year["rmd"] - 1
+    assert plan["lifetime_tax"] > 0
+
+
+def test_what_if_reuses_stages_after_the_edited_year(optimizer):
+    optimizer.solve(scenario(), time_budget_seconds=5)
+    plan = optimizer.solve(scenario(extra_spending=((8, 30_000),)), time_budget_seconds=5)
+    assert plan["solver"]["stages_reused"] > 0
+    assert plan["plan"][8]["spending"] > plan["plan"][7]["spending"]
+
+
+def test_time_budget_returns_coarse_plan(optimizer):
+    plan = optimizer.solve(scenario(horizon_years=30), time_budget_seconds=0.01)
+    assert len(plan["plan"]) == 30
+    assert plan["grid"]["ira_points"] == 16
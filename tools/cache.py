@@ -0,0 +1,343 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from config.settings import settings
+
+
+class TTLCache:
+    """
+    Thread-safe in-process cache with per-entry expiry and LRU eviction.
+    """
+
+    def __init__(self, ttl_seconds: float, max_entries: int = 10_000):
+        """
+        Args:
+            ttl_seconds (float): How long an entry stays fresh.
+            max_entries (int): Least recently used entries are evicted past this size.
+        """
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """Returns the cached value, or default if missing or expired."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl_seconds: float | None = None):
+        """Stores a value, overriding the default TTL if one is given."""
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def __contains__(self, key) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    def invalidate(self, key):
+        """Drops a single entry if present."""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        """Drops every entry."""
+        with self._lock:
+            self._data.clear()
+
+
+_MISSING = object()
+
+
+class DiskCache:
+    """
+    Persistent key-value store in a local SQLite file, grouped by namespace.
+
+    Values are stored as JSON with a wall-clock expiry, so entries survive
+    restarts and are shared by every process on the host (WAL mode lets
+    readers and the writer proceed concurrently). Expired entries are never
+    returned. Every compact_every writes the file is compacted: expired
+    entries are deleted and, while the values exceed max_bytes, the entries
+    closest to expiry are dropped first.
+
+    Errors are printed and treated as misses; the disk tier is an
+    optimisation and never fails a request.
+    """
+
+    def __init__(self, path: str, max_bytes: int, compact_every: int = 1000):
+        """
+        Args:
+            path (str): SQLite file, created with its directory on first use.
+            max_bytes (int): Cap on the total size of stored values.
+            compact_every (int): Writes between compactions.
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.compact_every = compact_every
+        self._connection = None
+        self._writes = 0
+        self._lock = threading.Lock()
+
+    def _execute(self, sql: str, params: tuple = ()) -> sqlite3.Cursor:
+        """Runs one statement; callers hold self._lock."""
+        # One connection per process: statements take microseconds, so threads simply take turns
+        if self._connection is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            # auto_vacuum only applies to a new file, so it must precede the first table
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL;")
+            conn.execute("PRAGMA journal_mode = WAL;")
+            conn.execute("PRAGMA synchronous = NORMAL;")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS cache_entries (
+                    namespace TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    expires_at REAL NOT NULL,
+                    PRIMARY KEY (namespace, key)
+                );
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_entries_expiry ON cache_entries (expires_at);")
+            self._connection = conn
+        return self._connection.execute(sql, params)
+
+    def lookup(self, namespace: str, key) -> tuple | None:
+        """
+        Returns:
+            tuple | None: (value, expiry as a time.time() timestamp), or None if missing or expired.
+        """
+        try:
+            with self._lock:
+                row = self._execute(
+                    "SELECT value, expires_at FROM cache_entries WHERE namespace = ? AND key = ? AND expires_at > ?;",
+                    (namespace, json.dumps(key), time.time()),
+                ).fetchone()
+        except sqlite3.Error as e:
+            print(f"Error reading disk cache {self.path}: {e}")
+            return None
+        return None if row is None else (json.loads(row[0]), row[1])
+
+    def get(self, namespace: str, key, default=None):
+        entry = self.lookup(namespace, key)
+        return default if entry is None else entry[0]
+
+    def set(self, namespace: str, key, value, ttl_seconds: float):
+        """Stores a JSON-serialisable value for ttl_seconds."""
+        try:
+            encoded = json.dumps(value)
+            with self._lock:
+                self._execute(
+                    "INSERT OR REPLACE INTO cache_entries (namespace, key, value, size, expires_at) VALUES (?, ?, ?, ?, ?);",
+                    (namespace, json.dumps(key), encoded, len(encoded), time.time() + ttl_seconds),
+                )
+                self._writes += 1
+                due = self._writes % max(self.compact_every, 1) == 0
+        except (TypeError, ValueError, sqlite3.Error) as e:
+            print(f"Error writing disk cache {self.path}: {e}")
+            return
+        if due:
+            self.compact()
+
+    def delete(self, namespace: str, key):
+        self._write("DELETE FROM cache_entries WHERE namespace = ? AND key = ?;", (namespace, json.dumps(key)))
+
+    def clear(self, namespace: str | None = None):
+        """Drops every entry in a namespace, or everything."""
+        if namespace is None:
+            self._write("DELETE FROM cache_entries;")
+        else:
+            self._write("DELETE FROM cache_entries WHERE namespace = ?;", (namespace,))
+
+    def _write(self, sql: str, params: tuple = ()):
+        try:
+            with self._lock:
+                self._execute(sql, params)
+        except sqlite3.Error as e:
+            print(f"Error writing disk cache {self.path}: {e}")
+
+    def load(self, namespace: str, limit: int) -> list[tuple]:
+        """
+        Unexpired entries of a namespace, longest-lived first, for warming memory.
+
+        Returns:
+            list[tuple]: (key, value, expires_at) tuples.
+        """
+        try:
+            with self._lock:
+                rows = self._execute(
+                    """
+                    SELECT key, value, expires_at FROM cache_entries
+                    WHERE namespace = ? AND expires_at > ?
+                    ORDER BY expires_at DESC LIMIT ?;
+                    """,
+                    (namespace, time.time(), limit),
+                ).fetchall()
+        except sqlite3.Error as e:
+            print(f"Error reading disk cache {self.path}: {e}")
+            return []
+        return [(_key(json.loads(k)), json.loads(v), expires_at) for k, v, expires_at in rows]
+
+    def size(self) -> int:
+        """Total bytes of stored values."""
+        with self._lock:
+            return self._execute("SELECT COALESCE(SUM(size), 0) FROM cache_entries;").fetchone()[0]
+
+    def compact(self) -> int:
+        """
+        Deletes expired entries, then the entries closest to expiry until the
+        values fit in max_bytes, and returns freed pages to the filesystem.
+
+        Returns:
+            int: Entries deleted.
+        """
+        try:
+            with self._lock:
+                deleted = self._execute("DELETE FROM cache_entries WHERE expires_at <= ?;", (time.time(),)).rowcount
+                # Keep the longest-lived entries whose running size fits the cap
+                deleted += self._execute(
+                    """
+                    DELETE FROM cache_entries WHERE rowid IN (
+                        SELECT rowid FROM (
+                            SELECT rowid, SUM(size) OVER (ORDER BY expires_at DESC, rowid DESC) AS kept
+                            FROM cache_entries
+                        ) WHERE kept > ?
+                    );
+                    """,
+                    (self.max_bytes,),
+                ).rowcount
+                self._execute("PRAGMA incremental_vacuum;").fetchall()
+            return deleted
+        except sqlite3.Error as e:
+            print(f"Error compacting disk cache {self.path}: {e}")
+            return 0
+
+
+def _key(value):
+    """JSON turns tuple keys into lists; turn them back so they match in memory."""
+    return tuple(_key(v) for v in value) if isinstance(value, list) else value
+
+
+_disk_cache = None
+_disk_cache_lock = threading.Lock()
+
+
+def get_disk_cache() -> DiskCache | None:
+    """Shared disk cache at DISK_CACHE_PATH, or None when the path is empty."""
+    global _disk_cache
+    path = settings.DISK_CACHE_PATH
+    if not path:
+        return None
+    with _disk_cache_lock:
+        if _disk_cache is None or _disk_cache.path != path:
+            _disk_cache = DiskCache(
+                path,
+                max_bytes=int(settings.DISK_CACHE_MAX_MB * 1024 * 1024),
+                compact_every=settings.DISK_CACHE_COMPACT_EVERY,
+            )
+        return _disk_cache
+
+
+class TieredCache(TTLCache):
+    """
+    TTLCache backed by a namespace of the shared disk cache.
+
+    Memory misses fall through to disk and are promoted with their remaining
+    TTL; writes, invalidations and clears go to both tiers. Values must be
+    JSON-serialisable. With DISK_CACHE_PATH empty it is a plain TTLCache.
+    """
+
+    def __init__(self, namespace: str, ttl_seconds: float, max_entries: int = 10_000, disk: DiskCache | None = None):
+        """
+        Args:
+            namespace (str): Disk namespace, unique per cache.
+            ttl_seconds (float): How long an entry stays fresh in either tier.
+            max_entries (int): Memory size limit; the disk tier is capped by DISK_CACHE_MAX_MB.
+            disk (DiskCache | None): Disk tier, defaults to get_disk_cache().
+        """
+        super().__init__(ttl_seconds, max_entries)
+        self.namespace = namespace
+        self._disk = disk
+        _tiered_caches.append(self)
+
+    @property
+    def disk(self) -> DiskCache | None:
+        return self._disk if self._disk is not None else get_disk_cache()
+
+    def get(self, key, default=None):
+        value = super().get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        disk = self.disk
+        entry = disk.lookup(self.namespace, key) if disk is not None else None
+        if entry is None:
+            return default
+        value, expires_at = entry
+        super().set(key, value, ttl_seconds=expires_at - time.time())
+        return value
+
+    def set(self, key, value, ttl_seconds: float | None = None):
+        super().set(key, value, ttl_seconds)
+        disk = self.disk
+        if disk is not None:
+            disk.set(self.namespace, key, value, self.ttl_seconds if ttl_seconds is None else ttl_seconds)
+
+    def invalidate(self, key):
+        super().invalidate(key)
+        disk = self.disk
+        if disk is not None:
+            disk.delete(self.namespace, key)
+
+    def clear(self):
+        super().clear()
+        disk = self.disk
+        if disk is not None:
+            disk.clear(self.namespace)
+
+    def warm(self) -> int:
+        """
+        Loads unexpired disk entries into memory, up to max_entries.
+
+        Returns:
+            int: Entries loaded.
+        """
+        disk = self.disk
+        if disk is None:
+            return 0
+        entries = disk.load(self.namespace, self.max_entries)
+        now = time.time()
+        # Shortest-lived first so the longest-lived end up most recently used
+        for key, value, expires_at in reversed(entries):
+            super().set(key, value, ttl_seconds=expires_at - now)
+        return len(entries)
+
+
+_tiered_caches: list[TieredCache] = []
+
+
+def warm_tiered_caches() -> dict[str, int]:
+    """
+    Compacts the disk cache and loads it into every tiered cache, so a fresh
+    process starts with the quotes, fundamentals and LLM answers of the last one.
+
+    Returns:
+        dict[str, int]: Entries loaded per namespace.
+    """
+    disk = get_disk_cache()
+    if disk is None:
+        return {}
+    disk.compact()
+    return {cache.namespace: cache.warm() for cache in _tiered_caches}
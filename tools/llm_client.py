@@ -0,0 +1,247 @@
+import hashlib
+import json
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextvars import copy_context
+import numpy as np
+from langchain.schema import AIMessage, BaseMessage
+from openai import APIConnectionError, InternalServerError, RateLimitError
+from tools.cache import TieredCache
+from tools.profiler import run_tagged
+from tools.resilience import DeadlineExceeded, RateLimitExceeded, call_with_retries, is_throttle_error, remaining_time
+from tools.tracing import count
+from config.settings import settings
+
+
+class LatencyTracker:
+    """Recent successful call latencies per model, for picking the hedge delay."""
+
+    def __init__(self, window: int = 200):
+        self.window = window
+        self._samples: dict[str, deque] = {}
+        self._lock = threading.Lock()
+
+    def record(self, key: str, seconds: float):
+        with self._lock:
+            self._samples.setdefault(key, deque(maxlen=self.window)).append(seconds)
+
+    def percentile(self, key: str, pct: float, min_samples: int) -> float | None:
+        """The pct-th percentile latency, or None until min_samples calls have been seen."""
+        with self._lock:
+            samples = list(self._samples.get(key, ()))
+        if len(samples) < max(min_samples, 1):
+            return None
+        return float(np.percentile(samples, pct))
+
+
+def _is_transient(error: Exception) -> bool:
+    """Errors worth another attempt: timeouts, dropped connections, throttling and 5xx."""
+    return (
+        is_throttle_error(error)
+        or isinstance(error, (TimeoutError, ConnectionError, APIConnectionError, RateLimitError, InternalServerError))
+    )
+
+
+# Shared by every client so the process as a whole stays under the provider's limits
+llm_limiter = threading.BoundedSemaphore(settings.LLM_MAX_CONCURRENCY)
+llm_latencies = LatencyTracker()
+# Requests hold a limiter slot while they run, so the pool never queues behind the limit
+_pool = ThreadPoolExecutor(max_workers=settings.LLM_MAX_CONCURRENCY, thread_name_prefix="llm")
+# Answers to identical prompts, kept on disk so they survive restarts
+llm_response_cache = TieredCache("llm", ttl_seconds=settings.LLM_CACHE_TTL_SECONDS, max_entries=1000)
+
+
+def _cache_key(model_name: str, messages, kwargs: dict) -> str | None:
+    """Hash of the model, messages and call options, or None if the messages are not cacheable."""
+    if not isinstance(messages, list) or not all(isinstance(m, BaseMessage) for m in messages):
+        return None
+    try:
+        payload = json.dumps([model_name, [(m.type, m.content) for m in messages], kwargs], sort_keys=True)
+    except (TypeError, ValueError):
+        return None
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class LLMClient:
+    """
+    Wraps a chat model with deadlines, hedging, bounded retries and a global
+    concurrency limit.
+
+    - Each attempt gets a timeout of LLM_TIMEOUT_SECONDS, cut short by the
+      current request deadline (see resilience.deadline_scope), so a chat
+      request never waits on the model past its budget.
+    - When an attempt has not answered by the LLM_HEDGE_PERCENTILE latency of
+      recent calls to the same model, a duplicate request is sent and the
+      first response wins. Hedges only use spare concurrency slots.
+    - Timeouts, connection errors, throttling and server errors are retried
+      with jittered backoff, up to LLM_MAX_ATTEMPTS calls in total.
+    - Every call, hedges included, holds a slot of the process-wide limiter
+      (LLM_MAX_CONCURRENCY) for as long as it is in flight.
+
+    Build the wrapped model with max_retries=0, otherwise the SDK's own
+    retries multiply these. Other attributes are passed through to the
+    wrapped model.
+    """
+
+    def __init__(
+        self,
+        llm,
+        model_name: str | None = None,
+        timeout: float | None = None,
+        attempts: int | None = None,
+        hedge_percentile: float | None = None,
+        max_hedges: int | None = None,
+        limiter: threading.Semaphore | None = None,
+        latencies: LatencyTracker | None = None,
+    ):
+        """
+        Args:
+            llm: LangChain chat model (or any client, when used through call()).
+            model_name (str | None): Key for latency statistics, defaults to llm.model_name.
+            timeout (float | None): Per-attempt timeout, defaults to LLM_TIMEOUT_SECONDS.
+            attempts (int | None): Maximum attempts, defaults to LLM_MAX_ATTEMPTS.
+            hedge_percentile (float | None): Latency percentile after which a hedge
+                is sent, defaults to LLM_HEDGE_PERCENTILE. 0 disables hedging.
+            max_hedges (int | None): Hedges per attempt, defaults to LLM_MAX_HEDGES.
+            limiter (threading.Semaphore | None): Concurrency limiter, defaults to the shared one.
+            latencies (LatencyTracker | None): Latency statistics, defaults to the shared ones.
+        """
+        self.llm = llm
+        self.model_name = model_name or getattr(llm, "model_name", None) or type(llm).__name__
+        self.timeout = settings.LLM_TIMEOUT_SECONDS if timeout is None else timeout
+        self.attempts = settings.LLM_MAX_ATTEMPTS if attempts is None else attempts
+        self.hedge_percentile = settings.LLM_HEDGE_PERCENTILE if hedge_percentile is None else hedge_percentile
+        self.max_hedges = settings.LLM_MAX_HEDGES if max_hedges is None else max_hedges
+        self.limiter = limiter or llm_limiter
+        self.latencies = latencies or llm_latencies
+
+    def __getattr__(self, name):
+        return getattr(self.llm, name)
+
+    def invoke(self, messages, **kwargs):
+        """
+        Calls the model like ChatOpenAI.invoke, under the client's guards.
+
+        Text answers are cached by prompt for LLM_CACHE_TTL_SECONDS (0 turns
+        this off). A cached answer carries no token usage, since none was spent.
+        """
+        key = _cache_key(self.model_name, messages, kwargs) if settings.LLM_CACHE_TTL_SECONDS > 0 else None
+        if key is not None:
+            cached = llm_response_cache.get(key)
+            if cached is not None:
+                count("llm_cache.hits")
+                return AIMessage(content=cached)
+            count("llm_cache.misses")
+
+        response = self.call(lambda timeout: self.llm.invoke(messages, timeout=timeout, **kwargs))
+        if key is not None and isinstance(response, AIMessage) and isinstance(response.content, str):
+            llm_response_cache.set(key, response.content)
+        return response
+
+    def batch(self, inputs: list, config: dict | None = None, return_exceptions: bool = False) -> list:
+        """
+        Calls invoke for each input in parallel, like ChatOpenAI.batch.
+
+        Args:
+            inputs (list): Message lists.
+            config (dict | None): Only max_concurrency is used.
+            return_exceptions (bool): Return failures in place instead of raising.
+
+        Returns:
+            list: Responses (or exceptions) in input order.
+        """
+        if not inputs:
+            return []
+        workers = (config or {}).get("max_concurrency") or settings.LLM_MAX_CONCURRENCY
+
+        def run(messages):
+            try:
+                return self.invoke(messages)
+            except Exception as e:
+                if not return_exceptions:
+                    raise
+                return e
+
+        contexts = [copy_context() for _ in inputs]
+        with ThreadPoolExecutor(max_workers=min(workers, len(inputs))) as pool:
+            return list(pool.map(lambda ctx, messages: ctx.run(run_tagged, run, messages), contexts, inputs))
+
+    def call(self, func):
+        """
+        Runs func(timeout) under the client's guards and returns its result.
+
+        func makes one request to the model, passing the given timeout (seconds)
+        to the underlying client. It may be called more than once, concurrently.
+
+        Raises:
+            DeadlineExceeded: If the request deadline has passed.
+            RateLimitExceeded: If no concurrency slot freed up within the attempt timeout.
+        """
+        return call_with_retries(lambda: self._attempt(func), attempts=max(self.attempts, 1), retry_if=_is_transient)
+
+    def _attempt(self, func):
+        left = remaining_time()
+        timeout = self.timeout if left is None else min(self.timeout, left)
+        if timeout <= 0:
+            raise DeadlineExceeded("Request deadline exceeded before LLM call.")
+
+        end = time.monotonic() + timeout
+        if not self.limiter.acquire(timeout=timeout):
+            raise RateLimitExceeded("No LLM concurrency slot freed up in time.")
+        sent = time.monotonic()
+        primary = self._submit(func, end - sent)
+        pending = {primary}
+
+        hedge_after = None
+        if self.hedge_percentile > 0 and self.max_hedges > 0:
+            hedge_after = self.latencies.percentile(self.model_name, self.hedge_percentile, settings.LLM_HEDGE_MIN_SAMPLES)
+        hedges, error = 0, None
+
+        while pending:
+            wait_until = end
+            if hedge_after is not None and hedges < self.max_hedges:
+                wait_until = min(end, sent + hedge_after * (hedges + 1))
+            done, pending = wait(pending, timeout=max(0.0, wait_until - time.monotonic()), return_when=FIRST_COMPLETED)
+
+            for future in done:
+                if future.exception() is None:
+                    if future is not primary:
+                        count("llm.hedge_wins")
+                    return future.result()
+                error = future.exception()
+            if done:
+                continue  # a failed request; any hedge still in flight may yet answer
+
+            if time.monotonic() >= end or hedge_after is None or hedges >= self.max_hedges:
+                count("llm.timeouts")
+                raise TimeoutError(f"LLM call took longer than {timeout:.1f}s.")
+            # Slow request: duplicate it if a slot is free right now, never wait for one
+            if not self.limiter.acquire(blocking=False):
+                count("llm.hedges_skipped")
+                hedge_after = None
+                continue
+            hedges += 1
+            count("llm.hedges")
+            pending.add(self._submit(func, end - time.monotonic()))
+        raise error
+
+    def _submit(self, func, timeout: float):
+        """Starts one request on the shared pool; the caller has taken a limiter slot for it."""
+        ctx = copy_context()
+
+        def run():
+            started = time.monotonic()
+            try:
+                result = ctx.run(run_tagged, func, timeout)
+            finally:
+                self.limiter.release()
+            self.latencies.record(self.model_name, time.monotonic() - started)
+            return result
+
+        try:
+            return _pool.submit(run)
+        except Exception:
+            self.limiter.release()
+            raise
@@ -0,0 +1,312 @@
+import hashlib
+import json
+from abc import ABC, abstractmethod
+import os
+import random
+import threading
+import time
+import pandas as pd
+import requests
+import yfinance as yf
+from tools.resilience import (
+    CircuitBreaker,
+    RateLimitExceeded,
+    TokenBucket,
+    call_with_retries,
+    is_throttle_error,
+    remaining_time,
+)
+
+
+class MarketDataError(Exception):
+    """Raised by providers when market data cannot be served."""
+
+
+class RecordingNotFound(MarketDataError):
+    """Raised by ReplayProvider when a call was never recorded."""
+
+
+class MarketDataProvider(ABC):
+    """
+    Interface for market data sources used by the stock tools.
+
+    Implementations return plain Python / pandas values so responses can be
+    recorded to disk and replayed without touching Yahoo Finance.
+    """
+
+    @abstractmethod
+    def get_last_price(self, ticker: str) -> float | None:
+        """Returns the latest traded price, or None if unavailable."""
+
+    @abstractmethod
+    def get_info(self, ticker: str) -> dict:
+        """Returns the fundamentals dictionary for a ticker."""
+
+    @abstractmethod
+    def get_history(self, ticker: str, period: str) -> pd.DataFrame:
+        """Returns daily OHLCV history indexed by date."""
+
+
+class YFinanceProvider(MarketDataProvider):
+    """Live data from Yahoo Finance."""
+
+    def get_last_price(self, ticker: str) -> float | None:
+        stock = yf.Ticker(ticker)
+        if hasattr(stock, 'fast_info'):
+            return stock.fast_info.get('lastPrice')
+        return None
+
+    def get_info(self, ticker: str) -> dict:
+        return yf.Ticker(ticker).info
+
+    def get_history(self, ticker: str, period: str) -> pd.DataFrame:
+        return yf.Ticker(ticker).history(period=period)
+
+
+def _record_path(directory: str, method: str, *args) -> str:
+    key = hashlib.sha1("|".join([method, *map(str, args)]).encode()).hexdigest()[:16]
+    return os.path.join(directory, f"{method}_{args[0]}_{key}.json")
+
+
+class RecordingProvider(MarketDataProvider):
+    """
+    Wraps another provider and saves every response to a local directory.
+    """
+
+    def __init__(self, inner: MarketDataProvider, directory: str):
+        """
+        Args:
+            inner (MarketDataProvider): Provider whose responses are recorded.
+            directory (str): Where recordings are written, one JSON file per call.
+        """
+        self.inner = inner
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _save(self, method: str, args: tuple, payload):
+        path = _record_path(self.directory, method, *args)
+        tmp = f"{path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(payload, f, default=str)
+        os.replace(tmp, path)
+
+    def get_last_price(self, ticker: str) -> float | None:
+        price = self.inner.get_last_price(ticker)
+        self._save("last_price", (ticker,), price)
+        return price
+
+    def get_info(self, ticker: str) -> dict:
+        info = self.inner.get_info(ticker)
+        self._save("info", (ticker,), info)
+        return info
+
+    def get_history(self, ticker: str, period: str) -> pd.DataFrame:
+        history = self.inner.get_history(ticker, period)
+        self._save("history", (ticker, period), json.loads(history.to_json(orient="split", date_format="iso")))
+        return history
+
+
+class ReplayProvider(MarketDataProvider):
+    """
+    Serves recorded responses with configurable latency and error injection.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        latency_ms: float = 0.0,
+        jitter_ms: float = 0.0,
+        error_rate: float = 0.0,
+        seed: int | None = None,
+    ):
+        """
+        Args:
+            directory (str): Directory written by RecordingProvider.
+            latency_ms (float): Base delay added to every call.
+            jitter_ms (float): Uniform random delay added on top of the base latency.
+            error_rate (float): Probability (0-1) that a call raises MarketDataError.
+            seed (int | None): Seed for reproducible latency and error sequences.
+        """
+        self.directory = directory
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self._rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+        self._loaded: dict[str, object] = {}
+
+    def _load(self, method: str, *args):
+        with self._rng_lock:
+            delay = self.latency_ms + self._rng.uniform(0, self.jitter_ms)
+            fail = self._rng.random() < self.error_rate
+        if delay:
+            time.sleep(delay / 1000)
+        if fail:
+            raise MarketDataError(f"Injected failure for {method} {args[0]}")
+
+        path = _record_path(self.directory, method, *args)
+        if path not in self._loaded:
+            try:
+                with open(path) as f:
+                    self._loaded[path] = json.load(f)
+            except FileNotFoundError:
+                raise RecordingNotFound(f"No recording for {method} {args}")
+        return self._loaded[path]
+
+    def get_last_price(self, ticker: str) -> float | None:
+        return self._load("last_price", ticker)
+
+    def get_info(self, ticker: str) -> dict:
+        return dict(self._load("info", ticker))
+
+    def get_history(self, ticker: str, period: str) -> pd.DataFrame:
+        payload = self._load("history", ticker, period)
+        df = pd.DataFrame(payload["data"], index=pd.to_datetime(payload["index"]), columns=payload["columns"])
+        return df
+
+
+DEFAULT_RATE_LIMITS = {"last_price": 5.0, "info": 2.0, "history": 2.0}
+
+
+def _is_transient(error: Exception) -> bool:
+    """Errors worth retrying and counting against the circuit breaker."""
+    if isinstance(error, RecordingNotFound):
+        return False
+    return (
+        is_throttle_error(error)
+        or isinstance(error, (ConnectionError, TimeoutError, requests.exceptions.RequestException, MarketDataError))
+    )
+
+
+class ResilientProvider(MarketDataProvider):
+    """
+    Guards another provider with per-endpoint token buckets, a shared circuit
+    breaker and jittered retries bounded by the current request deadline.
+
+    While the circuit is open calls raise CircuitOpenError immediately, so
+    callers can fall back to their last known values without waiting.
+    """
+
+    def __init__(
+        self,
+        inner: MarketDataProvider,
+        rate_limits: dict | None = None,
+        breaker: CircuitBreaker | None = None,
+        attempts: int = 3,
+    ):
+        """
+        Args:
+            inner (MarketDataProvider): Provider being protected.
+            rate_limits (dict | None): Requests per second per endpoint
+                (last_price, info, history).
+            breaker (CircuitBreaker | None): Shared breaker, one is created if omitted.
+            attempts (int): Maximum calls per request, including the first.
+        """
+        self.inner = inner
+        limits = {**DEFAULT_RATE_LIMITS, **(rate_limits or {})}
+        self.buckets = {name: TokenBucket(rate) for name, rate in limits.items()}
+        self.breaker = breaker or CircuitBreaker()
+        self.attempts = attempts
+
+    def _call(self, endpoint: str, func, *args):
+        bucket = self.buckets[endpoint]
+
+        def attempt():
+            self.breaker.before_call()
+            recorded = False
+            try:
+                if not bucket.acquire(timeout=remaining_time()):
+                    raise RateLimitExceeded(f"No {endpoint} budget left before the deadline.")
+                try:
+                    result = func(*args)
+                except Exception as e:
+                    recorded = True
+                    if _is_transient(e):
+                        self.breaker.record_failure()
+                        if is_throttle_error(e):
+                            bucket.on_throttled()
+                    else:
+                        # The source answered (e.g. unknown ticker), so it is healthy
+                        self.breaker.record_success()
+                    raise
+                recorded = True
+                self.breaker.record_success()
+            finally:
+                # A half-open trial that never reached the source must not keep the circuit shut
+                if not recorded:
+                    self.breaker.release_trial()
+            bucket.on_success()
+            return result
+
+        return call_with_retries(attempt, attempts=self.attempts, retry_if=_is_transient)
+
+    def get_last_price(self, ticker: str) -> float | None:
+        return self._call("last_price", self.inner.get_last_price, ticker)
+
+    def get_info(self, ticker: str) -> dict:
+        return self._call("info", self.inner.get_info, ticker)
+
+    def get_history(self, ticker: str, period: str) -> pd.DataFrame:
+        return self._call("history", self.inner.get_history, ticker, period)
+
+
+def _parse_rate_limits(value: str) -> dict:
+    """Parses 'last_price=5,info=2' into a rate limit mapping."""
+    limits = {}
+    for part in filter(None, value.split(",")):
+        name, _, rate = part.partition("=")
+        limits[name.strip()] = float(rate)
+    return limits
+
+
+_provider: MarketDataProvider | None = None
+
+
+def build_provider_from_env() -> MarketDataProvider:
+    """
+    Builds the provider selected by MARKET_DATA_PROVIDER (yfinance, record, replay),
+    wrapped in rate limiting and circuit breaking unless MARKET_DATA_RESILIENCE=false.
+    """
+    provider = _build_base_provider()
+    if os.getenv("MARKET_DATA_RESILIENCE", "true").lower() in ("0", "false", "no"):
+        return provider
+    return ResilientProvider(
+        provider,
+        rate_limits=_parse_rate_limits(os.getenv("MARKET_DATA_RATE_LIMITS", "")),
+        breaker=CircuitBreaker(
+            failure_threshold=int(os.getenv("MARKET_DATA_BREAKER_THRESHOLD", "5")),
+            reset_timeout=float(os.getenv("MARKET_DATA_BREAKER_RESET_SECONDS", "30")),
+        ),
+    )
+
+
+def _build_base_provider() -> MarketDataProvider:
+    mode = os.getenv("MARKET_DATA_PROVIDER", "yfinance").lower()
+    directory = os.getenv("MARKET_DATA_RECORD_DIR", "market_data_recordings")
+
+    if mode == "record":
+        return RecordingProvider(YFinanceProvider(), directory)
+    if mode == "replay":
+        seed = os.getenv("MARKET_DATA_REPLAY_SEED")
+        return ReplayProvider(
+            directory,
+            latency_ms=float(os.getenv("MARKET_DATA_REPLAY_LATENCY_MS", "0")),
+            jitter_ms=float(os.getenv("MARKET_DATA_REPLAY_JITTER_MS", "0")),
+            error_rate=float(os.getenv("MARKET_DATA_REPLAY_ERROR_RATE", "0")),
+            seed=int(seed) if seed else None,
+        )
+    return YFinanceProvider()
+
+
+def get_provider() -> MarketDataProvider:
+    """Returns the process-wide provider, creating it from the environment on first use."""
+    global _provider
+    if _provider is None:
+        _provider = build_provider_from_env()
+    return _provider
+
+
+def set_provider(provider: MarketDataProvider | None):
+    """Overrides the process-wide provider (None resets to the environment default)."""
+    global _provider
+    _provider = provider
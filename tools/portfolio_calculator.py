@@ -1,5 +1,7 @@
 from tools.stock_fetcher import get_stock_price
+from tools.tracing import traced
 
+@traced("calculate_portfolio_value")
 def calculate_portfolio_value(portfolio: list[dict]) -> dict:
     """
     Calculates portfolio value from a list of stock entries.
@@ -0,0 +1,146 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from db.connection import get_connection
+from db.valuations import record_prices
+from config.settings import settings
+from tools.stock_fetcher import prefetch_stock_prices
+from tools.stock_recommender import StockRecommender
+
+
+class PortfolioWarmer:
+    """
+    Warms the quote and fundamentals caches for a user in the background.
+
+    Warm-ups are started at login so the first chat does not pay for cold
+    fetches. At most one warm-up runs per user, and a warm-up is cancelled
+    if the user does not start chatting within the idle timeout.
+    """
+
+    def __init__(self, max_workers: int = 4, idle_timeout_seconds: float | None = None):
+        """
+        Args:
+            max_workers (int): Number of users warmed concurrently.
+            idle_timeout_seconds (float | None): Cancel a warm-up if no chat
+                arrives within this time. Defaults to WARMUP_IDLE_TIMEOUT_SECONDS.
+        """
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="warmup")
+        self.idle_timeout_seconds = (
+            settings.WARMUP_IDLE_TIMEOUT_SECONDS if idle_timeout_seconds is None else idle_timeout_seconds
+        )
+        self.recommender = StockRecommender()
+        self._jobs: dict[int, tuple[threading.Event, threading.Timer]] = {}
+        self._rerun: set[int] = set()
+        self._lock = threading.Lock()
+
+    def schedule(self, user_id: int, cancel_when_idle: bool = True) -> bool:
+        """
+        Starts a warm-up for the user unless one is already running.
+
+        Args:
+            user_id (int): User to warm.
+            cancel_when_idle (bool): Cancel if no chat arrives within the idle
+                timeout. Refreshes queued by uploads run to completion, and
+                run again after any warm-up already in progress, since that
+                one may have read the holdings before the upload.
+
+        Returns:
+            bool: True if a new warm-up was started.
+        """
+        with self._lock:
+            if user_id in self._jobs:
+                if not cancel_when_idle:
+                    self._rerun.add(user_id)
+                return False
+            cancel_event = threading.Event()
+            timer = threading.Timer(self.idle_timeout_seconds, cancel_event.set)
+            timer.daemon = True
+            self._jobs[user_id] = (cancel_event, timer)
+
+        if cancel_when_idle:
+            timer.start()
+        self.pool.submit(self._run, user_id, cancel_event)
+        return True
+
+    def mark_active(self, user_id: int):
+        """Called when the user starts chatting; lets a running warm-up finish."""
+        with self._lock:
+            job = self._jobs.get(user_id)
+        if job:
+            job[1].cancel()
+
+    def cancel(self, user_id: int):
+        """Stops a running warm-up at its next checkpoint."""
+        with self._lock:
+            job = self._jobs.get(user_id)
+        if job:
+            job[1].cancel()
+            job[0].set()
+
+    def is_running(self, user_id: int) -> bool:
+        with self._lock:
+            return user_id in self._jobs
+
+    def _run(self, user_id: int, cancel_event: threading.Event):
+        try:
+            self._warm(user_id, cancel_event)
+        except Exception as e:
+            print(f"Warm-up failed for user {user_id}: {e}")
+        finally:
+            with self._lock:
+                job = self._jobs.pop(user_id, None)
+                rerun = user_id in self._rerun
+                self._rerun.discard(user_id)
+            if job:
+                job[1].cancel()
+            if rerun:
+                self.schedule(user_id, cancel_when_idle=False)
+
+    def _warm(self, user_id: int, cancel_event: threading.Event):
+        with get_connection(read_only=True) as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    "SELECT DISTINCT ticker, recommendation IS NULL FROM current_portfolio WHERE user_id = %s;",
+                    (user_id,),
+                )
+                rows = cur.fetchall()
+
+        tickers = sorted({str(t).upper() for t, _ in rows if t})
+        missing = sorted({str(t).upper() for t, is_null in rows if t and is_null})
+
+        # Quotes are fetched in small batches so a cancel takes effect quickly
+        batch = settings.PREFETCH_MAX_WORKERS
+        prices = {}
+        for start in range(0, len(tickers), batch):
+            if cancel_event.is_set():
+                return
+            prices.update(prefetch_stock_prices(tickers[start:start + batch]))
+
+        # Fresh quotes also roll forward every holder's stored valuation
+        record_prices(prices)
+
+        for ticker in tickers:
+            if cancel_event.is_set():
+                return
+            self.recommender.fetch_stock_data(ticker)
+
+        if not missing or cancel_event.is_set():
+            return
+
+        # Fundamentals are already cached, so scoring the gaps is cheap
+        with get_connection() as conn:
+            with conn.cursor() as cur:
+                for ticker in missing:
+                    rec = self.recommender.recommend_stock(ticker)["Recommendation"]
+                    if rec.startswith("Error"):
+                        continue  # leave NULL so the next warm-up retries
+                    cur.execute(
+                        """
+                        UPDATE portfolio SET recommendation = %s
+                        WHERE user_id = %s AND UPPER(ticker) = %s AND recommendation IS NULL;
+                        """,
+                        (rec, user_id, ticker),
+                    )
+            conn.commit()
+
+
+portfolio_warmer = PortfolioWarmer()
@@ -0,0 +1,274 @@
+import json
+import os
+import threading
+import numpy as np
+import pandas as pd
+from config.settings import settings
+
+META_FILE = "meta.json"
+MIN_DATE_CAPACITY = 256
+MIN_TICKER_CAPACITY = 64
+
+
+class PriceStore:
+    """
+    On-disk dates x tickers matrix of daily closes, memory-mapped with NumPy.
+
+    The matrix is stored column-major (one contiguous run of dates per
+    ticker) with spare capacity on both axes, next to a matching array of
+    dates and a JSON index of ticker -> column. Reads map the files and
+    slice them, so only the pages touched are read from disk:
+
+    - one ticker, any date range: a zero-copy view;
+    - a contiguous run of columns (for example the whole universe): a
+      zero-copy view;
+    - an arbitrary ticker set: only the requested cells are copied.
+
+    New trading days, new tickers and corrected closes are written in place,
+    so views already handed out see those cells change. Inserting dates
+    before or between stored ones, or outgrowing the reserved capacity,
+    rewrites the files under new names and swaps the index atomically; only
+    then do open readers keep a consistent old snapshot. A single writer is
+    assumed.
+
+    Args:
+        directory (str): Where the store lives. Created on first write.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._lock = threading.RLock()
+        self._meta_mtime = None
+        self._meta = None
+        self._columns: dict[str, int] = {}
+        self._dates = None
+        self._closes = None
+
+    # --- Reading ---
+    @property
+    def tickers(self) -> list[str]:
+        self._refresh()
+        return list(self._meta["tickers"]) if self._meta else []
+
+    @property
+    def dates(self) -> np.ndarray:
+        """Stored trading days as datetime64[D], a view into the mapped file."""
+        self._refresh()
+        if not self._meta:
+            return np.array([], dtype="datetime64[D]")
+        return self._dates[:self._meta["rows"]]
+
+    def column(self, ticker: str) -> int | None:
+        self._refresh()
+        return self._columns.get(ticker.upper())
+
+    def history(self, ticker: str, start=None, end=None) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Closes for one ticker between start and end (inclusive).
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: Dates and closes, both views into
+            the mapped files. Days before the ticker was added are NaN. Both
+            are empty for a ticker not in the store.
+        """
+        dates, closes, names = self.window([ticker], start, end)
+        if not names:
+            return dates[:0], np.empty(0)
+        return dates, closes[:, 0]
+
+    def window(self, tickers=None, start=None, end=None) -> tuple[np.ndarray, np.ndarray, list[str]]:
+        """
+        Closes for a ticker set between start and end (inclusive).
+
+        Args:
+            tickers (list[str] | None): Tickers to read, defaults to all.
+                Unknown tickers are skipped.
+            start, end: Anything np.datetime64 accepts, or None for open ends.
+
+        Returns:
+            tuple[np.ndarray, np.ndarray, list[str]]: Dates, a dates x tickers
+            matrix and the tickers matching its columns.
+        """
+        with self._lock:
+            self._refresh()
+            if not self._meta:
+                return np.array([], dtype="datetime64[D]"), np.empty((0, 0)), []
+
+            rows = self._row_slice(start, end)
+            if tickers is None:
+                names = list(self._meta["tickers"])
+                return self._dates[rows], self._closes[rows, :len(names)], names
+
+            names = [t.upper() for t in tickers if t.upper() in self._columns]
+            cols = [self._columns[t] for t in names]
+            if cols and cols == list(range(cols[0], cols[0] + len(cols))):
+                block = self._closes[rows, cols[0]:cols[0] + len(cols)]
+            else:
+                block = self._closes[rows][:, cols]
+            return self._dates[rows], block, names
+
+    def _row_slice(self, start, end) -> slice:
+        dates = self._dates[:self._meta["rows"]]
+        lo = 0 if start is None else int(np.searchsorted(dates, np.datetime64(start, "D"), side="left"))
+        hi = len(dates) if end is None else int(np.searchsorted(dates, np.datetime64(end, "D"), side="right"))
+        return slice(lo, hi)
+
+    # --- Writing ---
+    def upsert(self, frame: pd.DataFrame) -> int:
+        """
+        Writes closes from a date-indexed frame with one column per ticker.
+
+        Existing cells are overwritten, NaN cells in the frame are ignored,
+        unseen tickers get new columns and later dates are appended.
+
+        Returns:
+            int: Number of new trading days added.
+        """
+        frame = _normalise(frame)
+        if frame.empty:
+            return 0
+
+        with self._lock:
+            self._refresh()
+            meta = self._meta or {"rows": 0, "tickers": [], "date_capacity": 0, "ticker_capacity": 0}
+            stored = self._dates[:meta["rows"]] if self._meta else np.array([], dtype="datetime64[D]")
+            new_dates = np.setdiff1d(frame.index.values.astype("datetime64[D]"), stored)
+            new_tickers = [t for t in frame.columns if t not in self._columns]
+
+            inserts_before_end = len(stored) and len(new_dates) and new_dates[0] <= stored[-1]
+            if (
+                not self._meta
+                or inserts_before_end
+                or meta["rows"] + len(new_dates) > meta["date_capacity"]
+                or len(meta["tickers"]) + len(new_tickers) > meta["ticker_capacity"]
+            ):
+                self._rewrite(frame)
+                return len(new_dates)
+
+            # Fast path: append rows and columns inside the reserved capacity
+            rows = meta["rows"]
+            self._dates[rows:rows + len(new_dates)] = new_dates
+            tickers = meta["tickers"] + new_tickers
+            all_dates = self._dates[:rows + len(new_dates)]
+            self._write_cells(self._closes, all_dates, {t: i for i, t in enumerate(tickers)}, frame)
+            self._dates.flush()
+            self._closes.flush()
+            self._save_meta({**meta, "rows": rows + len(new_dates), "tickers": tickers})
+            return len(new_dates)
+
+    def _write_cells(self, closes, dates, columns: dict, frame: pd.DataFrame):
+        row_index = np.searchsorted(dates, frame.index.values.astype("datetime64[D]"))
+        for ticker in frame.columns:
+            values = frame[ticker].to_numpy(dtype=float)
+            present = ~np.isnan(values)
+            closes[row_index[present], columns[ticker]] = values[present]
+
+    def _rewrite(self, frame: pd.DataFrame):
+        """Writes a merged copy of the store under new file names and switches to it."""
+        old_dates = self.dates
+        old_tickers = self.tickers
+        dates = np.union1d(old_dates, frame.index.values.astype("datetime64[D]"))
+        tickers = old_tickers + [t for t in frame.columns if t not in self._columns]
+
+        date_capacity = max(MIN_DATE_CAPACITY, _next_capacity(len(dates)))
+        ticker_capacity = max(MIN_TICKER_CAPACITY, _next_capacity(len(tickers)))
+        generation = (self._meta or {}).get("generation", 0) + 1
+        os.makedirs(self.directory, exist_ok=True)
+
+        dates_file, closes_file = f"dates-{generation}.i64", f"closes-{generation}.f64"
+        new_dates = np.memmap(os.path.join(self.directory, dates_file), dtype="datetime64[D]",
+                              mode="w+", shape=(date_capacity,))
+        new_closes = np.memmap(os.path.join(self.directory, closes_file), dtype=np.float64,
+                               mode="w+", shape=(date_capacity, ticker_capacity), order="F")
+        new_closes[:] = np.nan
+        new_dates[:len(dates)] = dates
+
+        if len(old_tickers):
+            # Column by column keeps memory flat for large stores
+            old_rows = np.searchsorted(dates, old_dates)
+            for i in range(len(old_tickers)):
+                new_closes[old_rows, i] = self._closes[:len(old_dates), i]
+        self._write_cells(new_closes, dates, {t: i for i, t in enumerate(tickers)}, frame)
+        new_dates.flush()
+        new_closes.flush()
+        del new_dates, new_closes
+
+        old_files = (self._meta or {}).get("files", [])
+        self._save_meta({
+            "generation": generation,
+            "files": [dates_file, closes_file],
+            "rows": len(dates),
+            "date_capacity": date_capacity,
+            "ticker_capacity": ticker_capacity,
+            "tickers": tickers,
+        })
+        for name in old_files:
+            # Readers that already mapped these keep their snapshot until they refresh
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                pass
+
+    def _save_meta(self, meta: dict):
+        path = os.path.join(self.directory, META_FILE)
+        tmp = path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp, path)
+        self._meta_mtime = None
+        self._refresh()
+
+    # --- Mapping ---
+    def _refresh(self):
+        """Re-maps the files when the index has changed on disk."""
+        path = os.path.join(self.directory, META_FILE)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return
+        # The index is replaced, never edited, so a new inode means a new version
+        mtime = (stat.st_ino, stat.st_mtime_ns)
+        if mtime == self._meta_mtime:
+            return
+        with self._lock:
+            with open(path) as f:
+                meta = json.load(f)
+            dates_file, closes_file = meta["files"]
+            mode = "r+" if os.access(os.path.join(self.directory, closes_file), os.W_OK) else "r"
+            self._dates = np.memmap(os.path.join(self.directory, dates_file), dtype="datetime64[D]",
+                                    mode=mode, shape=(meta["date_capacity"],))
+            self._closes = np.memmap(os.path.join(self.directory, closes_file), dtype=np.float64, mode=mode,
+                                     shape=(meta["date_capacity"], meta["ticker_capacity"]), order="F")
+            self._columns = {t: i for i, t in enumerate(meta["tickers"])}
+            self._meta = meta
+            self._meta_mtime = mtime
+
+
+def _normalise(frame: pd.DataFrame) -> pd.DataFrame:
+    """Date-only sorted index, upper-case ticker columns, duplicate days collapsed to the last."""
+    frame = frame.copy()
+    index = pd.DatetimeIndex(frame.index)
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    frame.index = index.normalize()
+    frame.columns = [str(c).upper() for c in frame.columns]
+    frame = frame.loc[:, ~frame.columns.duplicated(keep="last")]
+    return frame[~frame.index.duplicated(keep="last")].sort_index().astype(float)
+
+
+def _next_capacity(n: int) -> int:
+    """Room to grow: the next power of two at or above 1.5x the current size."""
+    return 1 << int(np.ceil(np.log2(max(n * 1.5, 1))))
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_price_store() -> PriceStore:
+    """Shared store at PRICE_STORE_DIR, opened lazily."""
+    global _store
+    with _store_lock:
+        if _store is None or _store.directory != settings.PRICE_STORE_DIR:
+            _store = PriceStore(settings.PRICE_STORE_DIR)
+        return _store
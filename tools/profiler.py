@@ -0,0 +1,134 @@
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import Callable
+from types import CodeType, FrameType
+
+
+# Profiler of the request being handled; copied into worker threads with the context
+current_profiler: ContextVar["SamplingProfiler | None"] = ContextVar("current_profiler", default=None)
+
+
+def run_tagged(func: Callable, *args, **kwargs):
+    """
+    Runs func, marking the current thread as working for the profiled request.
+
+    Worker wrappers call it inside the copied request context (for example
+    ctx.run(run_tagged, func, arg)), so pool threads doing a request's work
+    are sampled along with the request thread. A no-op when the request is
+    not being profiled.
+    """
+    profiler = current_profiler.get()
+    if profiler is None:
+        return func(*args, **kwargs)
+    profiler.add_thread()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        profiler.remove_thread()
+
+
+def _frame_label(frame: FrameType) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    """
+    Wall-clock sampling profiler that writes folded stacks.
+
+    A background thread snapshots the stacks of the threads of interest every
+    interval_ms. Nothing is hooked into the interpreter, so code being
+    profiled runs at full speed between samples. The output is the folded
+    format read by flamegraph.pl, speedscope and inferno.
+
+    Args:
+        interval_ms (float): Time between samples.
+        target (Callable[[], CodeType | None] | None): Returns the code
+            object (e.g. the endpoint function) a thread's stack must contain
+            to be sampled, which keeps the event loop and idle workers out of
+            the profile. Threads tagged through run_tagged are sampled
+            whatever their stack. Rounds where it returns None sample only
+            tagged threads. Every thread is sampled when omitted.
+    """
+
+    def __init__(self, interval_ms: float = 5.0, target: Callable[[], CodeType | None] | None = None):
+        self.interval = interval_ms / 1000
+        self.target = target
+        self.samples: Counter = Counter()
+        self._threads: Counter = Counter()
+        self._threads_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self.started_at = 0.0
+        self.duration = 0.0
+
+    def start(self):
+        self.started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+        self.duration = time.perf_counter() - self.started_at
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def add_thread(self):
+        """Samples the calling thread until the matching remove_thread."""
+        with self._threads_lock:
+            self._threads[threading.get_ident()] += 1
+
+    def remove_thread(self):
+        with self._threads_lock:
+            thread_id = threading.get_ident()
+            self._threads[thread_id] -= 1
+            if self._threads[thread_id] <= 0:
+                del self._threads[thread_id]
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            target_code = self.target() if self.target else None
+            with self._threads_lock:
+                tagged = set(self._threads)
+            if self.target and target_code is None and not tagged:
+                continue
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                name = names.get(thread_id, str(thread_id))
+                if thread_id in tagged:
+                    self._sample(name, frame, None)
+                elif not self.target or target_code is not None:
+                    self._sample(name, frame, target_code)
+
+    def _sample(self, thread_name: str, frame: FrameType, target_code: CodeType | None):
+        stack = []
+        found = target_code is None
+        while frame is not None:
+            stack.append(_frame_label(frame))
+            found = found or frame.f_code is target_code
+            frame = frame.f_back
+        if found:
+            stack.append(thread_name)
+            self.samples[";".join(reversed(stack))] += 1
+
+    def write_folded(self, path: str) -> str:
+        """Writes one 'frame;frame;frame count' line per distinct stack."""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w") as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+        return path
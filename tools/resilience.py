@@ -0,0 +1,193 @@
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Absolute monotonic time by which the current request must finish (None = no deadline)
+_deadline: ContextVar[float | None] = ContextVar("deadline", default=None)
+
+
+class DeadlineExceeded(Exception):
+    """Raised when there is no time left in the current request's budget."""
+
+
+class RateLimitExceeded(Exception):
+    """Raised when a token could not be acquired before the deadline."""
+
+
+class CircuitOpenError(Exception):
+    """Raised without calling the dependency while its circuit is open."""
+
+
+@contextmanager
+def deadline_scope(seconds: float | None):
+    """
+    Sets a deadline for everything called inside the block.
+    A nested scope can only shorten the deadline, never extend it.
+    """
+    if seconds is None:
+        yield
+        return
+    new_deadline = time.monotonic() + seconds
+    current = _deadline.get()
+    token = _deadline.set(new_deadline if current is None else min(current, new_deadline))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining_time() -> float | None:
+    """Seconds left before the current deadline, or None if there is none."""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return max(0.0, deadline - time.monotonic())
+
+
+def is_throttle_error(error: Exception) -> bool:
+    """Heuristic for provider throttling (HTTP 429 / 'Too Many Requests')."""
+    text = str(error).lower()
+    return "too many requests" in text or "429" in text or "rate limit" in text
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket with additive-increase / multiplicative-decrease
+    adaptation: throttling halves the refill rate, successes slowly restore it.
+    """
+
+    def __init__(self, rate: float, capacity: float | None = None, min_rate: float | None = None):
+        """
+        Args:
+            rate (float): Maximum tokens added per second.
+            capacity (float | None): Burst size, defaults to one second of tokens.
+            min_rate (float | None): Floor the adaptive rate can fall to.
+        """
+        self.max_rate = rate
+        self.rate = rate
+        self.min_rate = min_rate if min_rate is not None else rate / 16
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, timeout: float | None = None) -> bool:
+        """
+        Takes one token, waiting up to timeout seconds for it.
+
+        Returns:
+            bool: False if no token became available in time.
+        """
+        end = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self.lock:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return True
+                wait = (1 - self.tokens) / self.rate
+            if end is not None:
+                left = end - time.monotonic()
+                if left <= 0 or wait > left:
+                    return False
+            time.sleep(wait)
+
+    def on_throttled(self):
+        with self.lock:
+            self.rate = max(self.min_rate, self.rate / 2)
+
+    def on_success(self):
+        with self.lock:
+            self.rate = min(self.max_rate, self.rate + self.max_rate / 20)
+
+
+class CircuitBreaker:
+    """
+    Opens after consecutive failures so callers fail fast instead of each
+    waiting out a timeout. After reset_timeout one trial call is let through
+    (half-open); its outcome closes or re-opens the circuit.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: float | None = None
+        self.half_open_trial = False
+        self.lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self.lock:
+            if self.opened_at is None:
+                return "closed"
+            if time.monotonic() - self.opened_at >= self.reset_timeout:
+                return "half-open"
+            return "open"
+
+    def before_call(self):
+        """Raises CircuitOpenError unless the call may proceed."""
+        with self.lock:
+            if self.opened_at is None:
+                return
+            if time.monotonic() - self.opened_at < self.reset_timeout or self.half_open_trial:
+                raise CircuitOpenError("Circuit open; failing fast.")
+            self.half_open_trial = True
+
+    def release_trial(self):
+        """Ends a half-open trial that produced no outcome (e.g. it never reached the source)."""
+        with self.lock:
+            self.half_open_trial = False
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.half_open_trial = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.half_open_trial or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+            self.half_open_trial = False
+
+
+def call_with_retries(func, attempts: int = 3, base_delay: float = 0.2, max_delay: float = 2.0, retry_if=None):
+    """
+    Calls func, retrying failures with full-jitter exponential backoff.
+    Retries stop early when the next sleep would overrun the current deadline.
+
+    Args:
+        func (callable): Zero-argument callable to run.
+        attempts (int): Maximum number of calls.
+        base_delay (float): Backoff base in seconds.
+        max_delay (float): Cap on a single backoff sleep.
+        retry_if (callable | None): Predicate deciding whether an error is retryable.
+
+    Returns:
+        The result of func.
+    """
+    for attempt in range(attempts):
+        left = remaining_time()
+        if left is not None and left <= 0:
+            raise DeadlineExceeded("Request deadline exceeded before call.")
+        try:
+            return func()
+        except (CircuitOpenError, DeadlineExceeded, RateLimitExceeded):
+            raise
+        except Exception as e:
+            if attempt == attempts - 1 or (retry_if is not None and not retry_if(e)):
+                raise
+            delay = random.uniform(0, min(max_delay, base_delay * 2 ** attempt))
+            left = remaining_time()
+            if left is not None and delay >= left:
+                raise
+            time.sleep(delay)
@@ -0,0 +1,236 @@
+from typing import NamedTuple
+import numpy as np
+from config.settings import settings
+from tools.cache import TTLCache
+from tools.price_store import PriceStore, get_price_store
+from tools.tracing import count, traced
+
+TRADING_DAYS = 252
+
+
+class RiskModel(NamedTuple):
+    """Daily return history and covariance for a ticker set over one date window."""
+    tickers: list[str]
+    dates: np.ndarray  # the base day, then one date per row of returns
+    returns: np.ndarray  # days x tickers simple daily returns, no gaps
+    covariance: np.ndarray  # tickers x tickers, daily
+    last_closes: np.ndarray  # latest close per ticker
+    excluded: list[str]  # requested tickers with too little stored history
+
+
+# Keyed by ticker set and date window, so new closes in the store start a new entry
+covariance_cache = TTLCache(ttl_seconds=settings.RISK_CACHE_TTL_SECONDS, max_entries=32)
+
+
+class RiskEngine:
+    """
+    Portfolio risk from the daily closes in the price store.
+
+    Returns for the whole ticker set are one matrix, so covariance is a single
+    matrix product and every portfolio statistic is a few vector operations;
+    a 500-ticker, one-year model builds in milliseconds. Models are cached by
+    ticker set and date window, so follow-up questions about the same
+    portfolio only redo the weighting.
+    """
+
+    def __init__(self, store: PriceStore | None = None, cache: TTLCache | None = None):
+        """
+        Args:
+            store (PriceStore | None): Source of closes, defaults to the shared store.
+            cache (TTLCache | None): Model cache, defaults to the shared one.
+        """
+        self._store = store
+        self.cache = covariance_cache if cache is None else cache
+
+    @property
+    def store(self) -> PriceStore:
+        return self._store if self._store is not None else get_price_store()
+
+    def model(self, tickers, lookback_days: int | None = None, end=None) -> RiskModel | None:
+        """
+        Builds (or reads from cache) the return history and covariance for a ticker set.
+
+        Args:
+            tickers (Iterable[str]): Tickers to model.
+            lookback_days (int | None): Trading days of returns, defaults to RISK_LOOKBACK_DAYS.
+            end: Last day of the window (anything np.datetime64 accepts), defaults to the latest stored day.
+
+        Returns:
+            RiskModel | None: None if the store holds no closes up to end.
+        """
+        lookback = lookback_days or settings.RISK_LOOKBACK_DAYS
+        store = self.store
+        dates = store.dates
+        hi = len(dates) if end is None else int(np.searchsorted(dates, np.datetime64(end, "D"), side="right"))
+        if hi == 0:
+            return None
+        lo = max(0, hi - lookback - 1)
+
+        tickers = sorted({str(t).upper() for t in tickers if t})
+        key = (tuple(tickers), str(dates[lo]), str(dates[hi - 1]))
+        cached = self.cache.get(key)
+        if cached is not None:
+            count("risk_model_cache.hits")
+            return cached
+        count("risk_model_cache.misses")
+
+        window_dates, closes, names = store.window(tickers, dates[lo], dates[hi - 1])
+        model = build_model(
+            np.asarray(window_dates), np.asarray(closes, dtype=float), names,
+            missing=[t for t in tickers if t not in set(names)],
+        )
+        self.cache.set(key, model)
+        return model
+
+    @traced("RiskEngine.analyse")
+    def analyse(
+        self,
+        quantities: dict,
+        prices: dict | None = None,
+        lookback_days: int | None = None,
+        confidence: float | None = None,
+        end=None,
+    ) -> dict | None:
+        """
+        Volatility, historical VaR/CVaR, drawdown and concentration of a portfolio.
+
+        Args:
+            quantities (dict): Ticker to shares held.
+            prices (dict | None): Ticker to current price for weighting; the
+                latest stored close is used where missing.
+            lookback_days (int | None): Trading days of history, defaults to RISK_LOOKBACK_DAYS.
+            confidence (float | None): VaR confidence level, defaults to RISK_CONFIDENCE.
+            end: Last day of the window, defaults to the latest stored day.
+
+        Returns:
+            dict | None: Risk figures (one-day VaR and CVaR in dollars and as a
+            fraction of value), or None if no holding has enough history.
+        """
+        confidence = confidence or settings.RISK_CONFIDENCE
+        holdings = {str(t).upper(): float(q) for t, q in quantities.items() if t and q}
+        model = self.model(holdings, lookback_days, end)
+        if model is None or not model.tickers:
+            return None
+
+        prices = {str(t).upper(): p for t, p in (prices or {}).items()}
+        price = np.array([prices.get(t) or c for t, c in zip(model.tickers, model.last_closes)])
+        values = np.array([holdings[t] for t in model.tickers]) * price
+        total = float(values.sum())
+        if total <= 0:
+            return None
+        weights = values / total
+
+        figures = portfolio_risk(model, weights, confidence)
+        contributions = figures.pop("risk_contributions")
+        asset_vol = np.sqrt(np.diag(model.covariance) * TRADING_DAYS)
+        return {
+            "as_of": str(model.dates[-1]),
+            "observations": len(model.returns),
+            "confidence": confidence,
+            "total_value": round(total, 2),
+            **figures,
+            "var": round(figures["var_pct"] * total, 2),
+            "cvar": round(figures["cvar_pct"] * total, 2),
+            "holdings": [
+                {
+                    "ticker": model.tickers[i],
+                    "weight": round(float(weights[i]), 6),
+                    "annual_volatility": round(float(asset_vol[i]), 6),
+                    "risk_contribution": round(float(contributions[i]), 6),
+                }
+                for i in np.argsort(-contributions)
+            ],
+            "excluded": model.excluded,
+        }
+
+
+def build_model(dates: np.ndarray, closes: np.ndarray, names: list[str], missing: list[str] | None = None,
+                min_observations: int | None = None) -> RiskModel:
+    """
+    Turns a dates x tickers block of closes into a RiskModel.
+
+    Gaps are forward-filled. Tickers with fewer than RISK_MIN_OBSERVATIONS
+    returns are excluded, and the rest are trimmed to the days every one of
+    them has, so the covariance matrix is estimated on a common history.
+    """
+    min_obs = settings.RISK_MIN_OBSERVATIONS if min_observations is None else min_observations
+    filled = _forward_fill(closes)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        returns = filled[1:] / filled[:-1] - 1
+
+    keep = np.isfinite(returns).sum(axis=0) >= max(min_obs, 2)
+    excluded = list(missing or []) + [n for n, k in zip(names, keep) if not k]
+    names = [n for n, k in zip(names, keep) if k]
+    returns = returns[:, keep]
+    rows = np.isfinite(returns).all(axis=1)
+    if not names or not rows.any():
+        return RiskModel([], dates[:0], np.empty((0, 0)), np.empty((0, 0)), np.empty(0), excluded + names)
+
+    first = int(np.argmax(rows))
+    returns = np.ascontiguousarray(returns[rows])
+    centred = returns - returns.mean(axis=0)
+    covariance = centred.T @ centred / max(len(returns) - 1, 1)
+    return RiskModel(
+        tickers=names,
+        dates=np.concatenate([dates[first:first + 1], dates[1:][rows]]),
+        returns=returns,
+        covariance=covariance,
+        last_closes=filled[-1, keep],
+        excluded=excluded,
+    )
+
+
+def portfolio_risk(model: RiskModel, weights: np.ndarray, confidence: float) -> dict:
+    """
+    Portfolio statistics for weights aligned with model.tickers.
+
+    Returns:
+        dict: Daily and annual volatility, one-day historical VaR and CVaR as
+        fractions of value, maximum drawdown with its dates, concentration
+        measures and each ticker's share of variance ("risk_contributions").
+    """
+    marginal = model.covariance @ weights
+    variance = float(weights @ marginal)
+    daily_vol = np.sqrt(max(variance, 0.0))
+    contributions = weights * marginal / variance if variance > 0 else np.zeros_like(weights)
+
+    # Historical simulation: today's weights applied to every day in the window
+    daily = model.returns @ weights
+    var = max(0.0, -float(np.quantile(daily, 1 - confidence)))
+    tail = daily[daily <= -var]
+    cvar = max(var, -float(tail.mean())) if len(tail) else var
+
+    path = np.concatenate([[1.0], np.cumprod(1 + daily)])
+    drawdowns = 1 - path / np.maximum.accumulate(path)
+    trough = int(np.argmax(drawdowns))
+    peak = int(np.argmax(path[:trough + 1]))
+
+    asset_vol = np.sqrt(np.diag(model.covariance))
+    hhi = float(weights @ weights)
+    top = np.argsort(-weights)[:5]
+    return {
+        "daily_volatility": round(float(daily_vol), 6),
+        "annual_volatility": round(float(daily_vol * np.sqrt(TRADING_DAYS)), 6),
+        "var_pct": round(var, 6),
+        "cvar_pct": round(cvar, 6),
+        "max_drawdown": {
+            "pct": round(float(drawdowns[trough]), 6),
+            "peak": str(model.dates[peak]),
+            "trough": str(model.dates[trough]),
+        },
+        "concentration": {
+            "hhi": round(hhi, 6),
+            "effective_holdings": round(1 / hhi, 2) if hhi > 0 else 0.0,
+            "top_holdings": [[model.tickers[i], round(float(weights[i]), 6)] for i in top],
+            "top5_weight": round(float(weights[top].sum()), 6),
+            "diversification_ratio": round(float(weights @ asset_vol / daily_vol), 4) if daily_vol > 0 else 1.0,
+        },
+        "risk_contributions": contributions,
+    }
+
+
+def _forward_fill(values: np.ndarray) -> np.ndarray:
+    """Carries the last close over gaps, column by column; leading gaps stay NaN."""
+    index = np.where(np.isnan(values), 0, np.arange(len(values))[:, None])
+    np.maximum.accumulate(index, axis=0, out=index)
+    return values[index, np.arange(values.shape[1])]
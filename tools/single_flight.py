@@ -0,0 +1,88 @@
+import asyncio
+import threading
+
+
+class _Call:
+    __slots__ = ("event", "result", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical work.
+
+    While a call for a key is in flight, further callers with the same key
+    wait for it and receive the same result (or exception) instead of
+    repeating the work. Nothing is cached once the call finishes.
+    Results are shared between callers, so treat them as read-only.
+    """
+
+    def __init__(self):
+        self._calls: dict = {}
+        self._lock = threading.Lock()
+        self._async_calls: dict = {}
+
+    def do(self, key, func, *args, **kwargs):
+        """
+        Runs func(*args, **kwargs) once per key across concurrent threads.
+
+        Returns:
+            The result shared by every caller of this flight.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func(*args, **kwargs)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.event.set()
+        return call.result
+
+    async def do_async(self, key, func, *args, **kwargs):
+        """
+        Awaits func(*args, **kwargs) once per key across concurrent tasks.
+        func must return an awaitable. Flights are tracked per event loop.
+
+        The work runs in its own task and every caller, the first included,
+        awaits it through shield(), so cancelling any one caller leaves the
+        others waiting on the same result.
+        """
+        loop = asyncio.get_running_loop()
+        flights = self._async_calls.setdefault(loop, {})
+        task = flights.get(key)
+        if task is None:
+            task = flights[key] = loop.create_task(func(*args, **kwargs))
+            task.add_done_callback(lambda done: self._finish_async(loop, key, done))
+        return await asyncio.shield(task)
+
+    def _finish_async(self, loop, key, task):
+        flights = self._async_calls.get(loop, {})
+        if flights.get(key) is task:
+            flights.pop(key)
+        if not flights:
+            self._async_calls.pop(loop, None)
+        # Retrieve the exception so a flight nobody is awaiting any more does not log a warning
+        if not task.cancelled():
+            task.exception()
+
+
+# Shared instance; keys are namespaced, e.g. "quote:AAPL" or "portfolio:42"
+single_flight = SingleFlight()
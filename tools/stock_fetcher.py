@@ -1,33 +1,103 @@
-import yfinance as yf
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from config.settings import settings
+from tools.cache import TieredCache
+from tools.market_data import get_provider
+from tools.profiler import run_tagged
+from tools.single_flight import single_flight
+from tools.tracing import count
+
+# Shared quote cache so prefetching and later lookups hit the same entries.
+# Both tiers persist to disk, so a restarted process starts warm.
+price_cache = TieredCache("quotes", ttl_seconds=settings.PRICE_CACHE_TTL_SECONDS)
+# Last known good prices, served while the market data source is failing
+stale_price_cache = TieredCache("quotes.stale", ttl_seconds=settings.STALE_CACHE_TTL_SECONDS)
+
+
+def _remember_price(ticker: str, price: float) -> float:
+    price_cache.set(ticker, price)
+    stale_price_cache.set(ticker, price)
+    return price
+
 
 def get_stock_price(ticker: str) -> float | None:
     """
     Fetches the current stock price for a given ticker symbol.
     """
     ticker = str(ticker).upper()
+    cached = price_cache.get(ticker)
+    if cached is not None:
+        count("price_cache.hits")
+        return cached
+    count("price_cache.misses")
+
+    # Concurrent cold lookups of the same ticker share one fetch
+    return single_flight.do(f"quote:{ticker}", _fetch_stock_price, ticker)
+
+
+async def get_stock_price_async(ticker: str) -> float | None:
+    """
+    Async variant of get_stock_price; concurrent tasks share one fetch.
+    """
+    ticker = str(ticker).upper()
+    cached = price_cache.get(ticker)
+    if cached is not None:
+        return cached
+    return await single_flight.do_async(f"quote:{ticker}", asyncio.to_thread, get_stock_price, ticker)
+
+
+def _fetch_stock_price(ticker: str) -> float | None:
     try:
-        stock = yf.Ticker(ticker)
+        provider = get_provider()
         
         # Try the 'fast_info' first
-        if hasattr(stock, 'fast_info') and stock.fast_info.get('lastPrice') is not None:
-            return round(stock.fast_info['lastPrice'], 2)
+        last_price = provider.get_last_price(ticker)
+        if last_price is not None:
+            return _remember_price(ticker, round(last_price, 2))
         
         # Fallback to 1d history
-        history = stock.history(period="1d")
+        history = provider.get_history(ticker, "1d")
         if not history.empty:
-            price = history["Close"].iloc[-1]
-            return round(price, 2)
+            return _remember_price(ticker, round(history["Close"].iloc[-1], 2))
         
         # Fallback to 5d history (sometimes 1d is empty)
-        history = stock.history(period="5d")
+        history = provider.get_history(ticker, "5d")
         if not history.empty:
-            price = history["Close"].iloc[-1]
-            return round(price, 2)
+            return _remember_price(ticker, round(history["Close"].iloc[-1], 2))
         
         # Could not fetch price
         print(f"Could not fetch latest price for {ticker}. Returning 0.")
         return None
 
     except Exception as e:
+        stale = stale_price_cache.get(ticker)
+        if stale is not None:
+            count("price_cache.stale")
+            print(f"Error fetching price for {ticker}: {e}. Serving last known price.")
+            return stale
         print(f"Error fetching price for {ticker}: {e}")
         return None
+
+
+def prefetch_stock_prices(tickers: list[str], max_workers: int | None = None) -> dict:
+    """
+    Fetches prices for many tickers concurrently, filling the quote cache.
+
+    Args:
+        tickers (list[str]): Tickers to warm. Duplicates are fetched once.
+        max_workers (int | None): Thread pool size, defaults to PREFETCH_MAX_WORKERS.
+
+    Returns:
+        dict: Ticker to price (None where the fetch failed).
+    """
+    unique = sorted({str(t).upper() for t in tickers if t})
+    if not unique:
+        return {}
+
+    workers = min(max_workers or settings.PREFETCH_MAX_WORKERS, len(unique))
+    # Each task runs in a copy of the caller's context so request deadlines carry over
+    contexts = [copy_context() for _ in unique]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        prices = pool.map(lambda ctx, ticker: ctx.run(run_tagged, get_stock_price, ticker), contexts, unique)
+        return dict(zip(unique, prices))
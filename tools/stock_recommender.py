@@ -1,30 +1,112 @@
-import yfinance as yf
+import hashlib
+import json
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 from db.connection import get_connection
+from db.ticker_scores import apply_ticker_labels, get_ticker_scores, save_ticker_scores
+from config.settings import settings
+from tools.cache import TieredCache
+from tools.market_data import get_provider
+from tools.price_store import get_price_store
+from tools.single_flight import single_flight
+from tools.tracing import count, traced
+
+# Fundamentals move slowly, so they are shared across recommender instances
+fundamentals_cache = TieredCache("fundamentals", ttl_seconds=settings.FUNDAMENTALS_CACHE_TTL_SECONDS)
+# Last known good fundamentals, served while the market data source is failing
+stale_fundamentals_cache = TieredCache("fundamentals.stale", ttl_seconds=settings.STALE_CACHE_TTL_SECONDS)
+
+# Fields score_stock reads; a ticker is re-scored only when one of them moves
+SCORING_INPUTS = (
+    "Current Price", "Target Mean Price", "Price-to-Book",
+    "Return on Equity", "Debt-to-Equity", "Price Trend",
+)
+# Bump when score_stock or the label thresholds change so every ticker is re-scored
+SCORING_VERSION = 1
+
+
+def scoring_inputs_hash(data: dict) -> str:
+    """Hash of the scoring inputs, rounded to 6 significant digits to ignore float noise."""
+    values = [f"{float(data.get(k) or 0):.6g}" for k in SCORING_INPUTS]
+    return hashlib.sha256(json.dumps([SCORING_VERSION, values]).encode()).hexdigest()
+
+
+def label_for_score(score: int) -> str:
+    if score >= 12:
+        return "Strong Buy"
+    elif score >= 8:
+        return "Buy"
+    elif score >= 5:
+        return "Hold"
+    return "Sell"
+
 
 class StockRecommender:
     def fetch_stock_data(self, ticker: str):
         """Fetches stock data using Yahoo Finance."""
+        cached = fundamentals_cache.get(ticker)
+        if cached is not None:
+            count("fundamentals_cache.hits")
+            return cached
+        count("fundamentals_cache.misses")
+        return single_flight.do(f"fundamentals:{ticker}", self._fetch_stock_data, ticker)
+
+    def _fetch_stock_data(self, ticker: str):
         try:
-            stock = yf.Ticker(ticker)
-            info = stock.info
-            history = stock.history(period="6mo")
+            provider = get_provider()
+            info = provider.get_info(ticker)
 
             total_debt = info.get("totalDebt", 0) or 0
             total_equity = info.get("totalStockholderEquity", 1) or 1
             debt_to_equity = total_debt / total_equity if total_equity else 0
 
-            return {
+            data = {
                 "Ticker": ticker,
                 "Current Price": info.get("currentPrice", 0),
                 "Target Mean Price": info.get("targetMeanPrice", 0),
                 "Price-to-Book": info.get("priceToBook", 0),
                 "Return on Equity": info.get("returnOnEquity", 0),
                 "Debt-to-Equity": debt_to_equity,
-                "Price Trend": history["Close"].pct_change().mean() if not history.empty else 0,
+                "Price Trend": self.price_trend(ticker),
             }
+            fundamentals_cache.set(ticker, data)
+            stale_fundamentals_cache.set(ticker, data)
+            return data
         except Exception as e:
+            stale = stale_fundamentals_cache.get(ticker)
+            if stale is not None:
+                count("fundamentals_cache.stale")
+                return stale
             return {"Ticker": ticker, "error": f"Failed to fetch data: {str(e)}"}
 
+    def price_trend(self, ticker: str) -> float:
+        """
+        Mean daily return over the last six months.
+
+        Closes come from the local price store when it holds a recent history
+        for the ticker; otherwise they are fetched from the market data provider.
+        """
+        closes = self._stored_closes(ticker)
+        if closes is not None:
+            return float(np.mean(closes[1:] / closes[:-1] - 1))
+        history = get_provider().get_history(ticker, "6mo")
+        return history["Close"].pct_change().mean() if not history.empty else 0
+
+    def _stored_closes(self, ticker: str):
+        store = get_price_store()
+        if store.column(ticker) is None:
+            return None
+        # Freshness is judged on this ticker's own closes; other tickers may have newer days
+        dates, closes = store.history(ticker)
+        stored = np.flatnonzero(~np.isnan(closes))
+        if len(stored) < 2:
+            return None
+        last = dates[stored[-1]]
+        if last < np.datetime64("today", "D") - settings.PRICE_STORE_MAX_AGE_DAYS:
+            return None
+        recent = stored[dates[stored] >= last - 182]
+        return closes[recent] if len(recent) > 1 else None
+
     def score_stock(self, data):
         """Assigns a score based on financial metrics."""
         if "error" in data or not data.get("Current Price"):
@@ -86,36 +168,85 @@ class StockRecommender:
 
         return score
 
+    @traced("recommend_stock")
     def recommend_stock(self, ticker: str):
         """Generates a recommendation for a single ticker."""
+        return single_flight.do(f"recommendation:{ticker}", self._recommend_stock, ticker)
+
+    def _recommend_stock(self, ticker: str):
         stock_data = self.fetch_stock_data(ticker)
         if "error" in stock_data:
             return {"Ticker": ticker, "Recommendation": "Error: " + stock_data["error"]}
 
         score = self.score_stock(stock_data)
-
-        if score >= 12:
-            recommendation = "Strong Buy"
-        elif score >= 8:
-            recommendation = "Buy"
-        elif score >= 5:
-            recommendation = "Hold"
-        else:
-            recommendation = "Sell"
-
-        return {"Ticker": ticker, "Recommendation": recommendation}
+        return {"Ticker": ticker, "Recommendation": label_for_score(score)}
 
     def update_portfolio_recommendations(self, user_id: int):
         """Fetches tickers from DB, updates recommendations back to DB."""
-        with get_connection() as conn:
+        return self.refresh_recommendations(user_id=user_id)
+
+    def refresh_recommendations(self, tickers: list[str] | None = None, user_id: int | None = None) -> dict:
+        """
+        Re-scores tickers whose scoring inputs changed and relabels their holdings.
+
+        Each ticker's inputs hash, score and label are kept in ticker_scores.
+        Tickers whose fetched inputs hash to the stored value are not
+        re-scored, and only portfolio rows whose label differs from the
+        stored one are written, so a refresh costs the fetches plus work in
+        proportion to what changed.
+
+        Args:
+            tickers (list[str] | None): Tickers to refresh. Defaults to the
+                user's holdings, or every held ticker when user_id is None.
+            user_id (int | None): Refresh this user's tickers and sweep their
+                unlabelled holdings. Other holders of a re-scored ticker are
+                relabelled too, since labels are shared per ticker.
+
+        Returns:
+            dict: Counts of tickers checked, re-scored, unchanged and failed,
+            and the number of portfolio rows updated.
+        """
+        with get_connection(read_only=True) as conn:
             with conn.cursor() as cur:
-                cur.execute("SELECT ticker FROM portfolio WHERE user_id = %s;", (user_id,))
-                tickers = [r[0] for r in cur.fetchall()]
-
-                for ticker in tickers:
-                    rec = self.recommend_stock(ticker)["Recommendation"]
+                if tickers is None:
                     cur.execute(
-                        "UPDATE portfolio SET recommendation = %s WHERE user_id = %s AND ticker = %s;",
-                        (rec, user_id, ticker),
+                        """
+                        SELECT DISTINCT UPPER(ticker) FROM current_portfolio
+                        WHERE ticker IS NOT NULL AND (%s::int IS NULL OR user_id = %s);
+                        """,
+                        (user_id, user_id),
                     )
-                conn.commit()
+                    tickers = [r[0] for r in cur.fetchall()]
+                tickers = sorted({t.upper() for t in tickers if t})
+                stored = get_ticker_scores(cur, tickers)
+
+        # No connection is held while fundamentals are fetched
+        with ThreadPoolExecutor(max_workers=settings.PREFETCH_MAX_WORKERS) as pool:
+            fetched = list(pool.map(self.fetch_stock_data, tickers))
+
+        rescored, failed = [], 0
+        for ticker, data in zip(tickers, fetched):
+            if "error" in data:
+                failed += 1  # keep the last good label
+                continue
+            digest = scoring_inputs_hash(data)
+            if ticker in stored and stored[ticker][0] == digest:
+                continue
+            score = self.score_stock(data)
+            rescored.append((ticker, digest, score, label_for_score(score)))
+        changed = [t for t, _, _, rec in rescored if t not in stored or stored[t][2] != rec]
+
+        with get_connection() as conn:
+            with conn.cursor() as cur:
+                save_ticker_scores(cur, rescored)
+                rows_updated = apply_ticker_labels(cur, changed, user_id)
+            conn.commit()
+
+        return {
+            "tickers": len(tickers),
+            "rescored": len(rescored),
+            "unchanged": len(tickers) - len(rescored) - failed,
+            "failed": failed,
+            "labels_changed": len(changed),
+            "rows_updated": rows_updated,
+        }
@@ -1,5 +1,65 @@
+import hashlib
+import json
+import math
 from langchain_openai import ChatOpenAI
 from langchain.schema import HumanMessage
+from tools.llm_client import LLMClient
+from tools.tracing import record_llm_usage, traced
+from config.settings import settings
+
+# Bump when the prompt changes so stored analyses are regenerated
+ANALYSIS_VERSION = 1
+
+
+def stock_data_from_rows(rows) -> dict:
+    """
+    Builds the per-ticker stock data the analyser expects.
+
+    Args:
+        rows: (ticker, buy_price, quantity, holding_period_months) tuples.
+
+    Returns:
+        dict: Ticker to buy price, quantity and holding period.
+    """
+    stock_data = {}
+    for ticker, buy_price, quantity, holding_period in rows:
+        stock_data[str(ticker).upper()] = {
+            "buy_price": float(buy_price) if buy_price else None,
+            "quantity": int(quantity) if quantity else None,
+            "holding_period": int(holding_period) if holding_period else None,
+        }
+    return stock_data
+
+
+def loss_band(loss: float) -> int:
+    """
+    Geometric bucket of a harvestable loss; neighbouring bands differ by
+    TAX_HARVEST_LOSS_BAND (25% by default). Losses under $1 share band 0.
+    """
+    if loss < 1:
+        return 0
+    return 1 + int(math.log(loss) / math.log1p(settings.TAX_HARVEST_LOSS_BAND))
+
+
+def portfolio_hash(recommendations: dict, stock_data: dict, harvest_opportunities: list[dict] | None = None) -> str:
+    """
+    Fingerprint of everything the selling-strategy analysis depends on.
+
+    Harvest losses move with every quote, so only which lots are harvestable
+    and the band of each loss go in: a day's drift keeps serving the stored
+    analysis, while a new candidate or a loss that has grown or shrunk by a
+    band regenerates it.
+    """
+    payload = {
+        "version": ANALYSIS_VERSION,
+        "holdings": stock_data,
+        "recommendations": {t: recommendations.get(t) for t in stock_data},
+        "harvest": sorted(
+            [o["ticker"], o["holding_period"], o["wash_sale_conflict"], loss_band(o["harvestable_loss"])]
+            for o in harvest_opportunities or []
+        ),
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
 
 
 class TaxAnalyser:
@@ -10,21 +70,44 @@ class TaxAnalyser:
         Args:
             api_key (str): OpenAI API key for tax analysis.
         """
-        self.llm = ChatOpenAI(model="gpt-4", openai_api_key=api_key)
+        self.llm = LLMClient(ChatOpenAI(model="gpt-4", openai_api_key=api_key, max_retries=0))
 
-    def analyse_selling_strategy(self, recommendations: dict, stock_data: dict) -> str:
+    @traced("TaxAnalyser.analyse_selling_strategy")
+    def analyse_selling_strategy(
+        self, recommendations: dict, stock_data: dict, harvest_opportunities: list[dict] | None = None
+    ) -> str:
         """
         Analyzes the most tax-efficient way to sell stocks.
 
         Args:
             recommendations (dict): Stock recommendations with buy/hold/sell statuses.
             stock_data (dict): Contains stock tickers, purchase prices, and holding periods.
+            harvest_opportunities (list[dict] | None): Ranked candidates from
+                TaxLossScanner. When given, the LLM explains them instead of searching.
 
         Returns:
             str: Suggested tax-efficient strategy.
         """
+        prompt, message = self.build_prompt(recommendations, stock_data, harvest_opportunities)
+        if prompt is None:
+            return message
+
+        response = self.llm.invoke([HumanMessage(content=prompt)])
+        record_llm_usage(response, self.llm.model_name)
+        return response.content if hasattr(response, "content") else str(response)
+
+    def build_prompt(
+        self, recommendations: dict, stock_data: dict, harvest_opportunities: list[dict] | None = None
+    ) -> tuple[str | None, str | None]:
+        """
+        Builds the selling-strategy prompt without calling the LLM (used by the nightly batch).
+
+        Returns:
+            tuple[str | None, str | None]: The prompt, or None and the answer to
+            give directly when there is nothing to analyse.
+        """
         if not recommendations or not stock_data:
-            return "No sufficient data available for tax analysis."
+            return None, "No sufficient data available for tax analysis."
 
         # Filter stocks marked for "Sell"
         sell_stocks = {
@@ -61,7 +144,7 @@ class TaxAnalyser:
             }
 
             if not fallback_stocks:
-                return "No valid stocks found for tax analysis."
+                return None, "No valid stocks found for tax analysis."
 
             stock_details = "\n".join(
                 f"{ticker}: Bought at {details.get('buy_price', 'N/A')} | "
@@ -83,6 +166,11 @@ class TaxAnalyser:
             - Any long-term holding advantages to preserve
             """
 
-        messages = [HumanMessage(content=prompt)]
-        response = self.llm.invoke(messages)
-        return response.content if hasattr(response, "content") else str(response)
+        if harvest_opportunities:
+            prompt += "\n            Pre-computed tax loss harvesting candidates (ranked):\n" + "\n".join(
+                f"            {o['ticker']}: loss {o['harvestable_loss']} | {o['holding_period']}-term"
+                + (" | wash-sale conflict" if o["wash_sale_conflict"] else "")
+                for o in harvest_opportunities
+            ) + "\n            Use these figures rather than estimating losses yourself.\n"
+
+        return prompt, None
@@ -0,0 +1,165 @@
+from collections import defaultdict
+from langchain.schema import HumanMessage
+from db.connection import get_connection
+from db.tax_analyses import finish_batch_run, get_stored_hashes, save_chunk, start_batch_run
+from tools.stock_fetcher import prefetch_stock_prices
+from tools.stock_recommender import StockRecommender
+from tools.tax_analyser import TaxAnalyser, portfolio_hash, stock_data_from_rows
+from tools.tax_loss_scanner import TaxLossScanner, acquired_from_holding_months
+from tools.tracing import record_llm_usage, tracer
+from config.settings import settings
+
+
+class TaxBatchJob:
+    """
+    Generates every user's selling-strategy analysis ahead of time.
+
+    Users are processed in chunks ordered by user ID. For each chunk the
+    prompts are built locally, users whose portfolio hash (holdings,
+    recommendations and current harvest figures) matches their stored
+    analysis are skipped, and the remaining prompts go to the LLM
+    with bounded concurrency. Results and the run checkpoint are committed
+    together, so an interrupted run resumes after the last finished chunk.
+    Failed users keep their old analysis and are retried on the next run.
+
+    Args:
+        api_key (str): OpenAI API key.
+        chunk_size (int | None): Users per chunk.
+        max_concurrency (int | None): LLM requests in flight at once.
+    """
+
+    def __init__(self, api_key: str, chunk_size: int | None = None, max_concurrency: int | None = None):
+        self.analyser = TaxAnalyser(api_key)
+        self.scanner = TaxLossScanner()
+        self.recommender = StockRecommender()
+        self.chunk_size = chunk_size or settings.TAX_BATCH_CHUNK_SIZE
+        self.max_concurrency = max_concurrency or settings.TAX_BATCH_CONCURRENCY
+
+    def run(self, resume: bool = True) -> dict:
+        """
+        Processes every user with a current portfolio.
+
+        Args:
+            resume (bool): Continue the latest unfinished run instead of starting over.
+
+        Returns:
+            dict: Run ID and counts of analysed, skipped and failed users.
+        """
+        run_id, last_user_id = start_batch_run(resume)
+        print(f"Tax batch run {run_id} starting after user {last_user_id}.")
+
+        while True:
+            with get_connection(read_only=True) as conn:
+                with conn.cursor() as cur:
+                    rows = self._load_chunk(cur, last_user_id)
+                    stored = get_stored_hashes(cur, sorted({r[0] for r in rows})) if rows else {}
+            if not rows:
+                break
+
+            # No connection is held while the LLM calls are in flight
+            with tracer.span("tax_batch.chunk", run_id=run_id, after_user=last_user_id):
+                results, skipped, failed = self.analyse_chunk(rows, stored)
+
+            last_user_id = max(r[0] for r in rows)
+            with get_connection() as conn:
+                with conn.cursor() as cur:
+                    save_chunk(cur, run_id, results, last_user_id, skipped, failed)
+                conn.commit()
+            print(f"Run {run_id}: up to user {last_user_id}, {len(results)} analysed, {skipped} unchanged, {failed} failed.")
+
+        return finish_batch_run(run_id)
+
+    def _load_chunk(self, cur, after_user_id: int) -> list[tuple]:
+        cur.execute(
+            """
+            SELECT user_id, UPPER(ticker), buy_price, quantity, holding_period_months, recommendation
+            FROM current_portfolio
+            WHERE user_id IN (
+                SELECT DISTINCT user_id FROM current_portfolio
+                WHERE user_id > %s
+                ORDER BY user_id
+                LIMIT %s
+            )
+            ORDER BY user_id, id;
+            """,
+            (after_user_id, self.chunk_size),
+        )
+        return cur.fetchall()
+
+    def analyse_chunk(self, rows: list[tuple], stored_hashes: dict[int, str]) -> tuple[list[tuple], int, int]:
+        """
+        Analyses one chunk of holdings.
+
+        Args:
+            rows (list[tuple]): (user_id, ticker, buy_price, quantity,
+                holding_period_months, recommendation) ordered by user.
+            stored_hashes (dict[int, str]): Portfolio hash of each user's stored analysis.
+
+        Returns:
+            tuple[list[tuple], int, int]: (user_id, portfolio_hash, analysis)
+            results, the number of unchanged users skipped and the number that failed.
+        """
+        by_user = defaultdict(list)
+        for row in rows:
+            by_user[row[0]].append(row)
+
+        # Holdings without a stored recommendation are scored once per ticker
+        missing = {r[1] for r in rows if not r[5]}
+        scored = {t: self.recommender.recommend_stock(t)["Recommendation"] for t in sorted(missing)}
+
+        # Harvest figures move with prices, so they are part of each user's hash
+        opportunities = self._harvest_opportunities([r for r in rows if r[2] is not None])
+
+        pending = {}
+        skipped = 0
+        for user_id, lots in by_user.items():
+            stock_data = stock_data_from_rows([(t, b, q, m) for _, t, b, q, m, _ in lots])
+            recommendations = {t: rec or scored.get(t, "Hold") for _, t, _, _, _, rec in lots}
+            harvest = opportunities.get(user_id, [])
+            digest = portfolio_hash(recommendations, stock_data, harvest)
+            if stored_hashes.get(user_id) == digest:
+                skipped += 1
+            else:
+                pending[user_id] = (digest, recommendations, stock_data, harvest)
+
+        if not pending:
+            return [], skipped, 0
+
+        results, prompts = [], []
+        for user_id, (digest, recommendations, stock_data, harvest) in pending.items():
+            prompt, message = self.analyser.build_prompt(recommendations, stock_data, harvest)
+            if prompt is None:
+                results.append((user_id, digest, message))
+            else:
+                prompts.append((user_id, digest, prompt))
+
+        responses = self.analyser.llm.batch(
+            [[HumanMessage(content=prompt)] for _, _, prompt in prompts],
+            config={"max_concurrency": self.max_concurrency},
+            return_exceptions=True,
+        ) if prompts else []
+
+        failed = 0
+        for (user_id, digest, _), response in zip(prompts, responses):
+            if isinstance(response, Exception):
+                print(f"Tax analysis failed for user {user_id}: {response}")
+                failed += 1
+                continue
+            record_llm_usage(response, self.analyser.llm.model_name)
+            results.append((user_id, digest, response.content if hasattr(response, "content") else str(response)))
+
+        return results, skipped, failed
+
+    def _harvest_opportunities(self, lots: list[tuple]) -> dict[int, list[dict]]:
+        if not lots:
+            return {}
+        user_ids, tickers, buy_prices, quantities, months, _ = zip(*lots)
+        prices = prefetch_stock_prices(sorted(set(tickers)))
+        return self.scanner.scan(
+            user_ids,
+            tickers,
+            [q or 0 for q in quantities],
+            [float(b) for b in buy_prices],
+            acquired_from_holding_months([m or 0 for m in months]),
+            prices,
+        )
@@ -0,0 +1,278 @@
+import numpy as np
+
+FILING_STATUSES = ("single", "married_joint", "married_separate", "head_of_household")
+
+# Federal figures by tax year and filing status: ordinary bracket floors and
+# rates, LTCG band floors (0/15/20%), standard deduction, the extra deduction
+# per filer aged 65+, and the number of filers on the return
+TAX_YEARS = {
+    2024: {
+        "single": {
+            "brackets": ((0, 0.10), (11_600, 0.12), (47_150, 0.22), (100_525, 0.24),
+                         (191_950, 0.32), (243_725, 0.35), (609_350, 0.37)),
+            "ltcg": ((0, 0.0), (47_025, 0.15), (518_900, 0.20)),
+            "standard_deduction": 14_600,
+            "senior_deduction": 1_950,
+            "filers": 1,
+        },
+        "married_joint": {
+            "brackets": ((0, 0.10), (23_200, 0.12), (94_300, 0.22), (201_050, 0.24),
+                         (383_900, 0.32), (487_450, 0.35), (731_200, 0.37)),
+            "ltcg": ((0, 0.0), (94_050, 0.15), (583_750, 0.20)),
+            "standard_deduction": 29_200,
+            "senior_deduction": 1_550,
+            "filers": 2,
+        },
+        "married_separate": {
+            "brackets": ((0, 0.10), (11_600, 0.12), (47_150, 0.22), (100_525, 0.24),
+                         (191_950, 0.32), (243_725, 0.35), (365_600, 0.37)),
+            "ltcg": ((0, 0.0), (47_025, 0.15), (291_850, 0.20)),
+            "standard_deduction": 14_600,
+            "senior_deduction": 1_550,
+            "filers": 1,
+        },
+        "head_of_household": {
+            "brackets": ((0, 0.10), (16_550, 0.12), (63_100, 0.22), (100_500, 0.24),
+                         (191_950, 0.32), (243_700, 0.35), (609_350, 0.37)),
+            "ltcg": ((0, 0.0), (63_000, 0.15), (551_350, 0.20)),
+            "standard_deduction": 21_900,
+            "senior_deduction": 1_950,
+            "filers": 1,
+        },
+    },
+    2025: {
+        "single": {
+            "brackets": ((0, 0.10), (11_925, 0.12), (48_475, 0.22), (103_350, 0.24),
+                         (197_300, 0.32), (250_525, 0.35), (626_350, 0.37)),
+            "ltcg": ((0, 0.0), (48_350, 0.15), (533_400, 0.20)),
+            "standard_deduction": 15_750,
+            "senior_deduction": 2_000,
+            "filers": 1,
+        },
+        "married_joint": {
+            "brackets": ((0, 0.10), (23_850, 0.12), (96_950, 0.22), (206_700, 0.24),
+                         (394_600, 0.32), (501_050, 0.35), (751_600, 0.37)),
+            "ltcg": ((0, 0.0), (96_700, 0.15), (600_050, 0.20)),
+            "standard_deduction": 31_500,
+            "senior_deduction": 1_600,
+            "filers": 2,
+        },
+        "married_separate": {
+            "brackets": ((0, 0.10), (11_925, 0.12), (48_475, 0.22), (103_350, 0.24),
+                         (197_300, 0.32), (250_525, 0.35), (375_800, 0.37)),
+            "ltcg": ((0, 0.0), (48_350, 0.15), (300_000, 0.20)),
+            "standard_deduction": 15_750,
+            "senior_deduction": 1_600,
+            "filers": 1,
+        },
+        "head_of_household": {
+            "brackets": ((0, 0.10), (17_000, 0.12), (64_850, 0.22), (103_350, 0.24),
+                         (197_300, 0.32), (250_500, 0.35), (626_350, 0.37)),
+            "ltcg": ((0, 0.0), (64_750, 0.15), (566_700, 0.20)),
+            "standard_deduction": 23_625,
+            "senior_deduction": 2_000,
+            "filers": 1,
+        },
+    },
+}
+
+LATEST_TAX_YEAR = max(TAX_YEARS)
+
+# Medicare IRMAA by premium year: (MAGI above which the tier applies, Part B
+# monthly premium, Part D monthly surcharge). Premiums for year Y are set from
+# the MAGI on the Y-2 return. Head of household uses the single thresholds.
+_IRMAA_SINGLE_2024 = ((0, 174.70, 0.0), (103_000, 244.60, 12.90), (129_000, 349.40, 33.30),
+                      (161_000, 454.20, 53.80), (193_000, 559.00, 74.20), (499_999, 594.00, 81.00))
+_IRMAA_SINGLE_2025 = ((0, 185.00, 0.0), (106_000, 259.00, 13.70), (133_000, 370.00, 35.30),
+                      (167_000, 480.90, 57.00), (200_000, 591.90, 78.60), (499_999, 628.90, 85.80))
+IRMAA_TIERS = {
+    2024: {
+        "single": _IRMAA_SINGLE_2024,
+        "head_of_household": _IRMAA_SINGLE_2024,
+        "married_joint": ((0, 174.70, 0.0), (206_000, 244.60, 12.90), (258_000, 349.40, 33.30),
+                          (322_000, 454.20, 53.80), (386_000, 559.00, 74.20), (749_999, 594.00, 81.00)),
+        "married_separate": ((0, 174.70, 0.0), (103_000, 559.00, 74.20), (396_999, 594.00, 81.00)),
+    },
+    2025: {
+        "single": _IRMAA_SINGLE_2025,
+        "head_of_household": _IRMAA_SINGLE_2025,
+        "married_joint": ((0, 185.00, 0.0), (212_000, 259.00, 13.70), (266_000, 370.00, 35.30),
+                          (334_000, 480.90, 57.00), (400_000, 591.90, 78.60), (749_999, 628.90, 85.80)),
+        "married_separate": ((0, 185.00, 0.0), (106_000, 591.90, 78.60), (393_999, 628.90, 85.80)),
+    },
+}
+
+# Net capital losses offset at most this much ordinary income per year
+CAPITAL_LOSS_LIMIT = 3_000
+
+
+def tax_table(filing_status: str = "single", year: int | None = None) -> dict:
+    """
+    Looks up the bracket table for a filing status and tax year.
+
+    Args:
+        filing_status (str): One of FILING_STATUSES.
+        year (int | None): Tax year, defaults to the latest available.
+
+    Returns:
+        dict: Brackets, LTCG bands and deductions.
+    """
+    year = LATEST_TAX_YEAR if year is None else year
+    if year not in TAX_YEARS:
+        raise ValueError(f"No tax tables for {year}; available: {sorted(TAX_YEARS)}")
+    if filing_status not in TAX_YEARS[year]:
+        raise ValueError(f"Unknown filing status: {filing_status}")
+    return TAX_YEARS[year][filing_status]
+
+
+def federal_tax(
+    ordinary,
+    capital_gains=0.0,
+    filing_status: str = "single",
+    year: int | None = None,
+    scale: float = 1.0,
+    seniors: int = 0,
+):
+    """
+    Federal income tax for arrays of ordinary income and long-term gains.
+
+    Gains are stacked on top of ordinary income for the LTCG bands; net
+    losses offset up to CAPITAL_LOSS_LIMIT of ordinary income.
+
+    Args:
+        ordinary (array-like): Ordinary income (wages, IRA withdrawals, short-term gains).
+        capital_gains (array-like): Net long-term gains realised.
+        filing_status (str): One of FILING_STATUSES.
+        year (int | None): Tax year, defaults to the latest available.
+        scale (float): Inflation factor applied to every threshold.
+        seniors (int): Filers aged 65+ (each adds the senior deduction).
+
+    Returns:
+        np.ndarray: Tax owed, same shape as the broadcast inputs.
+    """
+    table = tax_table(filing_status, year)
+    taxable_ordinary, taxable = _taxable(table, ordinary, capital_gains, scale, seniors)
+    tax = _banded(0.0, taxable_ordinary, table["brackets"], scale)
+    return tax + _banded(taxable_ordinary, taxable, table["ltcg"], scale)
+
+
+def tax_breakdown(
+    ordinary,
+    capital_gains=0.0,
+    filing_status: str = "single",
+    year: int | None = None,
+    seniors: int = 0,
+) -> dict:
+    """
+    Total, marginal and effective tax for arrays of incomes in one pass.
+
+    The marginal rate is the tax on the next dollar of ordinary income,
+    including any long-term gains it pushes into a higher LTCG band.
+
+    Args:
+        ordinary (array-like): Ordinary income.
+        capital_gains (array-like): Net long-term gains realised.
+        filing_status (str): One of FILING_STATUSES.
+        year (int | None): Tax year, defaults to the latest available.
+        seniors (int): Filers aged 65+.
+
+    Returns:
+        dict: Arrays keyed taxable_income, ordinary_tax, capital_gains_tax,
+        total_tax, marginal_rate, effective_rate and bracket_headroom (ordinary
+        income that can be added before the next bracket starts).
+    """
+    table = tax_table(filing_status, year)
+    ordinary = np.asarray(ordinary, dtype=float)
+    gains = np.asarray(capital_gains, dtype=float)
+
+    # Evaluate at income and income + $1 together for the marginal rate
+    both = np.stack(np.broadcast_arrays(ordinary, gains))
+    stacked_ordinary = np.stack([both[0], both[0] + 1.0])
+    taxable_ordinary, taxable = _taxable(table, stacked_ordinary, both[1], 1.0, seniors)
+    ordinary_tax = _banded(0.0, taxable_ordinary, table["brackets"], 1.0)
+    gains_tax = _banded(taxable_ordinary, taxable, table["ltcg"], 1.0)
+    total = ordinary_tax + gains_tax
+
+    floors = np.array([f for f, _ in table["brackets"]], dtype=float)
+    ceilings = np.append(floors[1:], np.inf)
+    current = taxable_ordinary[0]
+    headroom = ceilings[np.searchsorted(floors, current, side="right") - 1] - current
+    # Income still covered by the deduction is also room before the next bracket
+    deduction = table["standard_deduction"] + seniors * table["senior_deduction"]
+    net_income = both[0] + np.clip(both[1], -CAPITAL_LOSS_LIMIT, None)
+    headroom = headroom + np.maximum(deduction - net_income, 0.0)
+
+    income = both[0] + np.maximum(both[1], 0.0)
+    return {
+        "taxable_income": taxable[0],
+        "ordinary_tax": ordinary_tax[0],
+        "capital_gains_tax": gains_tax[0],
+        "total_tax": total[0],
+        "marginal_rate": total[1] - total[0],
+        "effective_rate": np.divide(total[0], income, out=np.zeros_like(income), where=income > 0),
+        "bracket_headroom": headroom,
+    }
+
+
+def irmaa(magi, filing_status: str = "single", year: int | None = None, scale: float = 1.0) -> dict:
+    """
+    Medicare IRMAA tier and surcharge for arrays of MAGI.
+
+    Args:
+        magi (array-like): Modified AGI from the return two years before the premium year.
+        filing_status (str): One of FILING_STATUSES.
+        year (int | None): Premium year, defaults to the latest available.
+        scale (float): Inflation factor applied to the thresholds.
+
+    Returns:
+        dict: Arrays keyed tier (0 = no surcharge), part_b_monthly,
+        part_d_monthly, annual_surcharge (per enrolled person, above the
+        standard Part B premium) and headroom (MAGI that can be added before
+        the next tier, inf at the top).
+    """
+    year = LATEST_TAX_YEAR if year is None else year
+    if year not in IRMAA_TIERS:
+        raise ValueError(f"No IRMAA tiers for {year}; available: {sorted(IRMAA_TIERS)}")
+    if filing_status not in IRMAA_TIERS[year]:
+        raise ValueError(f"Unknown filing status: {filing_status}")
+
+    tiers = IRMAA_TIERS[year][filing_status]
+    floors = np.array([f for f, _, _ in tiers], dtype=float) * scale
+    part_b = np.array([b for _, b, _ in tiers])
+    part_d = np.array([d for _, _, d in tiers])
+    magi = np.asarray(magi, dtype=float)
+
+    # A tier applies once MAGI is strictly above its floor
+    tier = np.maximum(np.searchsorted(floors, magi, side="left") - 1, 0)
+    ceilings = np.append(floors[1:], np.inf)
+    return {
+        "tier": tier,
+        "part_b_monthly": part_b[tier],
+        "part_d_monthly": part_d[tier],
+        "annual_surcharge": (part_b[tier] - part_b[0] + part_d[tier]) * 12,
+        "headroom": ceilings[tier] - magi,
+    }
+
+
+def _taxable(table: dict, ordinary, capital_gains, scale: float, seniors: int):
+    """Splits taxable income into its ordinary part and the total, after deductions and loss offsets."""
+    ordinary = np.asarray(ordinary, dtype=float)
+    gains = np.asarray(capital_gains, dtype=float)
+    ordinary = ordinary + np.clip(gains, -CAPITAL_LOSS_LIMIT, 0.0)
+    gains = np.maximum(gains, 0.0)
+
+    deduction = (table["standard_deduction"] + seniors * table["senior_deduction"]) * scale
+    taxable = np.maximum(ordinary + gains - deduction, 0.0)
+    taxable_gains = np.minimum(gains, taxable)
+    return taxable - taxable_gains, taxable
+
+
+def _banded(start, end, bands, scale: float):
+    """Tax on the slice of income between start and end, given (floor, rate) bands."""
+    floors = np.array([f for f, _ in bands], dtype=float) * scale
+    rates = np.array([r for _, r in bands])
+    ceilings = np.append(floors[1:], np.inf)
+    start = np.asarray(start, dtype=float)[..., None]
+    end = np.asarray(end, dtype=float)[..., None]
+    overlap = np.clip(np.minimum(end, ceilings) - np.maximum(start, floors), 0.0, None)
+    return (overlap * rates).sum(axis=-1)
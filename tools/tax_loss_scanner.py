@@ -0,0 +1,154 @@
+import numpy as np
+from datetime import date
+
+LONG_TERM_DAYS = 365
+WASH_SALE_WINDOW_DAYS = 30
+
+# Offset keeps (pair, day) composite keys positive for pre-1970 purchase dates
+_DAY_OFFSET = 1 << 20
+_PAIR_STRIDE = 1 << 32
+
+
+def acquired_from_holding_months(holding_months, as_of: date | None = None) -> np.ndarray:
+    """
+    Approximates acquisition dates from holding periods in months.
+
+    Args:
+        holding_months (array-like): Months each lot has been held.
+        as_of (date | None): Reference date, defaults to today.
+
+    Returns:
+        np.ndarray: Acquisition dates as datetime64[D].
+    """
+    as_of = np.datetime64(as_of or date.today(), "D")
+    months = np.nan_to_num(np.asarray(holding_months, dtype=float))
+    return as_of - np.round(months * 30.44).astype("timedelta64[D]")
+
+
+class TaxLossScanner:
+    """
+    Finds tax-loss harvesting candidates across many users in one pass.
+
+    Lots are passed as parallel arrays (one element per lot) so that gains,
+    holding periods and wash-sale checks are computed without Python loops.
+    """
+
+    def __init__(self, min_loss: float = 0.0, wash_sale_window_days: int = WASH_SALE_WINDOW_DAYS):
+        """
+        Args:
+            min_loss (float): Smallest harvestable loss worth reporting.
+            wash_sale_window_days (int): Days either side of a sale that a
+                purchase of the same ticker triggers the wash-sale rule.
+        """
+        self.min_loss = min_loss
+        self.wash_sale_window_days = wash_sale_window_days
+
+    def scan(
+        self,
+        user_ids,
+        tickers,
+        quantities,
+        buy_prices,
+        acquired_on,
+        prices: dict,
+        as_of: date | None = None,
+        purchases: tuple | None = None,
+    ) -> dict[int, list[dict]]:
+        """
+        Scans lots for unrealised losses and ranks them per user.
+
+        Args:
+            user_ids (array-like): Owner of each lot.
+            tickers (array-like): Ticker of each lot.
+            quantities (array-like): Shares in each lot.
+            buy_prices (array-like): Cost per share of each lot.
+            acquired_on (array-like): Acquisition date of each lot.
+            prices (dict): Current price per ticker. Missing tickers are skipped.
+            as_of (date | None): Assumed sale date, defaults to today.
+            purchases (tuple | None): Extra (user_ids, tickers, dates) buy events,
+                e.g. recent or planned purchases, checked for wash-sale conflicts.
+
+        Returns:
+            dict[int, list[dict]]: Ranked harvesting opportunities keyed by user.
+        """
+        user_ids = np.asarray(user_ids, dtype=np.int64)
+        tickers = np.asarray([str(t).upper() for t in tickers], dtype=object)
+        if user_ids.size == 0:
+            return {}
+
+        quantities = np.asarray(quantities, dtype=float)
+        buy_prices = np.asarray(buy_prices, dtype=float)
+        acquired = np.asarray(acquired_on, dtype="datetime64[D]")
+        sale_day = np.datetime64(as_of or date.today(), "D")
+
+        # Price lookup happens once per distinct ticker, not once per lot
+        unique_tickers, ticker_idx = np.unique(tickers.astype(str), return_inverse=True)
+        unique_prices = np.array(
+            [prices.get(t) if prices.get(t) is not None else np.nan for t in unique_tickers],
+            dtype=float,
+        )
+        current = unique_prices[ticker_idx]
+
+        cost_basis = quantities * buy_prices
+        unrealized = quantities * current - cost_basis
+        days_held = (sale_day - acquired).astype(np.int64)
+        long_term = days_held > LONG_TERM_DAYS
+        harvestable = np.where(unrealized < 0, -unrealized, 0.0)
+
+        conflicts = self._wash_sale_conflicts(user_ids, ticker_idx, acquired, sale_day, unique_tickers, purchases)
+
+        valid = ~np.isnan(current) & ~np.isnan(buy_prices) & (quantities > 0)
+        candidate = valid & (harvestable > self.min_loss)
+        idx = np.flatnonzero(candidate)
+        if idx.size == 0:
+            return {}
+
+        # Rank per user: clean losses before wash-sale conflicts, largest loss first
+        order = idx[np.lexsort((-harvestable[idx], conflicts[idx], user_ids[idx]))]
+        results: dict[int, list[dict]] = {}
+        for i in order:
+            results.setdefault(int(user_ids[i]), []).append({
+                "ticker": str(tickers[i]),
+                "quantity": float(quantities[i]),
+                "buy_price": round(float(buy_prices[i]), 2),
+                "current_price": round(float(current[i]), 2),
+                "unrealized_gain": round(float(unrealized[i]), 2),
+                "holding_period": "long" if long_term[i] else "short",
+                "harvestable_loss": round(float(harvestable[i]), 2),
+                "wash_sale_conflict": bool(conflicts[i]),
+            })
+        return results
+
+    def _wash_sale_conflicts(self, user_ids, ticker_idx, acquired, sale_day, unique_tickers, purchases):
+        """Flags lots whose user bought the same ticker inside the wash-sale window."""
+        event_users = user_ids
+        event_tickers = ticker_idx
+        event_days = acquired
+        if purchases is not None:
+            p_users, p_tickers, p_days = purchases
+            p_tickers = np.asarray([str(t).upper() for t in p_tickers], dtype=str)
+            # Purchases of tickers nobody holds cannot conflict with any lot
+            known = np.isin(p_tickers, unique_tickers)
+            event_users = np.concatenate([event_users, np.asarray(p_users, dtype=np.int64)[known]])
+            event_tickers = np.concatenate([event_tickers, np.searchsorted(unique_tickers, p_tickers[known])])
+            event_days = np.concatenate([event_days, np.asarray(p_days, dtype="datetime64[D]")[known]])
+
+        # Dense-rank (user, ticker) pairs so keys stay far below 2**63 whatever the raw user IDs.
+        # Events start with the lots themselves, so the first len(user_ids) ranks are the lots'.
+        _, user_rank = np.unique(event_users, return_inverse=True)
+        pairs = user_rank.astype(np.int64) * max(len(unique_tickers), 1) + event_tickers
+        _, event_pairs = np.unique(pairs, return_inverse=True)
+        event_pairs = event_pairs.astype(np.int64)
+        lot_pairs = event_pairs[:len(user_ids)]
+        event_keys = np.sort(event_pairs * _PAIR_STRIDE + event_days.astype(np.int64) + _DAY_OFFSET)
+
+        sale = sale_day.astype(np.int64) + _DAY_OFFSET
+        window = self.wash_sale_window_days
+        lo = np.searchsorted(event_keys, lot_pairs * _PAIR_STRIDE + sale - window, side="left")
+        hi = np.searchsorted(event_keys, lot_pairs * _PAIR_STRIDE + sale + window, side="right")
+        in_window = hi - lo
+
+        # A lot's own purchase is not a replacement buy for itself
+        own_day = acquired.astype(np.int64) + _DAY_OFFSET
+        in_window -= (np.abs(own_day - sale) <= window).astype(np.int64)
+        return in_window > 0
@@ -0,0 +1,249 @@
+import functools
+import json
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Iterator
+import requests
+from config.settings import settings
+from tools.profiler import run_tagged
+
+# Set by the request middleware; copied into worker threads with the context
+request_id_var: ContextVar[str | None] = ContextVar("request_id", default=None)
+_current_span: ContextVar["Span | None"] = ContextVar("current_span", default=None)
+
+
+class Span:
+    """One timed operation. Attributes are written from any thread the context reaches."""
+
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "start_ns", "end_ns", "attributes", "status", "_lock")
+
+    def __init__(self, name: str, trace_id: str, parent_id: str | None, attributes: dict):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.start_ns = time.time_ns()
+        self.end_ns = 0
+        self.attributes = attributes
+        self.status = "ok"
+        self._lock = threading.Lock()
+
+    @property
+    def duration_ms(self) -> float:
+        return (self.end_ns - self.start_ns) / 1e6
+
+    def set(self, key: str, value):
+        with self._lock:
+            self.attributes[key] = value
+
+    def increment(self, key: str, amount: int = 1):
+        with self._lock:
+            self.attributes[key] = self.attributes.get(key, 0) + amount
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_ns": self.start_ns,
+            "end_ns": self.end_ns,
+            "duration_ms": round(self.duration_ms, 3),
+            "status": self.status,
+            "attributes": dict(self.attributes),
+        }
+
+
+class JsonlFileExporter:
+    """Appends finished spans to a JSON-lines file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    def export(self, spans: list[Span]):
+        lines = "".join(json.dumps(s.to_dict(), default=str) + "\n" for s in spans)
+        with self._lock, open(self.path, "a") as f:
+            f.write(lines)
+
+
+def _otlp_value(value) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class OTLPHttpExporter:
+    """Posts spans to an OTLP/HTTP collector using the JSON encoding."""
+
+    def __init__(self, endpoint: str, service_name: str = "ira-rmd-api", timeout: float = 5.0):
+        self.url = endpoint.rstrip("/") + "/v1/traces"
+        self.service_name = service_name
+        self.timeout = timeout
+
+    def payload(self, spans: list[Span]) -> dict:
+        return {"resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": _otlp_value(self.service_name)}]},
+            "scopeSpans": [{
+                "scope": {"name": "tools.tracing"},
+                "spans": [
+                    {
+                        "traceId": s.trace_id,
+                        "spanId": s.span_id,
+                        **({"parentSpanId": s.parent_id} if s.parent_id else {}),
+                        "name": s.name,
+                        "kind": 1,
+                        "startTimeUnixNano": str(s.start_ns),
+                        "endTimeUnixNano": str(s.end_ns),
+                        "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in s.attributes.items()],
+                        "status": {"code": 2 if s.status == "error" else 1},
+                    }
+                    for s in spans
+                ],
+            }],
+        }]}
+
+    def export(self, spans: list[Span]):
+        requests.post(self.url, json=self.payload(spans), timeout=self.timeout).raise_for_status()
+
+
+class Tracer:
+    """
+    Records nested spans and exports each trace when its root span ends.
+    Spans that outlive their root (e.g. a background task started by the
+    request) are exported one by one as they finish.
+
+    The active span lives in a context variable, so spans opened in LangGraph
+    nodes, prefetch workers or threadpool endpoints attach to the right
+    parent. Export happens on a background thread. With no exporter, span()
+    yields None and records nothing.
+    """
+
+    def __init__(self, exporter=None):
+        self.exporter = exporter
+        self._pending: dict[str, list[Span]] = {}
+        self._lock = threading.Lock()
+        self._export_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="span-export")
+
+    @contextmanager
+    def span(self, name: str, **attributes) -> Iterator[Span | None]:
+        if self.exporter is None:
+            yield None
+            return
+
+        parent = _current_span.get()
+        request_id = request_id_var.get()
+        if request_id:
+            attributes.setdefault("request_id", request_id)
+        trace_id = parent.trace_id if parent else uuid.uuid4().hex
+        span = Span(name, trace_id, parent.span_id if parent else None, attributes)
+        with self._lock:
+            # A child started after its root ended is exported on its own instead
+            if parent is None or trace_id in self._pending:
+                self._pending.setdefault(trace_id, []).append(span)
+
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.status = "error"
+            span.set("error", f"{type(e).__name__}: {e}")
+            raise
+        finally:
+            _current_span.reset(token)
+            with self._lock:
+                span.end_ns = time.time_ns()
+                if parent is None:
+                    # Spans still open go out individually when they end
+                    spans = [s for s in self._pending.pop(trace_id, []) if s.end_ns]
+                elif trace_id in self._pending:
+                    spans = None  # exported with its root
+                else:
+                    spans = [span]
+            if spans:
+                self._export_pool.submit(self._export, spans)
+
+    def flush(self):
+        """Waits until every finished trace has been handed to the exporter."""
+        self._export_pool.submit(lambda: None).result()
+
+    def _export(self, spans: list[Span]):
+        try:
+            self.exporter.export(spans)
+        except Exception as e:
+            print(f"Error exporting {len(spans)} spans: {e}")
+
+    def wrap(self, name: str, func: Callable) -> Callable:
+        """
+        Returns func running inside a span called name. The thread it runs on
+        is also sampled if the request is being profiled (graph nodes run on
+        LangGraph's own pool threads).
+        """
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with self.span(name):
+                return run_tagged(func, *args, **kwargs)
+        return wrapper
+
+
+def _build_exporter():
+    kind = settings.TRACING_EXPORTER
+    if kind == "file":
+        return JsonlFileExporter(settings.TRACE_FILE)
+    if kind == "otlp":
+        return OTLPHttpExporter(settings.OTLP_ENDPOINT)
+    return None
+
+
+tracer = Tracer(_build_exporter())
+
+
+def traced(name: str | None = None) -> Callable:
+    """Decorator that runs a function inside a span (named after it by default)."""
+    def decorator(func: Callable) -> Callable:
+        return tracer.wrap(name or func.__qualname__, func)
+    return decorator
+
+
+def current_span() -> Span | None:
+    return _current_span.get()
+
+
+def count(key: str, amount: int = 1):
+    """Adds to a counter on the active span, e.g. cache hits. No-op outside a span."""
+    span = _current_span.get()
+    if span is not None:
+        span.increment(key, amount)
+
+
+def record_llm_usage(response, model: str | None = None):
+    """
+    Adds token counts from an LLM response to the active span.
+    Understands LangChain messages (usage_metadata) and OpenAI responses (usage).
+    """
+    span = _current_span.get()
+    if span is None:
+        return
+    usage = getattr(response, "usage_metadata", None)
+    if usage:
+        prompt, completion = usage.get("input_tokens", 0), usage.get("output_tokens", 0)
+    else:
+        usage = getattr(response, "usage", None)
+        if usage is None:
+            return
+        prompt, completion = getattr(usage, "prompt_tokens", 0) or 0, getattr(usage, "completion_tokens", 0) or 0
+    span.increment("llm.calls")
+    span.increment("llm.prompt_tokens", prompt)
+    span.increment("llm.completion_tokens", completion)
+    if model:
+        span.set("llm.model", model)
@@ -0,0 +1,193 @@
+import os
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+from db.portfolio_versions import PORTFOLIO_COLUMNS, create_portfolio_version, prune_portfolio_versions_quietly
+from db.upload_jobs import finish_upload_job, heartbeat_upload_jobs, recover_upload_jobs, update_upload_job
+from db.valuations import rebuild_valuation
+from tools.portfolio_warmer import portfolio_warmer
+from config.settings import settings
+
+REQUIRED_COLUMNS = {"stock_name", "ticker", "quantity"}
+
+
+def parse_row(row) -> tuple:
+    """
+    Validates one spreadsheet row and converts it to PORTFOLIO_COLUMNS order.
+
+    Raises:
+        ValueError: With a reason the status endpoint can show the user.
+    """
+    ticker = "" if pd.isna(row.ticker) else str(row.ticker).strip().upper()
+    if not ticker:
+        raise ValueError("missing ticker")
+    if pd.isna(row.quantity):
+        raise ValueError("missing quantity")
+    try:
+        quantity = float(row.quantity)
+        buy_price = None if pd.isna(row.buy_price) else float(row.buy_price)
+        months = None if pd.isna(row.holding_period_months) else int(row.holding_period_months)
+    except (TypeError, ValueError):
+        raise ValueError("non-numeric quantity, buy_price or holding_period_months")
+    if quantity != int(quantity):
+        raise ValueError("fractional quantity")
+    return (
+        "" if pd.isna(row.stock_name) else str(row.stock_name),
+        ticker,
+        int(quantity),
+        buy_price,
+        months,
+    )
+
+
+class UploadWorker:
+    """
+    Processes staged portfolio uploads off the request path.
+
+    Each job parses the staged Excel file, rejecting invalid rows instead of
+    failing the whole upload, and reports progress every
+    UPLOAD_PROGRESS_ROWS rows. Accepted rows are bulk-loaded as one new
+    portfolio version. On success the valuation is rebuilt, old versions are
+    pruned and a recommendation refresh is queued for the user. The staged
+    file is deleted when the job ends either way.
+
+    The queue lives in this process, so each job records its owner and the
+    owner refreshes a heartbeat on all of its unfinished jobs every
+    UPLOAD_HEARTBEAT_SECONDS. The same background thread claims jobs whose
+    heartbeat is older than UPLOAD_STALE_SECONDS, i.e. whose process has
+    died, so several API processes and rolling deploys never take each
+    other's jobs.
+    """
+
+    def __init__(self, max_workers: int | None = None):
+        """
+        Args:
+            max_workers (int | None): Uploads processed concurrently, defaults to UPLOAD_WORKERS.
+        """
+        self.pool = ThreadPoolExecutor(
+            max_workers=max_workers or settings.UPLOAD_WORKERS, thread_name_prefix="upload"
+        )
+        self._token = uuid.uuid4().hex[:8]
+        self._maintainer_pid = None
+        self._maintainer_lock = threading.Lock()
+
+    @property
+    def owner(self) -> str:
+        """This process's owner ID; includes the PID so forked workers differ."""
+        return f"{socket.gethostname()}:{os.getpid()}:{self._token}"
+
+    def start(self):
+        """Starts the heartbeat and recovery thread, once per process."""
+        with self._maintainer_lock:
+            # Threads do not survive a fork, so a forked worker starts its own
+            if self._maintainer_pid != os.getpid():
+                threading.Thread(target=self._maintain, name="upload-heartbeat", daemon=True).start()
+                self._maintainer_pid = os.getpid()
+
+    def submit(self, job_id: int, user_id: int, path: str):
+        """Queues a staged file for processing."""
+        self.start()
+        self.pool.submit(self._run, job_id, user_id, path)
+
+    def _maintain(self):
+        while True:
+            try:
+                heartbeat_upload_jobs(self.owner)
+                resubmitted = self.recover()
+                if resubmitted:
+                    print(f"Resubmitted {resubmitted} upload jobs from stopped processes.")
+            except Exception as e:
+                print(f"Error maintaining upload jobs: {e}")
+            time.sleep(settings.UPLOAD_HEARTBEAT_SECONDS)
+
+    def recover(self) -> int:
+        """
+        Claims the jobs of processes that stopped sending heartbeats.
+
+        Queued jobs whose staged file is still there are resubmitted here.
+        Jobs that were interrupted mid-processing, or whose file is gone, are
+        failed so the user can upload again, and their files are removed.
+
+        Returns:
+            int: Number of jobs resubmitted.
+        """
+        resubmitted = 0
+        jobs = recover_upload_jobs(
+            self.owner, settings.UPLOAD_STALE_SECONDS, "Interrupted by a server restart; please upload again."
+        )
+        for job_id, user_id, path, status in jobs:
+            if status == "queued" and os.path.exists(path):
+                self.pool.submit(self._run, job_id, user_id, path)
+                resubmitted += 1
+                continue
+            if status == "queued":
+                finish_upload_job(job_id, error="Staged file is missing; please upload again.")
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        return resubmitted
+
+    def _run(self, job_id: int, user_id: int, path: str):
+        try:
+            version = self.process(job_id, user_id, path)
+            finish_upload_job(job_id, version=version)
+        except Exception as e:
+            print(f"Upload job {job_id} for user {user_id} failed: {e}")
+            try:
+                finish_upload_job(job_id, error=str(e) or type(e).__name__)
+            except Exception as db_error:
+                print(f"Error recording failure of upload job {job_id}: {db_error}")
+            return
+        finally:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+        # Refresh prices and recommendations for the new holdings in the background
+        portfolio_warmer.schedule(user_id, cancel_when_idle=False)
+
+    def process(self, job_id: int, user_id: int, path: str) -> int:
+        """
+        Parses and loads one staged file.
+
+        Returns:
+            int: The portfolio version created.
+
+        Raises:
+            ValueError: If required columns are missing or no row is valid.
+        """
+        update_upload_job(job_id, "parsing", 0, [])
+        df = pd.read_excel(path)
+        missing = REQUIRED_COLUMNS - set(df.columns)
+        if missing:
+            raise ValueError(f"Missing required columns: {sorted(missing)}")
+
+        # Keep only necessary columns, filling optional cost-basis columns with blanks
+        df = df.reindex(columns=list(PORTFOLIO_COLUMNS))
+        rows, rejections = [], []
+        every = max(settings.UPLOAD_PROGRESS_ROWS, 1)
+        for i, record in enumerate(df.itertuples(index=False), start=1):
+            try:
+                rows.append(parse_row(record))
+            except ValueError as e:
+                # Spreadsheet row numbers: the header is row 1
+                rejections.append({"row": i + 1, "reason": str(e)})
+            if i % every == 0:
+                update_upload_job(job_id, "parsing", i, rejections)
+
+        update_upload_job(job_id, "loading", len(df), rejections)
+        if not rows:
+            raise ValueError("No valid rows in upload")
+
+        version = create_portfolio_version(user_id, rows)
+        rebuild_valuation(user_id)
+        prune_portfolio_versions_quietly(user_id)
+        return version["version"]
+
+
+upload_worker = UploadWorker()
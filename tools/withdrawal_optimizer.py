@@ -0,0 +1,362 @@
+import hashlib
+import pickle
+import time
+from typing import NamedTuple
+import numpy as np
+from tools.cache import TTLCache
+from tools.tax_calculator import LATEST_TAX_YEAR, federal_tax, irmaa, tax_table
+
+# IRS Uniform Lifetime Table (2022+), distribution period by age
+UNIFORM_LIFETIME_DIVISORS = {
+    72: 27.4, 73: 26.5, 74: 25.5, 75: 24.6, 76: 23.7, 77: 22.9, 78: 22.0, 79: 21.1,
+    80: 20.2, 81: 19.4, 82: 18.5, 83: 17.7, 84: 16.8, 85: 16.0, 86: 15.2, 87: 14.4,
+    88: 13.7, 89: 12.9, 90: 12.2, 91: 11.5, 92: 10.8, 93: 10.1, 94: 9.5, 95: 8.9,
+    96: 8.4, 97: 7.8, 98: 7.3, 99: 6.8, 100: 6.4, 101: 6.0, 102: 5.6, 103: 5.2,
+    104: 4.9, 105: 4.6, 106: 4.3, 107: 4.1, 108: 3.9, 109: 3.7, 110: 3.5, 111: 3.4,
+    112: 3.3, 113: 3.1, 114: 3.0, 115: 2.9, 116: 2.8, 117: 2.7, 118: 2.5, 119: 2.3,
+    120: 2.0,
+}
+
+# (IRA points, taxable points) per refinement level, coarse to fine
+GRID_LEVELS = ((16, 8), (32, 16), (64, 32))
+
+# Value functions per stage, shared across solves so what-if edits re-use untouched years
+stage_cache = TTLCache(ttl_seconds=3600, max_entries=1024)
+
+
+class Lot(NamedTuple):
+    """A taxable holding: current market value and cost basis."""
+    ticker: str
+    value: float
+    basis: float
+
+
+class WithdrawalScenario(NamedTuple):
+    """
+    Inputs for a withdrawal plan. Amounts are in today's dollars; spending,
+    other income and tax thresholds grow with inflation.
+    """
+    age: int
+    ira_balance: float
+    roth_balance: float = 0.0
+    lots: tuple[Lot, ...] = ()
+    annual_spending: float = 0.0
+    other_income: float = 0.0
+    filing_status: str = "single"
+    growth_rate: float = 0.05
+    inflation: float = 0.025
+    discount_rate: float = 0.05
+    heir_tax_rate: float = 0.24
+    horizon_years: int = 30
+    rmd_start_age: int = 73
+    extra_spending: tuple[tuple[int, float], ...] = ()
+    tax_year: int = LATEST_TAX_YEAR
+
+
+def rmd_divisor(age: int, start_age: int) -> float:
+    """Distribution period for the year, or inf before RMDs begin."""
+    if age < start_age:
+        return np.inf
+    return UNIFORM_LIFETIME_DIVISORS.get(min(age, 120), 2.0)
+
+
+class _GainCurve:
+    """
+    Realised gain for a sale from the taxable account.
+
+    Lots are sold highest-basis-first, so each dollar sold realises the least
+    gain available. The account is described by the share of the original
+    lots already sold, and every lot grows at the same rate.
+    """
+
+    def __init__(self, lots: tuple[Lot, ...]):
+        lots = sorted((l for l in lots if l.value > 0), key=lambda l: l.basis / l.value, reverse=True)
+        values = np.array([l.value for l in lots], dtype=float)
+        bases = np.array([l.basis for l in lots], dtype=float)
+        self.tickers = [l.ticker for l in lots]
+        self.total = float(values.sum())
+        total = self.total or 1.0
+        self.share_edges = np.concatenate(([0.0], np.cumsum(values) / total))
+        self.basis_edges = np.concatenate(([0.0], np.cumsum(bases)))
+
+    def gains(self, balance, sale, scale: float):
+        """Gain on selling `sale` when `balance` remains and lots have grown by `scale`."""
+        if self.total <= 0:
+            return np.zeros_like(np.asarray(sale, dtype=float))
+        grown = self.total * scale
+        before = np.clip(1.0 - np.asarray(balance) / grown, 0.0, 1.0)
+        after = np.clip(1.0 - (np.asarray(balance) - sale) / grown, 0.0, 1.0)
+        basis = np.interp(after, self.share_edges, self.basis_edges) - np.interp(before, self.share_edges, self.basis_edges)
+        return sale - basis
+
+    def lots_sold(self, balance: float, sale: float, scale: float) -> list[dict]:
+        """Splits a sale across the lots it consumes."""
+        if sale <= 0 or self.total <= 0:
+            return []
+        grown = self.total * scale
+        before = min(max(1.0 - balance / grown, 0.0), 1.0)
+        after = min(max(1.0 - (balance - sale) / grown, 0.0), 1.0)
+        sold = []
+        for ticker, lo, hi in zip(self.tickers, self.share_edges[:-1], self.share_edges[1:]):
+            overlap = min(hi, after) - max(lo, before)
+            if overlap > 1e-12:
+                sold.append({"ticker": ticker, "amount": round(float(overlap * grown), 2)})
+        return sold
+
+
+def _interp2(x_grid, y_grid, values, x, y):
+    """Bilinear interpolation of values[x, y] on a rectilinear grid (clamped at the edges)."""
+    x = np.clip(x, x_grid[0], x_grid[-1])
+    y = np.clip(y, y_grid[0], y_grid[-1])
+    i = np.clip(np.searchsorted(x_grid, x, side="right") - 1, 0, len(x_grid) - 2)
+    j = np.clip(np.searchsorted(y_grid, y, side="right") - 1, 0, len(y_grid) - 2)
+    tx = (x - x_grid[i]) / np.maximum(x_grid[i + 1] - x_grid[i], 1e-12)
+    ty = (y - y_grid[j]) / np.maximum(y_grid[j + 1] - y_grid[j], 1e-12)
+    return (
+        values[i, j] * (1 - tx) * (1 - ty)
+        + values[i + 1, j] * tx * (1 - ty)
+        + values[i, j + 1] * (1 - tx) * ty
+        + values[i + 1, j + 1] * tx * ty
+    )
+
+
+def _bucket(amount: float) -> float:
+    """Rounds a balance up to a coarse scale so small edits keep the same grid."""
+    if amount <= 0:
+        return 1.0
+    return float(1.25 ** np.ceil(np.log(amount) / np.log(1.25)))
+
+
+class WithdrawalOptimizer:
+    """
+    Plans which accounts and lots to draw from each year at the lowest lifetime tax.
+
+    Each year the retiree must spend a fixed (inflating) amount and take the
+    traditional IRA's RMD. The decision is how much to take from the IRA,
+    chosen among the RMD, the amounts that fill each ordinary bracket and
+    draining the account. IRA money beyond spending and tax is converted to
+    Roth. Any shortfall is sold from taxable lots, highest basis first, then
+    withdrawn from the IRA, and only then taken from Roth. The objective is
+    the present value of federal tax and Medicare IRMAA surcharges plus the
+    tax heirs would pay on the IRA left at the horizon.
+
+    The problem is solved by backward dynamic programming over an
+    (IRA balance, taxable balance) grid, refined while the time budget
+    allows. Each year's value function is cached under a key covering that
+    year and all later years. An edit that only touches early years, such as
+    a one-off expense, therefore re-solves only those years.
+    """
+
+    def __init__(self, cache: TTLCache | None = None):
+        self.cache = stage_cache if cache is None else cache
+
+    def solve(self, scenario: WithdrawalScenario, time_budget_seconds: float = 2.0) -> dict:
+        """
+        Builds a year-by-year plan.
+
+        Args:
+            scenario (WithdrawalScenario): Balances, lots, spending and assumptions.
+            time_budget_seconds (float): Wall-clock budget. The coarsest grid is
+                always solved; finer grids only when they are expected to fit.
+
+        Returns:
+            dict: The plan, lifetime tax totals and solver statistics.
+        """
+        tax_table(scenario.filing_status, scenario.tax_year)  # Rejects unknown statuses and years
+
+        started = time.perf_counter()
+        curve = _GainCurve(scenario.lots)
+        years = self._year_params(scenario)
+        stats = {"stages_solved": 0, "stages_reused": 0}
+        result = None
+        last_duration = None
+
+        for level, (n_ira, n_taxable) in enumerate(GRID_LEVELS):
+            elapsed = time.perf_counter() - started
+            if result is not None and elapsed + last_duration * 4 > time_budget_seconds:
+                break
+            level_started = time.perf_counter()
+            grids = self._grids(scenario, curve, n_ira, n_taxable)
+            values = self._backward(scenario, curve, years, grids, stats)
+            result = self._forward(scenario, curve, years, grids, values)
+            result["grid"] = {"ira_points": n_ira, "taxable_points": n_taxable}
+            last_duration = time.perf_counter() - level_started
+
+        result["solver"] = {**stats, "seconds": round(time.perf_counter() - started, 3)}
+        return result
+
+    # --- Model ---
+    def _year_params(self, scenario: WithdrawalScenario) -> list[tuple]:
+        """Per-year (age, spending, other income, threshold scale, RMD divisor, seniors, Medicare enrollees)."""
+        extra = {}
+        for year, amount in scenario.extra_spending:
+            extra[year] = extra.get(year, 0.0) + amount
+
+        filers = tax_table(scenario.filing_status, scenario.tax_year)["filers"]
+        params = []
+        for t in range(scenario.horizon_years):
+            age = scenario.age + t
+            scale = (1 + scenario.inflation) ** t
+            params.append((
+                age,
+                scenario.annual_spending * scale + extra.get(t, 0.0),
+                scenario.other_income * scale,
+                scale,
+                rmd_divisor(age, scenario.rmd_start_age),
+                filers if age >= 65 else 0,
+                filers if age + 2 >= 65 else 0,  # IRMAA looks back two years
+            ))
+        return params
+
+    def _grids(self, scenario, curve: _GainCurve, n_ira: int, n_taxable: int) -> list[tuple]:
+        """Per-year grids, denser near zero, spanning the largest reachable balance."""
+        ira_top = _bucket(scenario.ira_balance)
+        taxable_top = _bucket(curve.total)
+        shape_i = np.linspace(0, 1, n_ira) ** 2
+        shape_v = np.linspace(0, 1, n_taxable) ** 2
+        grids = []
+        for t in range(scenario.horizon_years + 1):
+            growth = (1 + scenario.growth_rate) ** t
+            grids.append((shape_i * ira_top * growth, shape_v * taxable_top * growth))
+        return grids
+
+    def _stage_costs(self, scenario, curve, year: tuple, t: int, ira, taxable):
+        """
+        Evaluates every candidate IRA withdrawal for the given states.
+
+        Returns:
+            dict: Arrays with a trailing action axis (withdrawal, sale, tax, ...).
+        """
+        age, spending, other, scale, divisor, seniors, enrollees = year
+        table = tax_table(scenario.filing_status, scenario.tax_year)
+        ira = np.asarray(ira, dtype=float)[..., None]
+        taxable = np.asarray(taxable, dtype=float)[..., None]
+
+        rmd = ira / divisor
+        deduction = (table["standard_deduction"] + seniors * table["senior_deduction"]) * scale
+        fills = np.array([f for f, _ in table["brackets"][1:]], dtype=float) * scale + deduction - other
+        candidates = np.concatenate(
+            [np.zeros(1), fills, [spending + deduction - other], [np.inf]]
+        )
+        withdrawal = np.clip(np.maximum(candidates, rmd), 0.0, ira)
+
+        # Spending and tax are funded from the planned withdrawal, then taxable lots,
+        # then more IRA money; tax depends on the mix, so settle them together
+        planned = withdrawal
+        tax = federal_tax(planned + other, 0.0, scenario.filing_status, scenario.tax_year, scale, seniors)
+        growth = (1 + scenario.growth_rate) ** t
+        for _ in range(12):
+            sale = np.clip(spending + tax - planned, 0.0, taxable)
+            withdrawal = planned + np.clip(spending + tax - planned - sale, 0.0, ira - planned)
+            gains = curve.gains(taxable, sale, growth)
+            tax = federal_tax(withdrawal + other, gains, scenario.filing_status, scenario.tax_year, scale, seniors)
+
+        # This year's MAGI sets the Medicare premium two years out
+        surcharge = 0.0
+        if enrollees:
+            magi = withdrawal + other + np.maximum(gains, 0.0)
+            surcharge = irmaa(magi, scenario.filing_status, scenario.tax_year, scale)["annual_surcharge"] * enrollees
+
+        stage = {
+            "rmd": rmd,
+            "withdrawal": withdrawal,
+            "sale": sale,
+            "gains": gains,
+            "tax": tax,
+            "irmaa": surcharge,
+            "cost": tax + surcharge / (1 + scenario.discount_rate) ** 2,
+            "conversion": np.maximum(withdrawal - spending - tax, 0.0),
+            "roth_draw": np.maximum(spending + tax - withdrawal - sale, 0.0),  # Roth is the last resort
+            "next_ira": (ira - withdrawal) * (1 + scenario.growth_rate),
+            "next_taxable": (taxable - sale) * (1 + scenario.growth_rate),
+        }
+        return {k: np.broadcast_to(v, withdrawal.shape) for k, v in stage.items()}
+
+    # --- Solver ---
+    def _stage_keys(self, scenario, curve: _GainCurve, years: list[tuple], grids: list[tuple]) -> list[str]:
+        """Cache key per stage; stage t's key covers years t..T so later edits invalidate it."""
+        base = pickle.dumps((
+            scenario.filing_status, scenario.tax_year, scenario.growth_rate, scenario.discount_rate, scenario.heir_tax_rate,
+            scenario.horizon_years, curve.share_edges.tobytes(), curve.basis_edges.tobytes(),
+            grids[0][0].tobytes(), grids[0][1].tobytes(),
+        ))
+        keys = [""] * (len(years) + 1)
+        keys[-1] = hashlib.sha256(base).hexdigest()
+        for t in range(len(years) - 1, -1, -1):
+            keys[t] = hashlib.sha256(pickle.dumps((years[t], keys[t + 1]))).hexdigest()
+        return keys
+
+    def _backward(self, scenario, curve, years, grids, stats) -> list[np.ndarray]:
+        keys = self._stage_keys(scenario, curve, years, grids)
+        horizon = scenario.horizon_years
+        ira_end, _ = grids[horizon]
+        values = [None] * (horizon + 1)
+        values[horizon] = np.repeat((ira_end * scenario.heir_tax_rate)[:, None], len(grids[horizon][1]), axis=1)
+
+        discount = 1 / (1 + scenario.discount_rate)
+        for t in range(horizon - 1, -1, -1):
+            cached = self.cache.get(keys[t])
+            if cached is not None:
+                values[t] = cached
+                stats["stages_reused"] += 1
+                continue
+
+            ira_grid, taxable_grid = grids[t]
+            ira, taxable = np.meshgrid(ira_grid, taxable_grid, indexing="ij")
+            stage = self._stage_costs(scenario, curve, years[t], t, ira, taxable)
+            future = _interp2(*grids[t + 1], values[t + 1], stage["next_ira"], stage["next_taxable"])
+            values[t] = (stage["cost"] + discount * future).min(axis=-1)
+            self.cache.set(keys[t], values[t])
+            stats["stages_solved"] += 1
+        return values
+
+    def _forward(self, scenario, curve, years, grids, values) -> dict:
+        """Follows the optimal policy from the actual starting balances."""
+        ira, taxable, roth = scenario.ira_balance, curve.total, scenario.roth_balance
+        discount = 1 / (1 + scenario.discount_rate)
+        plan = []
+        total_tax = total_irmaa = present_value = 0.0
+
+        for t, year in enumerate(years):
+            stage = self._stage_costs(scenario, curve, year, t, ira, taxable)
+            future = _interp2(*grids[t + 1], values[t + 1], stage["next_ira"], stage["next_taxable"])
+            best = int(np.argmin(stage["cost"] + discount * future))
+            pick = {k: float(v[best]) for k, v in stage.items()}
+
+            roth += pick["conversion"]
+            roth_draw = min(pick["roth_draw"], roth)
+            shortfall = pick["roth_draw"] - roth_draw
+            roth = (roth - roth_draw) * (1 + scenario.growth_rate)
+
+            plan.append({
+                "year": t,
+                "age": year[0],
+                "spending": round(year[1], 2),
+                "rmd": round(pick["rmd"], 2),
+                "ira_withdrawal": round(pick["withdrawal"], 2),
+                "roth_conversion": round(pick["conversion"], 2),
+                "taxable_sale": round(pick["sale"], 2),
+                "lots_sold": curve.lots_sold(taxable, pick["sale"], (1 + scenario.growth_rate) ** t),
+                "realised_gains": round(pick["gains"], 2),
+                "roth_withdrawal": round(roth_draw, 2),
+                "shortfall": round(shortfall, 2),
+                "tax": round(pick["tax"], 2),
+                "irmaa_surcharge": round(pick["irmaa"], 2),
+                "ira_end": round(pick["next_ira"], 2),
+                "taxable_end": round(pick["next_taxable"], 2),
+                "roth_end": round(roth, 2),
+            })
+            total_tax += pick["tax"]
+            total_irmaa += pick["irmaa"]
+            present_value += pick["cost"] * discount ** t
+            ira, taxable = pick["next_ira"], pick["next_taxable"]
+
+        heir_tax = ira * scenario.heir_tax_rate
+        return {
+            "plan": plan,
+            "lifetime_tax": round(total_tax, 2),
+            "lifetime_irmaa": round(total_irmaa, 2),
+            "heir_tax": round(heir_tax, 2),
+            "present_value_cost": round(present_value + heir_tax * discount ** len(years), 2),
+            "feasible": all(year["shortfall"] <= 0.01 for year in plan),
+        }
@@ -0,0 +1,103 @@
+from datetime import datetime
+from typing import Any, Iterable, Iterator, NamedTuple, Optional
+from pydantic_core import core_schema
+
+
+class PortfolioRow(NamedTuple):
+    """Read-only view of one holding."""
+    stock_name: str
+    ticker: str
+    quantity: int
+    recommendation: Optional[str]
+    uploaded_at: Optional[datetime]
+
+
+class PortfolioFrame:
+    """
+    Immutable, columnar portfolio passed through the workflow graph.
+
+    Columns are parallel tuples, validated once when the frame is built.
+    Pydantic only checks the type when the frame sits inside a state model,
+    and copying returns the same object, so LangGraph can hand it from node
+    to node by reference.
+    """
+
+    __slots__ = ("stock_names", "tickers", "quantities", "recommendations", "uploaded_at")
+
+    def __init__(
+        self,
+        stock_names: Iterable[str],
+        tickers: Iterable[str],
+        quantities: Iterable[int],
+        recommendations: Iterable[Optional[str]],
+        uploaded_at: Iterable[Optional[datetime]],
+    ):
+        columns = (tuple(stock_names), tuple(tickers), tuple(quantities), tuple(recommendations), tuple(uploaded_at))
+        if len({len(c) for c in columns}) > 1:
+            raise ValueError("Portfolio columns must have equal length.")
+        for name, column in zip(self.__slots__, columns):
+            object.__setattr__(self, name, column)
+
+    @classmethod
+    def from_records(cls, records: Iterable[dict]) -> "PortfolioFrame":
+        """Builds a frame from row dictionaries such as those read in api/chat.py."""
+        records = list(records or [])
+        return cls(
+            (str(r.get("stock_name") or "") for r in records),
+            (str(r.get("ticker") or "").upper() for r in records),
+            (int(r.get("quantity") or 0) for r in records),
+            (r.get("recommendation") for r in records),
+            (r.get("uploaded_at") for r in records),
+        )
+
+    def __setattr__(self, name, value):
+        raise AttributeError("PortfolioFrame is immutable.")
+
+    def __len__(self) -> int:
+        return len(self.tickers)
+
+    def __bool__(self) -> bool:
+        return len(self.tickers) > 0
+
+    def __getitem__(self, index: int) -> PortfolioRow:
+        return PortfolioRow(
+            self.stock_names[index],
+            self.tickers[index],
+            self.quantities[index],
+            self.recommendations[index],
+            self.uploaded_at[index],
+        )
+
+    def __iter__(self) -> Iterator[PortfolioRow]:
+        return map(PortfolioRow._make, zip(
+            self.stock_names, self.tickers, self.quantities, self.recommendations, self.uploaded_at
+        ))
+
+    def __copy__(self) -> "PortfolioFrame":
+        return self
+
+    def __deepcopy__(self, memo) -> "PortfolioFrame":
+        return self
+
+    def __repr__(self) -> str:
+        return f"PortfolioFrame({len(self)} holdings)"
+
+    def to_dicts(self) -> list[dict]:
+        """Materialises the rows as dictionaries (for tools that expect them)."""
+        return [row._asdict() for row in self]
+
+    @classmethod
+    def _coerce(cls, value: Any) -> "PortfolioFrame":
+        if isinstance(value, cls):
+            return value
+        if isinstance(value, (list, tuple)):
+            return cls.from_records(value)
+        raise TypeError("Expected a PortfolioFrame or a list of portfolio rows.")
+
+    @classmethod
+    def __get_pydantic_core_schema__(cls, source, handler):
+        # Existing frames pass through untouched; lists are converted once
+        return core_schema.no_info_plain_validator_function(
+            cls._coerce,
+            serialization=core_schema.plain_serializer_function_ser_schema(lambda frame: frame.to_dicts()),
+        )
@@ -1,52 +1,81 @@
-from langgraph.graph import StateGraph
+from langgraph.graph import StateGraph, START, END
 from pydantic import BaseModel
 from typing import Literal, List, Optional, Dict
-from datetime import datetime
 from openai import OpenAI
 from agents.stock_advisor import StockAdvisor
 from agents.tax_advisor import TaxAdvisor
+from tools.stock_fetcher import prefetch_stock_prices
+from workflows.portfolio_frame import PortfolioFrame
+from tools.llm_client import LLMClient
+from tools.tracing import record_llm_usage, tracer
 from config.settings import settings
 
 
-class PortfolioItem(BaseModel):
-    stock_name: str
-    ticker: str
-    quantity: int
-    recommendation: Optional[str] = None
-    uploaded_at: datetime
-
-
 class PortfolioState(BaseModel):
     user_id: int
     query: str
     response: Optional[str] = None
     history: Optional[List[Dict[str, str]]] = None
-    portfolio: Optional[List[PortfolioItem]] = None
+    portfolio: Optional[PortfolioFrame] = None
+    query_type: Optional[Literal["stock", "tax", "both"]] = None
+    stock_response: Optional[str] = None
+    tax_response: Optional[str] = None
 
 
 class PortfolioWorkflow:
     """
     Handles query classification and delegation to StockAdvisor or TaxAdvisor.
     Does NOT fetch or save data to the database directly.
+
+    Graph layout:
+        START -> classify_query ─┬─> stock_agent ─┬─> merge_responses -> END
+        START -> prefetch_prices └─> tax_agent ───┘
+
+    Classification and price prefetching run in the same step, so the agents
+    start with a warm quote cache. Queries classified as "both" run the stock
+    and tax agents in parallel before their answers are merged.
+    Nodes return partial updates so parallel branches never write the same key.
+    Every node and the router run inside a trace span named after them.
     """
 
     def __init__(self, api_key: str):
-        self.openai_client = OpenAI(api_key=api_key)
+        self.openai_client = OpenAI(api_key=api_key, max_retries=0)
+        self.classifier = LLMClient(self.openai_client, model_name="gpt-4o-mini")
         self.stock_agent = StockAdvisor(api_key)
         self.tax_agent = TaxAdvisor(api_key)
 
         graph = StateGraph(PortfolioState)
-        graph.add_node("route_query", self.route_query)
-        graph.set_entry_point("route_query")
+        nodes = {
+            "classify_query": self.classify_node,
+            "prefetch_prices": self.prefetch_prices,
+            "stock_agent": self.stock_node,
+            "tax_agent": self.tax_node,
+            "merge_responses": self.merge_responses,
+        }
+        for name, node in nodes.items():
+            graph.add_node(name, tracer.wrap(f"node.{name}", node))
+
+        graph.add_edge(START, "classify_query")
+        graph.add_edge(START, "prefetch_prices")
+        graph.add_edge("prefetch_prices", END)
+        graph.add_conditional_edges(
+            "classify_query",
+            tracer.wrap("route_query", self.route_query),
+            ["stock_agent", "tax_agent", "merge_responses"],
+        )
+        graph.add_edge("stock_agent", "merge_responses")
+        graph.add_edge("tax_agent", "merge_responses")
+        graph.add_edge("merge_responses", END)
         self.executor = graph.compile()
 
-    def classify_query(self, query: str) -> Literal["stock", "tax"]:
-        """Classify user query as stock- or tax-related."""
+    def classify_query(self, query: str) -> Literal["stock", "tax", "both"]:
+        """Classify user query as stock-related, tax-related or both."""
         system_prompt = (
-            "You are a classifier that determines whether a user query is about stocks or taxes. "
-            "Only respond with 'stock' or 'tax'."
+            "You are a classifier that determines whether a user query is about stocks, taxes, "
+            "or needs both (e.g. which holdings to sell to cover a withdrawal). "
+            "Only respond with 'stock', 'tax' or 'both'."
         )
-        response = self.openai_client.chat.completions.create(
+        response = self.classifier.call(lambda timeout: self.openai_client.chat.completions.create(
             model="gpt-4o-mini",
             messages=[
                 {"role": "system", "content": system_prompt},
@@ -54,44 +83,65 @@ class PortfolioWorkflow:
             ],
             max_tokens=1,
             temperature=0,
-        )
+            timeout=timeout,
+        ))
+        record_llm_usage(response, "gpt-4o-mini")
         content = response.choices[0].message.content.strip().lower()
+        if "both" in content:
+            return "both"
         return "tax" if "tax" in content else "stock"
 
-    def route_query(self, state: PortfolioState) -> PortfolioState:
-        """Route to appropriate advisor based on query type."""
-        query_type = self.classify_query(state.query)
+    def classify_node(self, state: PortfolioState) -> dict:
+        """Classifies the query; skipped when there is nothing to advise on."""
+        if not state.portfolio:
+            return {"query_type": None}
+        return {"query_type": self.classify_query(state.query)}
 
-        if not state.portfolio or len(state.portfolio) == 0:
-            return PortfolioState(
-                user_id=state.user_id,
-                query=state.query,
-                response="No portfolio data found. Please upload your portfolio first.",
-            )
+    def prefetch_prices(self, state: PortfolioState) -> dict:
+        """Speculatively warms the quote cache while the classifier runs."""
+        if state.portfolio:
+            prefetch_stock_prices(state.portfolio.tickers)
+        return {}
+
+    def route_query(self, state: PortfolioState) -> list[str]:
+        """Picks the agent branch(es) to run based on the classification."""
+        if not state.portfolio or state.query_type is None:
+            return ["merge_responses"]
+        if state.query_type == "both":
+            return ["stock_agent", "tax_agent"]
+        return ["stock_agent"] if state.query_type == "stock" else ["tax_agent"]
+
+    def stock_node(self, state: PortfolioState) -> dict:
+        return {"stock_response": self.stock_agent.ask_stock_question(state.query, state.user_id)}
+
+    def tax_node(self, state: PortfolioState) -> dict:
+        return {"tax_response": self.tax_agent.ask_tax_question(state.user_id, state.query)}
 
-        if query_type == "stock":
-            result = self.stock_agent.ask_stock_question(state.query, state.user_id)
+    def merge_responses(self, state: PortfolioState) -> dict:
+        """Combines the branch answers into the final response."""
+        if not state.portfolio:
+            return {"response": "No portfolio data found. Please upload your portfolio first."}
+
+        if state.stock_response and state.tax_response:
+            response = (
+                f"Portfolio view:\n{state.stock_response}\n\n"
+                f"Tax view:\n{state.tax_response}"
+            )
         else:
-            result = self.tax_agent.ask_tax_question(state.query, state.portfolio)
-
-        return PortfolioState(
-            user_id=state.user_id,
-            query=state.query,
-            response=result,
-            history=state.history,
-            portfolio=state.portfolio,
-        )
+            response = state.stock_response or state.tax_response
+        return {"response": response}
 
     def handle_query(
         self,
         user_id: int,
         query: str,
-        portfolio: List[Dict[str, any]],
+        portfolio: List[Dict[str, any]] | PortfolioFrame,
         history: List[Dict[str, str]] | None = None,
     ) -> str:
-        """Main workflow entry point."""
+        """Main workflow entry point. The portfolio is converted to a PortfolioFrame once here."""
         state = PortfolioState(user_id=user_id, query=query, portfolio=portfolio, history=history)
-        result = self.executor.invoke(state)
+        with tracer.span("workflow.invoke", user_id=user_id, holdings=len(state.portfolio or ())):
+            result = self.executor.invoke(state)
         # langgraph returns AddableValuesDict, so access by key
         if isinstance(result, dict) or "response" in result:
             return result["response"]